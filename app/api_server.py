@@ -0,0 +1,280 @@
+# app/api_server.py — HTTP inference API for machine clients
+#
+#   python app/api_server.py --port 8080
+#
+#   curl -F file=@clip.mp4 http://localhost:8080/deepfake
+#   curl -F file=@car.jpg  http://localhost:8080/plate
+#   curl -F file=@face.jpg "http://localhost:8080/similar?k=5&label=Fake"
+#   curl --data-binary @photo.jpg -H "Content-Type: image/jpeg" http://localhost:8080/recognize
+#
+# Uploads (multipart field `file`, or a raw request body) are streamed to disk in
+# chunks, never buffered whole. Every endpoint answers JSON with timing; /deepfake
+# also returns per-model sub-scores, near-duplicate provenance and the most similar
+# previously analyzed images (/similar queries that index alone). Similar-image
+# matches are scoped to the client (X-Client-Id header, else the remote address).
+# /recognize adds zero-shot content categories from CLIP next to the label.
+# Add ?timeout=S to bound a request; inference concurrency is capped by the shared
+# AsyncRunner.
+
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import base64
+import mimetypes
+import tempfile
+import time
+
+import cv2
+from aiohttp import web
+
+from src.utils.async_api import AsyncModels, AsyncRunner
+from src.utils.model_manager import get_model_manager
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "api_uploads")
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".webm"}
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".m4a"}
+
+MODELS_KEY = web.AppKey("models", AsyncModels)
+CONFIG_KEY = web.AppKey("config", dict)
+
+
+def _error(status, message):
+    return web.json_response({"error": message}, status=status)
+
+
+async def _stream_to_disk(source, dest_dir, suffix, max_bytes):
+    """Copy an async chunk source (multipart field or request body) into a temp file."""
+    fd, path = tempfile.mkstemp(dir=dest_dir, suffix=suffix or ".bin")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await source.read_chunk(CHUNK_SIZE) if hasattr(source, "read_chunk") else await source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise web.HTTPRequestEntityTooLarge(max_size=max_bytes, actual_size=size)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+async def receive_uploads(request):
+    """
+    Stream the request's files to disk. Returns {field name: (path, filename, content type)}.
+    Multipart fields keep their names; a raw body is stored as "file".
+    """
+    config = request.app[CONFIG_KEY]
+    uploads = {}
+    try:
+        if request.content_type.startswith("multipart/"):
+            reader = await request.multipart()
+            async for part in reader:
+                if part.filename is None:
+                    continue
+                suffix = os.path.splitext(part.filename)[1].lower()
+                path = await _stream_to_disk(part, config["upload_dir"], suffix, config["max_upload_bytes"])
+                uploads[part.name] = (path, part.filename, part.headers.get("Content-Type", ""))
+        elif request.can_read_body:
+            suffix = mimetypes.guess_extension(request.content_type) or ""
+            path = await _stream_to_disk(request.content, config["upload_dir"], suffix, config["max_upload_bytes"])
+            uploads["file"] = (path, f"upload{suffix}", request.content_type)
+    except BaseException:
+        _cleanup(uploads)
+        raise
+    return uploads
+
+
+def _cleanup(uploads):
+    for path, _, _ in uploads.values():
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _media_kind(filename, content_type):
+    ext = os.path.splitext(filename)[1].lower()
+    if content_type.startswith("video/") or ext in VIDEO_EXTENSIONS:
+        return "video"
+    if content_type.startswith("audio/") or ext in AUDIO_EXTENSIONS:
+        return "audio"
+    return "image"
+
+
+def _timeout(request):
+    value = request.query.get("timeout")
+    return float(value) if value else None
+
+
+def _client(request):
+    """Owner of indexed media: clients only ever see their own similar-image and provenance matches."""
+    return request.headers.get("X-Client-Id") or request.remote
+
+
+def with_uploads(handler):
+    """Receive uploads, time the request, map failures to JSON errors and clean up."""
+    async def wrapped(request):
+        start = time.perf_counter()
+        uploads = {}
+        try:
+            uploads = await receive_uploads(request)
+            if "file" not in uploads:
+                return _error(400, "Send the media as multipart field 'file' or as the request body.")
+            received = time.perf_counter() - start
+            body = await handler(request, uploads)
+            body.setdefault("timing", {}).update({"upload": received, "request": time.perf_counter() - start})
+            return web.json_response(body)
+        except TimeoutError:
+            return _error(504, "Inference timed out.")
+        except web.HTTPRequestEntityTooLarge:
+            return _error(413, f"Upload exceeds {request.app[CONFIG_KEY]['max_upload_bytes']} bytes.")
+        except ValueError as e:
+            return _error(422, str(e))
+        finally:
+            _cleanup(uploads)
+    return wrapped
+
+
+@with_uploads
+async def deepfake(request, uploads):
+    models = request.app[MODELS_KEY]
+    path, filename, content_type = uploads["file"]
+    kind = _media_kind(filename, content_type)
+    audio_path = uploads["audio"][0] if "audio" in uploads else None
+    if kind == "audio":
+        kind, path, audio_path = None, None, path
+    result = await models.analyze_deepfake(
+        image_path=path if kind == "image" else None,
+        video_path=path if kind == "video" else None,
+        audio_path=audio_path,
+        source=filename,
+        owner=_client(request),
+        timeout=_timeout(request),
+    )
+    return {
+        "label": result["label"],
+        "probs": {"real": float(result["probs"][0]), "fake": float(result["probs"][1])},
+        "sub_scores": result["sub_scores"],
+        "provenance": result["provenance"],
+        "similar": result.get("similar"),
+        "timing": dict(result["timing"]),
+    }
+
+
+@with_uploads
+async def similar(request, uploads):
+    start = time.perf_counter()
+    matches = await request.app[MODELS_KEY].similar(
+        uploads["file"][0],
+        k=int(request.query.get("k", 10)),
+        label=request.query.get("label"),
+        owner=_client(request),
+        timeout=_timeout(request),
+    )
+    return {"similar": matches, "timing": {"inference": time.perf_counter() - start}}
+
+
+@with_uploads
+async def recognize(request, uploads):
+    start = time.perf_counter()
+    models = request.app[MODELS_KEY]
+    label, confidence = await models.recognize(uploads["file"][0], timeout=_timeout(request))
+    categories = await models.categorize(uploads["file"][0], timeout=_timeout(request))
+    return {"label": label, "confidence": confidence, "categories": categories,
+            "timing": {"inference": time.perf_counter() - start}}
+
+
+@with_uploads
+async def plate(request, uploads):
+    start = time.perf_counter()
+    text = await request.app[MODELS_KEY].read_plate(uploads["file"][0], timeout=_timeout(request))
+    return {"text": text, "timing": {"inference": time.perf_counter() - start}}
+
+
+@with_uploads
+async def enhance(request, uploads):
+    start = time.perf_counter()
+    image = await request.app[MODELS_KEY].enhance(uploads["file"][0], timeout=_timeout(request))
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    if not ok:
+        raise ValueError("Could not encode the enhanced image.")
+    return {
+        "image": base64.b64encode(encoded.tobytes()).decode("ascii"),
+        "content_type": "image/jpeg",
+        "width": int(image.shape[1]),
+        "height": int(image.shape[0]),
+        "timing": {"inference": time.perf_counter() - start},
+    }
+
+
+async def health(request):
+    return web.json_response({
+        "status": "ok",
+        "runner": request.app[MODELS_KEY].runner.stats,
+        "models": get_model_manager().report(),
+    })
+
+
+def create_app(models, upload_dir=UPLOAD_DIR, max_upload_bytes=512 * 1024 ** 2):
+    """aiohttp application over an AsyncModels facade (also usable with aiohttp's TestClient)."""
+    os.makedirs(upload_dir, exist_ok=True)
+    # Bodies are streamed to disk, so aiohttp's in-memory limit only guards form fields
+    app = web.Application(client_max_size=max_upload_bytes)
+    app[MODELS_KEY] = models
+    app[CONFIG_KEY] = {"upload_dir": upload_dir, "max_upload_bytes": max_upload_bytes}
+    app.router.add_post("/deepfake", deepfake)
+    app.router.add_post("/similar", similar)
+    app.router.add_post("/recognize", recognize)
+    app.router.add_post("/plate", plate)
+    app.router.add_post("/enhance", enhance)
+    app.router.add_get("/health", health)
+    app.on_cleanup.append(lambda app: _shutdown(app[MODELS_KEY]))
+    return app
+
+
+async def _shutdown(models):
+    models.runner.shutdown(wait=False)
+
+
+def load_models(runner):
+    from src.ensemble.ensemble_core import DeepfakeEnsemble
+    from src.ensemble.near_duplicates import NearDuplicateIndex
+    from src.ensemble.vector_index import VectorIndex
+    from src.image_utils.recognition import ImageRecognition
+    from src.image_utils.number_plate_recognition import NumberPlateRecognizer
+    from app.ensemble_loader import load_category_head
+
+    # Models load on first request and share one memory budget (MODEL_MEMORY_BUDGET_MB)
+    manager = get_model_manager()
+    return AsyncModels(
+        ensemble=DeepfakeEnsemble(near_duplicates=NearDuplicateIndex(), model_manager=manager,
+                                  vector_index=VectorIndex()),
+        recognizer=manager.lazy("recognition", ImageRecognition),
+        plate_reader=manager.lazy("plate_ocr", NumberPlateRecognizer),
+        categories=load_category_head(model_manager=manager),
+        runner=runner,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP inference API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=2, help="concurrent inference threads")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="admitted requests before callers wait")
+    parser.add_argument("--timeout", type=float, default=None, help="default per-request inference timeout (s)")
+    parser.add_argument("--max-upload-mb", type=int, default=512)
+    parser.add_argument("--keepalive", type=float, default=75.0, help="idle keep-alive timeout (s)")
+    args = parser.parse_args()
+
+    runner = AsyncRunner(args.workers, args.max_in_flight, args.timeout)
+    app = create_app(load_models(runner), max_upload_bytes=args.max_upload_mb * 1024 ** 2)
+    web.run_app(app, host=args.host, port=args.port, keepalive_timeout=args.keepalive)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 # app/app_dashboard.py — Adaptive Transitions + Dynamic Theme Integration
 
-import sys, os, glob, time
+import sys, os, time, uuid
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import streamlit as st
@@ -18,11 +18,19 @@ from app.components.deepfake_tab import render_deepfake_tab
 # --- Import Theme ---
 from app.styles import apply_theme
 from app.components.theme_manager import apply_dynamic_theme
+from app.upload_store import UploadStore
+from app.result_cache import clear_results
+from app.ensemble_loader import load_category_head
 
 # --- Import Models ---
 from src.ensemble.ensemble_core import DeepfakeEnsemble
+from src.ensemble.near_duplicates import NearDuplicateIndex
+from src.ensemble.vector_index import VectorIndex
 from src.image_utils.recognition import ImageRecognition
 from src.image_utils.number_plate_recognition import NumberPlateRecognizer
+from src.utils.jobs import get_job_manager
+from src.utils.model_manager import get_model_manager
+from src.utils.system_metrics import get_sampler
 
 
 # --- Initialize Session Keys ---
@@ -33,7 +41,8 @@ for key, default in {
     "last_update_time": 0,
     "visible": True,
     "history": [],
-    "last_page": "enhancement"
+    "last_page": "enhancement",
+    "upload_session_id": uuid.uuid4().hex
 }.items():
     if key not in st.session_state:
         st.session_state[key] = default
@@ -69,6 +78,7 @@ st.sidebar.subheader("⚙️ Utility Actions")
 if st.sidebar.button("🗑 Clear Session Cache"):
     st.cache_resource.clear()
     st.cache_data.clear()
+    clear_results()
     st.sidebar.success("✅ Cache cleared successfully. Refresh the page.")
 
 SAMPLES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "samples"))
@@ -164,33 +174,48 @@ st.markdown(f"""
 # =========================================================
 @st.cache_resource
 def load_models():
-    ensemble = DeepfakeEnsemble(weights=(0.4, 0.6, 0.0))
-    recognizer = ImageRecognition()
-    plate_reader = NumberPlateRecognizer()
-    return ensemble, recognizer, plate_reader
+    # Models load on first use and share one memory budget (MODEL_MEMORY_BUDGET_MB)
+    manager = get_model_manager()
+    # Re-uploads of already analyzed media (even re-encoded) are flagged with provenance,
+    # and every analyzed image is indexed by its features for "similar media" lookups
+    ensemble = DeepfakeEnsemble(near_duplicates=NearDuplicateIndex(), model_manager=manager,
+                                vector_index=VectorIndex())
+    recognizer = manager.lazy("recognition", ImageRecognition)
+    plate_reader = manager.lazy("plate_ocr", NumberPlateRecognizer)
+    # Zero-shot content categories shown next to the recognition label (CLIP, loaded on first use)
+    categories = load_category_head(model_manager=manager)
+    return ensemble, recognizer, plate_reader, categories
 
 set_status("🧠 Initializing AI models...")
-ensemble, recognizer, plate_reader = load_models()
+ensemble, recognizer, plate_reader, categories = load_models()
+get_sampler().register_queue("analysis_jobs", get_job_manager().pending_count)
 set_status("✅ Models Loaded and Ready")
 
+with st.sidebar.expander("🧠 Model Memory"):
+    report = get_model_manager().report()
+    budget = report["budget_bytes"]
+    st.caption(
+        f"Resident {report['resident_bytes'] / 1024 ** 2:.0f} MB"
+        + (f" of {budget / 1024 ** 2:.0f} MB" if budget else " (no budget)")
+        + f" • loads {report['loads']} • evictions {report['evictions']}"
+    )
+    for key, info in report["models"].items():
+        state = "📌" if info["pinned"] else ("🟢" if info["loaded"] else "⚪")
+        st.text(f"{state} {key}: {info['bytes'] / 1024 ** 2:.0f} MB, {info['loads']} loads / {info['evictions']} evictions")
+
 
 # =========================================================
 # FILE HANDLING
 # =========================================================
-def cleanup_temp_files():
-    for pattern in ["temp_*.jpg", "temp_*.png", "temp_*.mp4"]:
-        for f in glob.glob(os.path.join(SAMPLES_DIR, pattern)):
-            try:
-                os.remove(f)
-            except:
-                pass
+UPLOADS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "uploads"))
+
+@st.cache_resource
+def get_upload_store():
+    return UploadStore(UPLOADS_DIR)
 
 def save_uploaded(upload):
-    cleanup_temp_files()
-    temp_path = os.path.join(SAMPLES_DIR, f"temp_{upload.name.replace(' ', '_')}")
-    with open(temp_path, "wb") as f:
-        f.write(upload.read())
-    return temp_path
+    """Stream the upload to a per-session, content-addressed file (no full in-memory read)."""
+    return get_upload_store().save(upload, st.session_state.upload_session_id)
 
 
 # =========================================================
@@ -234,17 +259,18 @@ st.markdown(f"""
 # TAB CONTENT
 # =========================================================
 if upload:
-    temp_path = save_uploaded(upload)
+    temp_path, upload_hash = save_uploaded(upload)
 
     if current_page == "enhancement":
-        render_enhancement_tab(upload, SAMPLES_DIR)
+        render_enhancement_tab(upload, SAMPLES_DIR, temp_path, upload_hash)
     elif current_page == "recognition":
-        render_recognition_tab(upload, SAMPLES_DIR, recognizer)
+        render_recognition_tab(upload, SAMPLES_DIR, recognizer, temp_path, upload_hash, categories=categories)
     elif current_page == "plate":
-        render_plate_tab(upload, SAMPLES_DIR, plate_reader)
+        render_plate_tab(upload, SAMPLES_DIR, plate_reader, temp_path, upload_hash)
     elif current_page == "deepfake":
-        render_deepfake_tab(upload, SAMPLES_DIR, ensemble)
+        render_deepfake_tab(upload, SAMPLES_DIR, ensemble, temp_path, upload_hash, upload_store=get_upload_store())
 else:
+    get_upload_store().release(st.session_state.upload_session_id)
     st.info("👆 Upload an image or video to begin analysis.")
 
 
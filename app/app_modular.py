@@ -1,6 +1,6 @@
 # app/app.py — Modular, Theme-Ready Dashboard
 
-import sys, os, time, glob
+import sys, os, time, uuid
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import streamlit as st
@@ -11,6 +11,9 @@ from src.ensemble.ensemble_core import DeepfakeEnsemble
 from src.image_utils.enhancement import enhance_image_cv2
 from src.image_utils.recognition import ImageRecognition
 from src.image_utils.number_plate_recognition import NumberPlateRecognizer
+from src.utils.model_manager import get_model_manager
+from app.upload_store import UploadStore
+from app.result_cache import cached_result
 
 
 # ====================== APP SETUP ======================
@@ -52,9 +55,10 @@ st.markdown("""
 @st.cache_resource
 def load_models():
     with st.spinner("Loading AI models (first run may take a minute)..."):
-        ensemble = DeepfakeEnsemble(weights=(0.4, 0.6, 0.0))
-        recognizer = ImageRecognition()
-        plate_reader = NumberPlateRecognizer()
+        manager = get_model_manager()
+        ensemble = DeepfakeEnsemble(model_manager=manager)
+        recognizer = manager.lazy("recognition", ImageRecognition)
+        plate_reader = manager.lazy("plate_ocr", NumberPlateRecognizer)
     return ensemble, recognizer, plate_reader
 
 
@@ -67,22 +71,19 @@ SAMPLES_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "data", "samples"))
 os.makedirs(SAMPLES_DIR, exist_ok=True)
 
 
-def cleanup_old_temp_files():
-    for pattern in ["temp_*.jpg", "temp_*.png", "temp_*.mp4"]:
-        for f in glob.glob(os.path.join(SAMPLES_DIR, pattern)):
-            try:
-                os.remove(f)
-            except:
-                pass
+UPLOADS_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "data", "uploads"))
+
+
+@st.cache_resource
+def get_upload_store():
+    return UploadStore(UPLOADS_DIR)
 
 
 def save_uploaded_file(upload):
-    cleanup_old_temp_files()
-    safe_name = upload.name.replace(" ", "_")
-    temp_path = os.path.join(SAMPLES_DIR, f"temp_{safe_name}")
-    with open(temp_path, "wb") as f:
-        f.write(upload.read())
-    return temp_path
+    """Stream the upload to a per-session, content-addressed file (no full in-memory read)."""
+    if "upload_session_id" not in st.session_state:
+        st.session_state.upload_session_id = uuid.uuid4().hex
+    return get_upload_store().save(upload, st.session_state.upload_session_id)
 
 
 # ====================== SIDEBAR OPTIONS ======================
@@ -113,14 +114,15 @@ if upload is None:
 
 
 # ====================== PROCESS ======================
-temp_path = save_uploaded_file(upload)
+temp_path, upload_hash = save_uploaded_file(upload)
 
 # ---------------- TAB 1: ENHANCEMENT ----------------
 with tab1:
     if upload.type.startswith("image/"):
         with st.spinner("Enhancing image quality..."):
-            output_path = os.path.join(SAMPLES_DIR, "enhanced_preview.jpg")
-            enhance_image_cv2(temp_path, output_path)
+            output_path = os.path.join(SAMPLES_DIR, f"enhanced_{upload_hash[:16]}.jpg")
+            if not os.path.exists(output_path):
+                enhance_image_cv2(temp_path, output_path)
         col1, col2 = st.columns(2)
         with col1:
             st.image(temp_path, caption="Original", use_container_width=True)
@@ -135,7 +137,7 @@ with tab1:
 with tab2:
     if upload.type.startswith("image/"):
         with st.spinner("Analyzing image contents..."):
-            label, prob = recognizer.predict(temp_path)
+            (label, prob), _ = cached_result("recognition", upload_hash, lambda: recognizer.predict(temp_path))
         st.image(temp_path, caption="Uploaded Image", use_container_width=True)
         st.metric("Predicted Label", label)
         st.metric("Confidence", f"{prob:.2%}")
@@ -148,7 +150,7 @@ with tab2:
 with tab3:
     if upload.type.startswith("image/"):
         with st.spinner("Detecting and reading number plate..."):
-            plate_text = plate_reader.read_plate_text(temp_path)
+            plate_text, _ = cached_result("plate", upload_hash, lambda: plate_reader.read_plate_text(temp_path))
         st.image(temp_path, caption="Car Image", use_container_width=True)
         if plate_text not in ["No plate detected", "Text not detected"]:
             st.success(f"✅ Detected Plate: **{plate_text}**")
@@ -162,10 +164,14 @@ with tab3:
 with tab4:
     with st.spinner("Running deepfake detection..."):
         if upload.type.startswith("image/"):
-            label, probs = ensemble.predict(image_path=temp_path, video_path=None)
+            (label, probs), _ = cached_result(
+                "deepfake", upload_hash, lambda: ensemble.predict(image_path=temp_path, video_path=None)
+            )
             st.image(temp_path, caption="Uploaded Image", use_container_width=True)
         else:
-            label, probs = ensemble.predict(image_path=None, video_path=temp_path)
+            (label, probs), _ = cached_result(
+                "deepfake", upload_hash, lambda: ensemble.predict(image_path=None, video_path=temp_path)
+            )
             st.video(temp_path)
 
     col1, col2 = st.columns(2)
@@ -1,32 +1,133 @@
 import streamlit as st
-import os
 import time
 from app.components.status_bar import set_status
 from app.components.download_dock import render_download_dock
+from app.result_cache import cached_result, lookup_result
+from src.utils.jobs import get_job_manager
 
 
-def render_deepfake_tab(upload, samples_dir, ensemble):
-    """Render deepfake detection tab (image or video)."""
-    temp_path = os.path.join(samples_dir, f"temp_{upload.name.replace(' ', '_')}")
+def _analyze_video(ensemble, video_path, source, owner, job):
+    """Background job body: progress is published through job.report()."""
+    return ensemble.analyze(image_path=None, video_path=video_path, progress=job.report, source=source,
+                            owner=owner)
 
+
+def _render_job_panel(upload_hash):
+    """Live progress for this session's video analyses (polled, never blocks the script)."""
+    manager = get_job_manager()
+    session_jobs = st.session_state.setdefault("deepfake_jobs", {})
+    if not session_jobs:
+        return
+
+    st.markdown("#### 🎞 Video Analyses")
+    for media_hash, job_id in list(session_jobs.items()):
+        job = manager.get(job_id)
+        if job is None:
+            session_jobs.pop(media_hash)
+            continue
+
+        p = job.progress
+        cols = st.columns([4, 1])
+        with cols[0]:
+            st.caption(f"{job.name} — {job.status} ({job.elapsed:.0f}s)")
+            if job.status in ("queued", "running"):
+                total = p.get("windows_total", 0)
+                done = p.get("windows_scored", 0)
+                st.progress(int(100 * done / total) if total else 0,
+                            text=f"Decoded {p.get('frames_decoded', 0)} frames • scored {done}/{total or '?'} windows")
+            elif job.status == "failed":
+                st.error(f"❌ {job.error}")
+            elif job.status == "done":
+                label, probs = job.result["label"], job.result["probs"]
+                st.success(f"**{label}** (Real={probs[0]:.4f}, Fake={probs[1]:.4f})")
+        with cols[1]:
+            if not job.is_finished and st.button("✖ Cancel", key=f"cancel_{job_id}"):
+                manager.cancel(job_id)
+            elif job.is_finished and st.button("🗑 Dismiss", key=f"dismiss_{job_id}"):
+                session_jobs.pop(media_hash)
+
+    current = manager.get(session_jobs.get(upload_hash, ""))
+    if current is not None and current.status == "running":
+        p = current.progress
+        set_status(f"🎬 Analyzing video... {p.get('frames_decoded', 0)} frames decoded", progress=30)
+
+    # Finished jobs for the current upload are promoted to the result cache
+    if current is not None and current.status == "done" and st.session_state.get("deepfake_job_seen") != current.id:
+        st.session_state.deepfake_job_seen = current.id
+        st.rerun()
+
+
+# Re-runs just the job panel every second while analyses are in flight
+_live_job_panel = st.fragment(run_every=1.0)(_render_job_panel)
+
+
+def render_deepfake_tab(upload, samples_dir, ensemble, temp_path, upload_hash, upload_store=None):
+    """
+    Render deepfake detection tab (image or video).
+    upload_store: the UploadStore holding temp_path; video jobs keep the file alive until they end.
+    """
     try:
         if upload.type.startswith("image/"):
             set_status("🧠 Analyzing image for deepfakes...", progress=20, context="deepfake")
-            label, probs = ensemble.predict(image_path=temp_path, video_path=None)
+            # Per-session cache only: "similar" lists this session's own earlier uploads
+            session_id = st.session_state.get("upload_session_id")
+            result, cached = cached_result(
+                "deepfake", upload_hash,
+                lambda: ensemble.analyze(image_path=temp_path, video_path=None, source=upload.name, owner=session_id),
+                shared=False,
+            )
             st.image(temp_path, caption="🧩 Uploaded Image", use_container_width=True)
         else:
-            set_status("🎬 Analyzing video for deepfakes...", progress=20)
-            label, probs = ensemble.predict(image_path=None, video_path=temp_path)
             st.video(temp_path)
+            manager = get_job_manager()
+            session_jobs = st.session_state.setdefault("deepfake_jobs", {})
+            job = manager.get(session_jobs.get(upload_hash, ""))
+            stored = lookup_result("deepfake", upload_hash)
+
+            if stored is not None or (job is not None and job.status == "done"):
+                result, cached = cached_result("deepfake", upload_hash, lambda: job.result)
+            else:
+                # Long videos run as background jobs so this script thread stays responsive
+                if job is None or job.status in ("failed", "cancelled"):
+                    if st.button("🎬 Start video analysis", key=f"start_{upload_hash}"):
+                        release = upload_store.hold(temp_path) if upload_store is not None else None
+                        session_jobs[upload_hash] = manager.submit(
+                            _analyze_video, ensemble, temp_path, upload.name, st.session_state.get("upload_session_id"),
+                            name=upload.name, on_finish=release
+                        )
+                        set_status("🎬 Video analysis queued...", progress=10, context="deepfake")
+                        st.rerun()
+                _live_job_panel(upload_hash)
+                return
 
-        set_status("✅ Deepfake detection complete!", progress=100)
+        label, probs = result["label"], result["probs"]
+        set_status("✅ Deepfake detection complete!" + (" (cached)" if cached else ""), progress=100)
         st.success(f"**Prediction:** {label} (Real={probs[0]:.4f}, Fake={probs[1]:.4f})")
+        provenance = result.get("provenance")
+        if provenance:
+            st.caption(
+                f"♻️ Near-duplicate of **{provenance['source']}** analyzed "
+                f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(provenance['analyzed_at']))} "
+                f"as {provenance.get('label', '?')} "
+                f"(Hamming distance {provenance['distance']}, frames matched {provenance['matched_frames']})"
+            )
+        similar = result.get("similar")
+        if similar:
+            with st.expander(f"🔎 Similar images you analyzed before ({len(similar)})"):
+                for match in similar:
+                    st.caption(
+                        f"**{match.get('source', '?')}** — {match.get('label', '?')} "
+                        f"(Fake={match.get('fake', 0):.4f}), similarity {match['similarity']:.3f}, analyzed "
+                        f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(match.get('analyzed_at', 0)))}"
+                    )
 
         render_download_dock(
-            file_paths=[(temp_path, "⬇ Download Media File")],
+            file_paths=[(temp_path, "⬇ Download Media File", upload.name)],
             theme_dark=st.session_state.get("dark_mode", False),
             auto_hide_after=6.0
         )
+        if not upload.type.startswith("image/"):
+            _render_job_panel(upload_hash)
 
     except Exception as e:
         st.error(f"❌ Deepfake detection failed: {e}")
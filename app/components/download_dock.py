@@ -1,13 +1,39 @@
 # app/components/download_dock.py
 import streamlit as st
+import html
 import os
 import time
+from app.output_store import get_output_store
+
+
+def render_lazy_download(path, label, file_name, key, container=st):
+    """
+    A button that reads the file only after this particular file is requested
+    (uploads, and stored outputs when static serving is off).
+    """
+    store = get_output_store()
+    ready_key = f"ready_{key}"
+    if st.session_state.get(ready_key):
+        container.download_button(
+            label=label,
+            data=store.read_bytes(path),
+            file_name=file_name,
+            mime="application/octet-stream",
+            key=key,
+            on_click=lambda: st.session_state.pop(ready_key, None),
+        )
+    elif container.button(label, key=f"prep_{key}"):
+        st.session_state[ready_key] = True
+        st.rerun()
 
 
 def render_download_dock(file_paths: list, theme_dark: bool = False, auto_hide_after: float = 5.0):
     """
     Floating frosted-glass download dock — unified design with status bar theme.
     Automatically hides after inactivity.
+    file_paths: (path, label) or (path, label, download_name) tuples. Generated
+    outputs already in the output store are linked through the static route; other
+    files (uploads) get a lazy download button. Rendering never reads file contents.
     """
 
     # --- Adaptive Theme Colors ---
@@ -60,6 +86,25 @@ def render_download_dock(file_paths: list, theme_dark: bool = False, auto_hide_a
         transform: translateY(25px);
     }}
 
+    .download-dock .dock-link {{
+        display: block;
+        text-align: center;
+        background: {btn_bg};
+        color: {btn_color} !important;
+        border-radius: 12px;
+        width: 220px;
+        padding: 8px 0;
+        font-weight: 500;
+        text-decoration: none;
+        box-shadow: {shadow};
+        transition: all 0.3s ease;
+    }}
+
+    .download-dock .dock-link:hover {{
+        transform: translateY(-2px) scale(1.03);
+        box-shadow: 0 0 14px {pulse_color};
+    }}
+
     .download-dock .stDownloadButton>button {{
         background: {btn_bg};
         color: {btn_color};
@@ -104,22 +149,25 @@ def render_download_dock(file_paths: list, theme_dark: bool = False, auto_hide_a
         <div class="dock-pulse"></div>
     """
 
-    # --- Render download buttons inside dock ---
-    st.markdown(dock_html, unsafe_allow_html=True)
-
-    for file_path, label in file_paths:
-        if os.path.exists(file_path):
-            with open(file_path, "rb") as f:
-                st.download_button(
-                    label=label,
-                    data=f,
-                    file_name=os.path.basename(file_path),
-                    mime="application/octet-stream",
-                    key=f"dl_{os.path.basename(file_path)}",
-                )
-
-    # --- Close the dock safely ---
-    st.markdown("</div>", unsafe_allow_html=True)
+    # --- Static links for stored outputs go straight into the dock HTML ---
+    store = get_output_store()
+    lazy = []
+    for entry in file_paths:
+        file_path, label = entry[0], entry[1]
+        if not os.path.exists(file_path):
+            continue
+        file_name = entry[2] if len(entry) > 2 else os.path.basename(file_path)
+        url = store.url_for(file_path) if store.contains(file_path) else None
+        if url:
+            dock_html += (f'<a class="dock-link" href="{html.escape(url)}" '
+                          f'download="{html.escape(file_name)}">{html.escape(label)}</a>')
+        else:
+            lazy.append((file_path, label, file_name))
+
+    st.markdown(dock_html + "</div>", unsafe_allow_html=True)
+
+    for path, label, file_name in lazy:
+        render_lazy_download(path, label, file_name, key=f"dl_{os.path.basename(path)}")
 
     # --- Auto-hide with JS ---
     st.markdown(f"""
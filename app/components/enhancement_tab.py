@@ -1,35 +1,40 @@
+import html
 import streamlit as st
 import os
-import time
 from src.image_utils.enhancement import enhance_image_cv2
 from app.components.status_bar import set_status
+from app.result_cache import cached_result, store_result
+from app.output_store import get_output_store
+from app.components.download_dock import render_lazy_download
 
 
-def render_enhancement_tab(upload, samples_dir):
+def render_enhancement_tab(upload, samples_dir, temp_path, upload_hash):
     """Render the image enhancement section with frosted-glass cards, glow buttons, and smooth status sync."""
 
     if not upload or not upload.type.startswith("image/"):
         st.warning("⚠️ Please upload an image for enhancement.")
         return
 
-    # --- File paths ---
-    temp_path = os.path.join(samples_dir, f"temp_{upload.name.replace(' ', '_')}")
-    output_path = os.path.join(samples_dir, "enhanced_result.jpg")
+    # --- Outputs go to the content-addressed store, so sessions never overwrite each other ---
+    store = get_output_store()
+
+    def enhance():
+        scratch_path = store.new_path(".jpg")
+        enhance_image_cv2(temp_path, scratch_path)
+        return store.commit(scratch_path)
 
     try:
         # --- STATUS PROGRESSION ---
-        set_status("🧠 Preparing image enhancement model...", progress=10, context="enhancement")
-
-        time.sleep(0.4)
-        set_status("⏳ Enhancing image quality...", progress=40)
+        set_status("⏳ Enhancing image quality...", progress=40, context="enhancement")
 
         with st.spinner("✨ Enhancing image quality..."):
-            enhance_image_cv2(temp_path, output_path)
-        time.sleep(0.4)
+            output_path, cached = cached_result("enhancement", upload_hash, enhance)
+        if not os.path.exists(output_path):
+            # The stored output was evicted; re-enhance once and cache the new path
+            output_path, cached = enhance(), False
+            store_result("enhancement", upload_hash, output_path)
 
-        set_status("✨ Refining details...", progress=80)
-        time.sleep(0.4)
-        set_status("✅ Enhancement complete!", progress=100)
+        set_status("✅ Enhancement complete!" + (" (cached)" if cached else ""), progress=100)
 
         # --- DISPLAY ENHANCEMENT RESULTS ---
         st.markdown("### 🖼 Image Enhancement Results")
@@ -126,20 +131,21 @@ def render_enhancement_tab(upload, samples_dir):
             (output_path, "⬇ Download Enhanced Image"),
             (temp_path, "⬇ Download Original Image")
         ]
+        names = [f"enhanced_{os.path.splitext(upload.name)[0]}.jpg", upload.name]
         for i, (path, label) in enumerate(files):
             if os.path.exists(path):
-                with open(path, "rb") as f:
-                    cols[i].download_button(
-                        label=label,
-                        data=f,
-                        file_name=os.path.basename(path),
-                        mime="application/octet-stream",
-                        use_container_width=True,
+                # Static link for the stored output; the upload itself is never made public
+                url = store.url_for(path) if store.contains(path) else None
+                if url:
+                    cols[i].markdown(
+                        f'<a href="{html.escape(url, quote=True)}" download="{html.escape(names[i], quote=True)}">'
+                        f'{label}</a>',
+                        unsafe_allow_html=True,
                     )
+                else:
+                    render_lazy_download(path, label, names[i], key=f"enh_{i}_{upload_hash[:12]}", container=cols[i])
         st.markdown("</div>", unsafe_allow_html=True)
 
-        # Delay before idle fade
-        time.sleep(1)
         set_status("🧠 Models Loaded and Ready", progress=0)
 
     except Exception as e:
@@ -2,25 +2,20 @@
 import streamlit as st
 import datetime
 import platform
-import psutil
-import GPUtil
+from src.utils.system_metrics import get_sampler, sparkline
 
 def get_system_metrics():
-    cpu = psutil.cpu_percent(interval=0.4)
-    mem = psutil.virtual_memory().percent
-    gpu_info = "GPU: Not detected"
-    try:
-        gpus = GPUtil.getGPUs()
-        if gpus:
-            gpu = gpus[0]
-            gpu_info = f"{gpu.name} ({gpu.load * 100:.1f}% load)"
-    except Exception:
-        pass
-    return cpu, mem, gpu_info
+    """Latest snapshot from the background sampler — never blocks the rerun."""
+    sampler = get_sampler()
+    snap = sampler.latest()
+    if snap is None:
+        return 0.0, 0.0, sampler.gpu_info, 0.0, 0, ""
+    cpu_trend = sparkline(sampler.series("cpu")[-20:], lo=0, hi=100)
+    return snap["cpu"], snap["mem"], snap["gpu"], snap["rss"] / 1024 ** 2, snap["queue"], cpu_trend
 
 def render_footer(theme_dark=False):
     """Frosted footer pinned to bottom — safe layout with glow pulse."""
-    cpu, mem, gpu_info = get_system_metrics()
+    cpu, mem, gpu_info, rss_mb, queue, cpu_trend = get_system_metrics()
     year = datetime.datetime.now().year
     python_ver = platform.python_version()
     system_name = platform.system()
@@ -79,8 +74,9 @@ def render_footer(theme_dark=False):
         <a href="https://streamlit.io" target="_blank">Streamlit</a></p>
         <p>⚙️ {system_name} | Python {python_ver} | © {year}</p>
         <div class="metric-box">
-            <span>🧮 CPU {cpu:.1f}%</span>
-            <span>💾 Memory {mem:.1f}%</span>
+            <span>🧮 CPU {cpu:.1f}% {cpu_trend}</span>
+            <span>💾 Memory {mem:.1f}% (app {rss_mb:.0f} MB)</span>
+            <span>📥 Queue {queue}</span>
             <span>🎮 {gpu_info}</span>
         </div>
     </div>
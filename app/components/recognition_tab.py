@@ -1,31 +1,29 @@
 import streamlit as st
-import os
-import time
 from src.image_utils.recognition import ImageRecognition
 from app.components.status_bar import set_status
 from app.components.download_dock import render_download_dock
+from app.result_cache import cached_result
 
 
-def render_recognition_tab(upload, samples_dir, recognizer: ImageRecognition):
-    """Render the Image Recognition tab with consistent theme, status bar, and download dock."""
+def render_recognition_tab(upload, samples_dir, recognizer: ImageRecognition, temp_path, upload_hash, categories=None):
+    """
+    Render the Image Recognition tab with consistent theme, status bar, and download dock.
+    categories: optional zero-shot category head (ensemble_loader.load_category_head).
+    """
     if not upload or not upload.type.startswith("image/"):
         st.warning("⚠️ Please upload a valid image for recognition.")
         return
 
-    # --- File handling ---
-    temp_path = os.path.join(samples_dir, f"temp_{upload.name.replace(' ', '_')}")
-
     try:
         # --- Smart status updates ---
-        set_status("🧠 Initializing recognition model...", progress=15, context="recognition")
-        time.sleep(0.4)
-
-        set_status("🔍 Analyzing uploaded image...", progress=50)
+        set_status("🔍 Analyzing uploaded image...", progress=50, context="recognition")
         with st.spinner("🧠 Identifying image content..."):
-            label, prob = recognizer.predict(temp_path)
-        time.sleep(0.3)
+            (label, prob), cached = cached_result("recognition", upload_hash, lambda: recognizer.predict(temp_path))
+            category_scores = None
+            if categories is not None:
+                category_scores, _ = cached_result("categories", upload_hash, lambda: categories.scores(temp_path))
 
-        set_status("✅ Image recognition complete!", progress=100)
+        set_status("✅ Image recognition complete!" + (" (cached)" if cached else ""), progress=100)
 
         # --- Display results ---
         st.markdown("### 🖼 Image Recognition Results")
@@ -37,17 +35,21 @@ def render_recognition_tab(upload, samples_dir, recognizer: ImageRecognition):
         with col2:
             st.metric("Predicted Label", label)
             st.metric("Confidence", f"{prob:.2%}")
+            if category_scores:
+                top = max(category_scores, key=category_scores.get)
+                st.metric("Content Category", top, f"{category_scores[top]:.2%}", delta_color="off")
+                with st.expander("🏷 All categories"):
+                    for name, score in sorted(category_scores.items(), key=lambda item: -item[1]):
+                        st.caption(f"**{name}** — {score:.2%}")
             st.success("✅ Recognition complete!")
 
         # --- Floating Download Dock (aligned bottom-right) ---
         render_download_dock(
-            file_paths=[(temp_path, "⬇ Download Analyzed Image")],
+            file_paths=[(temp_path, "⬇ Download Analyzed Image", upload.name)],
             theme_dark=st.session_state.get("dark_mode", False),
             auto_hide_after=6.0
         )
 
-        # Keep status bar visible briefly before fading
-        time.sleep(1)
         set_status("🧠 Models Loaded and Ready", progress=0)
 
     except Exception as e:
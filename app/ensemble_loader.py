@@ -1,4 +1,7 @@
 # ensemble_loader.py
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 import torch
 from transformers import (
     AutoProcessor, AutoModelForImageClassification,
@@ -6,32 +9,54 @@ from transformers import (
 )
 from PIL import Image
 import numpy as np
+from src.image_utils.face_detection import FaceDetector
+from src.utils.compiled_models import compile_model
+from src.utils.model_registry import MEMBER_MODELS, load_pretrained
+from src.ensemble.calibration import load_calibrators
+from src.ensemble.detectors import (
+    CLIP_PROMPTS, ClipZeroShotDetector, ImageClassifierDetector, MediaRequest, face_crops, register_detector,
+)
+from src.ensemble.ensemble_config import load_ensemble_config
+from src.ensemble.fusion import FusionEngine
+from src.image_utils.clip_embeddings import ClipEmbeddingService
+
+# Zero-shot content categories served from the CLIP embedding (label → prompt)
+CATEGORY_PROMPTS = {
+    "person": "a photo of a person",
+    "group": "a photo of a group of people",
+    "vehicle": "a photo of a car or other vehicle",
+    "animal": "a photo of an animal",
+    "document": "a photo of a document or text",
+    "screenshot": "a screenshot of a computer or phone screen",
+    "landscape": "a photo of a landscape or outdoor scene",
+    "artwork": "a drawing, painting or digital artwork",
+}
 
 # ------------------------------------------------------------
 # 1️⃣  EfficientViT Model
 # ------------------------------------------------------------
 def load_efficientvit():
-    model_id = "Wvolf/ViT_Deepfake_Detection"
-    processor = AutoProcessor.from_pretrained(model_id)
-    model = AutoModelForImageClassification.from_pretrained(model_id)
+    model_id = MEMBER_MODELS["EfficientViT"]
+    processor = load_pretrained(AutoProcessor, model_id)
+    model = load_pretrained(AutoModelForImageClassification, model_id)
     return processor, model
 
 # ------------------------------------------------------------
 # 2️⃣  CLIP-based Multimodal Detector
 # ------------------------------------------------------------
 def load_clip_detector():
-    model_id = "openai/clip-vit-base-patch16"
-    processor = CLIPProcessor.from_pretrained(model_id)
-    model = CLIPModel.from_pretrained(model_id)
+    model_id = MEMBER_MODELS["CLIP"]
+    processor = load_pretrained(CLIPProcessor, model_id)
+    model = load_pretrained(CLIPModel, model_id)
     return processor, model
 
 # ------------------------------------------------------------
 # 3️⃣  XceptionNet++ (Hugging Face Deepfake Model)
 # ------------------------------------------------------------
 def load_xception():
-    model_id = "prithivMLmods/Deep-Fake-Detector-v2-Model"
-    processor = AutoProcessor.from_pretrained(model_id)
-    model = AutoModelForImageClassification.from_pretrained(model_id)
+    model_id = MEMBER_MODELS["Xception++"]
+    processor = load_pretrained(AutoProcessor, model_id)
+    model = load_pretrained(AutoModelForImageClassification, model_id)
     return processor, model
 
 # ------------------------------------------------------------
@@ -42,75 +67,189 @@ def load_fakeavceleb():
     return None, None
 
 
+# Ensemble key → loader returning (processor, model)
+MEMBER_LOADERS = {
+    "efficientvit": load_efficientvit,
+    "clip": load_clip_detector,
+    "xception": load_xception,
+}
+
+
 # ============================================================
 # ENSEMBLE INITIALIZATION
 # ============================================================
-def init_ensemble(device=None):
-    """Load all ensemble models with processors and return dictionary."""
+def init_ensemble(device=None, face_crop=False, compile_backend=None, model_manager=None):
+    """
+    Load all ensemble models with processors and return dictionary.
+    compile_backend: optional 'inductor' or 'torchscript' to compile each model once at load
+    (defaults to the MODEL_COMPILE_BACKEND environment variable).
+    model_manager: optional ModelManager — models then load on first use and can be
+    evicted under its memory budget (entries become lazy (processor, model) pairs).
+    """
     device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    compile_backend = compile_backend or os.environ.get("MODEL_COMPILE_BACKEND") or None
 
-    eff_proc, eff_model = load_efficientvit()
-    clip_proc, clip_model = load_clip_detector()
-    xcep_proc, xcep_model = load_xception()
-
-    eff_model.to(device)
-    clip_model.to(device)
-    xcep_model.to(device)
+    members = {}
+    for key in MEMBER_LOADERS:
+        load = lambda key=key: _load_member(key, device, compile_backend)
+        members[key] = load() if model_manager is None else model_manager.lazy(f"image_ensemble.{key}", load)
 
     return {
         "device": device,
-        "efficientvit": (eff_proc, eff_model),
-        "clip": (clip_proc, clip_model),
-        "xception": (xcep_proc, xcep_model)
+        **members,
+        "face_detector": FaceDetector() if face_crop else None,
+        # One CLIP image embedding per upload serves the detector and every zero-shot head
+        "clip_embeddings": ClipEmbeddingService(members["clip"], device),
+        **tuned_settings(),
     }
 
+
+def _load_member(key, device, compile_backend=None):
+    """(processor, model) for one ensemble member, on `device` and optionally compiled."""
+    proc, model = MEMBER_LOADERS[key]()
+    model.to(device)
+    if compile_backend:
+        model = _compile_member(key, proc, model, device, compile_backend)
+    return proc, model
+
+
+def tuned_settings():
+    """Weights, threshold and per-model calibrators from the tuned config (else defaults)."""
+    config = load_ensemble_config("image_ensemble")
+    return {
+        "weights": tuple(config["weights"]),
+        "threshold": config["threshold"],
+        "calibrators": load_calibrators("image_ensemble"),
+    }
+
+def _compile_member(key, proc, model, device, backend):
+    dummy = Image.new("RGB", (224, 224))
+    if key == "clip" and backend == "inductor":
+        # The detector calls get_image_features, which a compiled wrapper of the whole
+        # model would run eagerly — compile the vision tower it goes through instead
+        inputs = proc(images=[dummy], return_tensors="pt").to(device)
+        model.vision_model = compile_model(model.vision_model, dict(inputs), backend=backend)
+        return model
+    if key == "clip":
+        inputs = proc(text=CLIP_PROMPTS, images=[dummy], return_tensors="pt", padding=True).to(device)
+        traced = compile_model(model, dict(inputs), backend=backend, output_names=("logits_per_image",))
+        # The trace only computes logits_per_image; zero-shot heads embed through the eager model
+        traced.source = model
+        return traced
+    inputs = proc(images=[dummy], return_tensors="pt").to(device)
+    return compile_model(model, dict(inputs), backend=backend)
+
 # ============================================================
 # ENSEMBLE PREDICTION FUNCTION
 # ============================================================
-def predict_deepfake(image_path, ensemble, weights=(0.3, 0.3, 0.4)):
-    """Combine predictions from EfficientViT, CLIP, and Xception++"""
-    device = ensemble["device"]
-    image = Image.open(image_path).convert("RGB")
-
-    scores = []
-
-    # EfficientViT
-    proc, model = ensemble["efficientvit"]
-    inputs = proc(images=image, return_tensors="pt").to(device)
-    outputs = model(**inputs)
-    score_eff = torch.softmax(outputs.logits, dim=-1)[0, 1].item()
-    scores.append(score_eff)
-
-    # CLIP
-    proc, model = ensemble["clip"]
-    clip_inputs = proc(text=["a real face", "a fake face"], images=image, return_tensors="pt", padding=True).to(device)
-    clip_outputs = model(**clip_inputs)
-    logits_per_image = clip_outputs.logits_per_image.softmax(dim=-1)
-    score_clip = logits_per_image[0, 1].item()
-    scores.append(score_clip)
-
-    # Xception++
-    proc, model = ensemble["xception"]
-    inputs = proc(images=image, return_tensors="pt").to(device)
-    outputs = model(**inputs)
-    score_xcep = torch.softmax(outputs.logits, dim=-1)[0, 1].item()
-    scores.append(score_xcep)
-
-    # Weighted ensemble average
-    final_score = np.average(scores, weights=weights)
-    label = "FAKE" if final_score > 0.5 else "REAL"
+# Members of the "image_ensemble" config section; costs order the cascade
+@register_detector("EfficientViT")
+def _efficientvit_detector(ensemble):
+    return ImageClassifierDetector("EfficientViT", ensemble["efficientvit"], ensemble["device"], cost=1.0)
+
+
+@register_detector("CLIP")
+def _clip_detector(ensemble):
+    return ClipZeroShotDetector("CLIP", ensemble["clip"], ensemble["device"], cost=1.4,
+                                embeddings=clip_embeddings(ensemble))
+
+
+@register_detector("Xception++")
+def _xception_detector(ensemble):
+    return ImageClassifierDetector("Xception++", ensemble["xception"], ensemble["device"], cost=1.0)
+
+
+def _face_batch(image, ensemble):
+    """Crop faces when the ensemble was built with face_crop=True, else the full frame."""
+    return face_crops(image, ensemble.get("face_detector"))
+
+
+def clip_embeddings(ensemble):
+    """The ensemble's CLIP embedding service, shared by the CLIP detector and zero-shot heads."""
+    if "clip_embeddings" not in ensemble:
+        ensemble["clip_embeddings"] = ClipEmbeddingService(ensemble["clip"], ensemble["device"])
+    return ensemble["clip_embeddings"]
+
+
+def category_head(ensemble, categories=CATEGORY_PROMPTS):
+    """
+    Zero-shot content categories from the same cached CLIP embedding as the deepfake
+    check. Has ImageRecognition's predict() interface; scores() gives every category.
+    """
+    return clip_embeddings(ensemble).head("categories", list(categories.values()), labels=list(categories))
+
+
+def load_category_head(device=None, model_manager=None, categories=CATEGORY_PROMPTS):
+    """
+    category_head() without the rest of the ensemble, for the recognition tab and the
+    /recognize endpoint. With a model_manager CLIP loads on first use and is evictable.
+    """
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    load = lambda: _load_member("clip", device)
+    pair = load() if model_manager is None else model_manager.lazy("categories.clip", load)
+    return category_head({"clip": pair, "device": device}, categories)
+
+
+def fusion_engine(ensemble):
+    """The ensemble's FusionEngine, built on first use (also for hand-built ensemble dicts)."""
+    if "weights" not in ensemble:
+        ensemble.update(tuned_settings())  # hand-built ensemble dicts
+    if "engine" not in ensemble:
+        ensemble["engine"] = FusionEngine.from_config(
+            "image_ensemble", ensemble, weights=ensemble["weights"], threshold=ensemble["threshold"],
+            calibrators=ensemble["calibrators"],
+        )
+    return ensemble["engine"]
+
+
+def predict_deepfake(image_path, ensemble, weights=None, cascade=False, threshold=None):
+    """
+    Combine predictions from EfficientViT, CLIP, and Xception++.
+    Unset weights/threshold come from the ensemble (tuned config, else defaults).
+    cascade=True runs the models cheapest-first and stops as soon as the
+    remaining weight can no longer move the score across `threshold`.
+    """
+    engine = fusion_engine(ensemble)
+    # Each model scores the whole face batch; the most suspicious face counts
+    request = MediaRequest(image_path=image_path, face_detector=ensemble.get("face_detector"))
+    fused = engine.run(request, weights=weights or ensemble["weights"],
+                       threshold=ensemble["threshold"] if threshold is None else threshold, cascade=cascade)
 
     return {
-        "score": final_score,
-        "label": label,
+        "score": fused["score"],
+        "label": "FAKE" if fused["is_fake"] else "REAL",
         "sub_scores": {
-            "EfficientViT": score_eff,
-            "CLIP": score_clip,
-            "Xception++": score_xcep
+            detector.name: fused["sub_scores"].get(detector.name) for detector in engine.detectors
         }
     }
 
 
+def batch_scorers(ensemble):
+    """
+    {model name: fn(list of PIL images) -> fake scores} for offline evaluation.
+    With face cropping on, every face of every image goes through the model in one
+    batch and each image keeps its most suspicious face, as in predict_deepfake.
+    Scores are uncalibrated (calibration is fitted on them).
+    """
+    def make(detector):
+        def score(images):
+            groups = [_face_batch(image, ensemble) for image in images]
+            flat = [crop for group in groups for crop in group]
+            raw = detector.score(flat)[:, 1]
+            bounds = np.cumsum([0] + [len(g) for g in groups])
+            return np.array([raw[a:b].max() for a, b in zip(bounds[:-1], bounds[1:])])
+        return score
+
+    # Ordered like the `weights` tuple of predict_deepfake
+    return {detector.name: make(detector) for detector in fusion_engine(ensemble).detectors}
+
+
+def cascade_report(ensemble):
+    """Per-stage run/skip counts collected by predict_deepfake (skips come from cascade=True)."""
+    report = fusion_engine(ensemble).report()
+    report["images"] = report.pop("requests")
+    return report
+
 
 #download sample image automatically
 
@@ -129,3 +268,4 @@ if __name__ == "__main__":
     ensemble = init_ensemble()
     result = predict_deepfake(image_path, ensemble)
     print(result)
+    print(category_head(ensemble).scores(image_path))
@@ -0,0 +1,110 @@
+# app/output_store.py
+# Content-addressed store for generated outputs (enhanced images, future videos).
+# Files live under app/static/outputs/<sha256><ext>, so with Streamlit's static
+# serving enabled they are downloaded straight from /app/static/... and never
+# read by the script. Only generated outputs go here — uploads stay private to
+# their session and are downloaded through st.download_button. The store is
+# bounded: files older than OUTPUT_STORE_MAX_AGE_HOURS (default 24) are removed
+# and the oldest go first once it exceeds OUTPUT_STORE_MAX_MB (default 2048).
+
+import os
+import tempfile
+import threading
+import time
+
+import streamlit as st
+
+from src.utils.hashing import file_digest
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+OUTPUTS_DIR = os.path.join(STATIC_DIR, "outputs")
+
+
+class OutputStore:
+    def __init__(self, root=OUTPUTS_DIR, max_bytes=None, max_age=None):
+        """max_bytes / max_age (seconds) default to OUTPUT_STORE_MAX_MB / OUTPUT_STORE_MAX_AGE_HOURS."""
+        self.root = root
+        self.max_bytes = max_bytes if max_bytes is not None else \
+            int(float(os.environ.get("OUTPUT_STORE_MAX_MB", 2048)) * 1024 ** 2)
+        self.max_age = max_age if max_age is not None else \
+            float(os.environ.get("OUTPUT_STORE_MAX_AGE_HOURS", 24)) * 3600
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def new_path(self, ext):
+        """Scratch path inside the store to generate an output into (then commit it)."""
+        fd, path = tempfile.mkstemp(dir=self.root, suffix=f".part{ext}")
+        os.close(fd)
+        return path
+
+    def commit(self, tmp_path):
+        """Move a generated file to its content address and return the stored path."""
+        ext = os.path.splitext(tmp_path)[1].lower()
+        stored = os.path.join(self.root, f"{file_digest(tmp_path)}{ext}")
+        if os.path.exists(stored):
+            os.remove(tmp_path)
+            os.utime(stored)  # re-generated: counts as fresh for eviction
+        else:
+            os.replace(tmp_path, stored)
+        self.evict(keep=stored)
+        return stored
+
+    def contains(self, path):
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.root)
+
+    def evict(self, keep=None):
+        """Drop expired outputs, then the oldest until the store fits max_bytes; returns the count removed."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for entry in os.scandir(self.root):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for mtime, size, path in entries:
+                expired = now - mtime > self.max_age
+                if path == keep or not (expired or total > self.max_bytes):
+                    continue
+                # Scratch files are only fair game once they are clearly abandoned
+                if ".part" in os.path.basename(path) and not expired:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            return removed
+
+    def url_for(self, stored_path):
+        """Static route for a stored file, or None when static serving is disabled."""
+        if not st.get_option("server.enableStaticServing"):
+            return None
+        rel = os.path.relpath(stored_path, STATIC_DIR).replace(os.sep, "/")
+        return f"app/static/{rel}"
+
+    @staticmethod
+    def read_bytes(path):
+        """
+        Whole contents of a file for st.download_button, which needs the payload in
+        memory: one full read, done only once the user asked for that file.
+        """
+        with open(path, "rb") as f:
+            return f.read()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_output_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = OutputStore()
+        return _store
@@ -0,0 +1,98 @@
+# app/result_cache.py
+# Memoizes inference results per (task, upload hash) so Streamlit reruns —
+# theme toggles, tab switches, widget clicks — re-render instead of re-running models.
+# Tier 1 lives in st.session_state; tier 2 is an optional process-wide LRU shared
+# by every session (identical uploads from different users hit it too).
+
+import collections
+import threading
+
+import streamlit as st
+
+SESSION_MAX_ENTRIES = 32
+
+
+class SharedResultCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+# Module-level, so one instance per server process
+SHARED_RESULTS = SharedResultCache()
+
+
+def cached_result(task, upload_hash, compute, params=(), shared=True):
+    """
+    Return (result, from_cache) for `task` on the upload identified by `upload_hash`,
+    calling `compute()` only on a miss in both tiers.
+    """
+    key = (task, upload_hash, tuple(params))
+    session_cache = st.session_state.setdefault("result_cache", collections.OrderedDict())
+
+    if key in session_cache:
+        session_cache.move_to_end(key)
+        return session_cache[key], True
+
+    value = SHARED_RESULTS.get(key) if shared else None
+    from_cache = value is not None
+    if not from_cache:
+        value = compute()
+        if shared:
+            SHARED_RESULTS.put(key, value)
+
+    _remember(session_cache, key, value)
+    return value, from_cache
+
+
+def _remember(session_cache, key, value):
+    session_cache[key] = value
+    session_cache.move_to_end(key)
+    while len(session_cache) > SESSION_MAX_ENTRIES:
+        session_cache.popitem(last=False)
+
+
+def store_result(task, upload_hash, value, params=(), shared=True):
+    """Replace the stored result for (task, upload), e.g. after its output file was pruned."""
+    key = (task, upload_hash, tuple(params))
+    _remember(st.session_state.setdefault("result_cache", collections.OrderedDict()), key, value)
+    if shared:
+        SHARED_RESULTS.put(key, value)
+
+
+def lookup_result(task, upload_hash, params=(), shared=True):
+    """Stored result for (task, upload) without computing anything, or None."""
+    key = (task, upload_hash, tuple(params))
+    session_cache = st.session_state.get("result_cache", {})
+    if key in session_cache:
+        return session_cache[key]
+    return SHARED_RESULTS.get(key) if shared else None
+
+
+def clear_results():
+    """Drop this session's results and the shared tier."""
+    st.session_state.pop("result_cache", None)
+    SHARED_RESULTS.clear()
@@ -1,71 +1,79 @@
 # test_ensemble_accuracy.py
-import os
-import numpy as np
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
-from tqdm import tqdm
-from ensemble_loader import init_ensemble, predict_deepfake
-from PIL import Image
-import requests
+# Offline accuracy evaluation of the image ensemble on a local labeled manifest.
+#
+#   python app/test_ensemble_accuracy.py --manifest samples_test/manifest.csv
+#   python app/test_ensemble_accuracy.py --weights 0.2 0.2 0.6 --threshold 0.4   # re-uses cached scores
+#
+# The manifest is a CSV with `path,label` columns (label 0/1 or real/fake).
+# Per-model scores are cached by file content under data/eval/, so only new or
+# changed images are ever run through the models again.
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# ------------------------------------------------------------
-# STEP 1 — Load ensemble
-# ------------------------------------------------------------
-ensemble = init_ensemble()
+import argparse
 
-# ------------------------------------------------------------
-# STEP 2 — Sample image set (you can later replace with dataset)
-# ------------------------------------------------------------
-os.makedirs("samples_test", exist_ok=True)
+from src.ensemble.calibration import apply_calibration, load_calibrators
+from src.ensemble.ensemble_config import load_ensemble_config
+from src.ensemble.evaluation import read_manifest, ScoreCache, collect_scores, compute_metrics, score_key
 
-# Download small demo dataset (2 real + 2 fake)
-sample_images = {
-    "real1.jpg": "https://upload.wikimedia.org/wikipedia/commons/9/99/Sample_User_Icon.png",
-    "real2.jpg": "https://upload.wikimedia.org/wikipedia/commons/3/34/Face_of_a_man.jpg",
-    "fake1.jpg": "https://huggingface.co/datasets/prithivMLmods/fakeface-dataset/resolve/main/fakeface_1.jpg",
-    "fake2.jpg": "https://huggingface.co/datasets/prithivMLmods/fakeface-dataset/resolve/main/fakeface_2.jpg"
-}
+EVAL_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "eval")
 
-for name, url in sample_images.items():
-    path = f"samples_test/{name}"
-    if not os.path.exists(path):
-        Image.open(requests.get(url, stream=True).raw).convert("RGB").save(path)
 
-# Labels: 0 = Real, 1 = Fake
-test_data = [
-    ("samples_test/real1.jpg", 0),
-    ("samples_test/real2.jpg", 0),
-    ("samples_test/fake1.jpg", 1),
-    ("samples_test/fake2.jpg", 1)
-]
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the deepfake ensemble on a labeled manifest")
+    parser.add_argument("--manifest", default="samples_test/manifest.csv", help="CSV with path,label columns")
+    parser.add_argument("--weights", type=float, nargs=3, metavar=("EFFICIENTVIT", "CLIP", "XCEPTION"),
+                        help="defaults to the tuned config")
+    parser.add_argument("--threshold", type=float, help="defaults to the tuned config")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4, help="threads for hashing and image decoding")
+    parser.add_argument("--face-crop", action="store_true")
+    parser.add_argument("--compile", choices=["inductor", "torchscript"], default=None,
+                        help="compile the models once at load (cached separately from eager scores)")
+    parser.add_argument("--cache", default=os.path.join(EVAL_DIR, "scores.json"), help="per-model score cache")
+    args = parser.parse_args()
 
-# ------------------------------------------------------------
-# STEP 3 — Run predictions
-# ------------------------------------------------------------
-y_true, y_pred, scores = [], [], []
+    items = read_manifest(args.manifest)
+    cache = ScoreCache(args.cache)
 
-print("🔍 Running ensemble inference...")
-for img_path, label in tqdm(test_data):
-    result = predict_deepfake(img_path, ensemble)
-    y_true.append(label)
-    y_pred.append(1 if result["label"] == "FAKE" else 0)
-    scores.append(result["score"])
+    # Models load lazily: nothing is initialized when every score is already cached
+    state = {}
 
-# ------------------------------------------------------------
-# STEP 4 — Compute metrics
-# ------------------------------------------------------------
-acc = accuracy_score(y_true, y_pred)
-prec = precision_score(y_true, y_pred, zero_division=0)
-rec = recall_score(y_true, y_pred, zero_division=0)
-f1 = f1_score(y_true, y_pred, zero_division=0)
-cm = confusion_matrix(y_true, y_pred)
+    def scorer(name):
+        def score(images):
+            if "scorers" not in state:
+                from app.ensemble_loader import init_ensemble, batch_scorers
+                print("🔍 Loading ensemble for uncached images...")
+                state["scorers"] = batch_scorers(init_ensemble(face_crop=args.face_crop, compile_backend=args.compile))
+            return state["scorers"][name](images)
+        return score
 
-# ------------------------------------------------------------
-# STEP 5 — Display results
-# ------------------------------------------------------------
-print("\n🎯 Ensemble Deepfake Detection Results")
-print(f"Accuracy:  {acc:.3f}")
-print(f"Precision: {prec:.3f}")
-print(f"Recall:    {rec:.3f}")
-print(f"F1 Score:  {f1:.3f}")
-print(f"Confusion Matrix:\n{cm}")
-print(f"\nAverage Score: {np.mean(scores):.3f}")
+    scorers = {
+        score_key(name, args.face_crop, args.compile): scorer(name) for name in ("EfficientViT", "CLIP", "Xception++")
+    }
+
+    def progress(model, done, total):
+        print(f"  {model}: {done}/{total}", end="\r" if done < total else "\n")
+
+    scores, labels, _ = collect_scores(items, scorers, cache, args.batch_size, args.workers, progress)
+    config = load_ensemble_config("image_ensemble")
+    # Weights and threshold were tuned on calibrated scores, so evaluate the same fusion the app runs
+    calibrators = load_calibrators("image_ensemble")
+    scores = apply_calibration(scores, config["members"], calibrators)
+    weights = args.weights or config["weights"]
+    threshold = config["threshold"] if args.threshold is None else args.threshold
+    metrics = compute_metrics(scores, labels, weights, threshold)
+
+    calibrated = f"calibrated: {', '.join(sorted(calibrators))}" if calibrators else "uncalibrated"
+    print(f"\n🎯 Ensemble Deepfake Detection Results ({len(labels)} images, {calibrated} scores)")
+    print(f"Accuracy:  {metrics['accuracy']:.3f}")
+    print(f"Precision: {metrics['precision']:.3f}")
+    print(f"Recall:    {metrics['recall']:.3f}")
+    print(f"F1 Score:  {metrics['f1']:.3f}")
+    print(f"ROC AUC:   {metrics['auc']:.3f}")
+    print(f"Confusion Matrix [[TN, FP], [FN, TP]]: {metrics['confusion_matrix']}")
+    print(f"\nAverage Score: {metrics['mean_score']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
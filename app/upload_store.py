@@ -0,0 +1,119 @@
+# app/upload_store.py
+# Per-session, content-addressed storage for Streamlit uploads.
+# Uploads are streamed to disk in chunks and named by their SHA-256, so identical
+# files are stored once; each file is refcounted by the sessions using it (and by
+# background jobs still reading it, see hold()) and removed only when the last one
+# lets go.
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+class _HashingWriter:
+    """File-like sink that hashes everything written through it."""
+
+    def __init__(self, f):
+        self.f = f
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.hasher.update(data)
+        self.size += len(data)
+        return self.f.write(data)
+
+
+class UploadStore:
+    def __init__(self, root, stale_after=6 * 3600):
+        self.root = root
+        self.stale_after = stale_after
+        self.refs = {}      # path -> set of holders (session ids, job holds)
+        self.sessions = {}  # session id -> {"key", "path", "digest", "seen"}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def save(self, upload, session_id):
+        """
+        Stream an UploadedFile to <root>/<sha256><ext> and return (path, digest).
+        Reruns with the same upload return the existing file without copying.
+        """
+        key = getattr(upload, "file_id", None) or (upload.name, upload.size)
+        with self._lock:
+            entry = self.sessions.get(session_id)
+            if entry and entry["key"] == key and os.path.exists(entry["path"]):
+                entry["seen"] = time.time()
+                return entry["path"], entry["digest"]
+
+        ext = os.path.splitext(upload.name)[1].lower()
+        upload.seek(0)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                writer = _HashingWriter(f)
+                shutil.copyfileobj(upload, writer, CHUNK_SIZE)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        digest = writer.hasher.hexdigest()
+        path = os.path.join(self.root, f"{digest}{ext}")
+
+        with self._lock:
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+            self._release_locked(session_id)
+            self.refs.setdefault(path, set()).add(session_id)
+            self.sessions[session_id] = {"key": key, "path": path, "digest": digest, "seen": time.time()}
+        self.prune_stale()
+        return path, digest
+
+    def release(self, session_id):
+        """Drop a session's reference (e.g. when its upload is cleared)."""
+        with self._lock:
+            self._release_locked(session_id)
+
+    def hold(self, path):
+        """
+        Keep a stored file alive for a background reader (e.g. a queued analysis job)
+        even after its sessions let go; returns the release callback (safe to call twice).
+        """
+        holder = f"hold:{uuid.uuid4().hex}"
+        with self._lock:
+            self.refs.setdefault(path, set()).add(holder)
+
+        def release():
+            with self._lock:
+                self._drop_locked(path, holder)
+        return release
+
+    def _release_locked(self, session_id):
+        entry = self.sessions.pop(session_id, None)
+        if entry is not None:
+            self._drop_locked(entry["path"], session_id)
+
+    def _drop_locked(self, path, holder):
+        holders = self.refs.get(path)
+        if holders is None or holder not in holders:
+            return
+        holders.discard(holder)
+        if not holders:
+            self.refs.pop(path, None)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def prune_stale(self):
+        """Release sessions that have not touched their upload for `stale_after` seconds."""
+        cutoff = time.time() - self.stale_after
+        with self._lock:
+            for session_id in [s for s, e in self.sessions.items() if e["seen"] < cutoff]:
+                self._release_locked(session_id)
@@ -0,0 +1,65 @@
+# benchmarks/compile_latency.py
+# Compare eager vs compiled latency for each detector of the image ensemble.
+# Usage: python benchmarks/compile_latency.py --backend torchscript --runs 20
+
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+from app.ensemble_loader import load_efficientvit, load_clip_detector, load_xception, CLIP_PROMPTS
+from src.utils.compiled_models import compile_model
+
+
+def time_forward(model, inputs, runs=20, warmup=3):
+    """Median / p90 latency in milliseconds for model(**inputs)."""
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(**inputs)
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            model(**inputs)
+            timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), float(np.percentile(timings, 90))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eager vs compiled detector latency")
+    parser.add_argument("--backend", default="inductor", choices=["inductor", "torchscript"])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    torch.set_grad_enabled(False)
+    image = Image.new("RGB", (224, 224), color=(128, 128, 128))
+    detectors = {
+        "EfficientViT": (load_efficientvit, {}),
+        "CLIP": (load_clip_detector, {"output_names": ("logits_per_image",)}),
+        "Xception++": (load_xception, {}),
+    }
+
+    print(f"{'model':<14}{'eager p50':>12}{'compiled p50':>15}{'compile s':>12}{'speedup':>10}")
+    for name, (loader, compile_kwargs) in detectors.items():
+        proc, model = loader()
+        model.eval()
+        if name == "CLIP":
+            inputs = dict(proc(text=CLIP_PROMPTS, images=[image], return_tensors="pt", padding=True))
+        else:
+            inputs = dict(proc(images=[image], return_tensors="pt"))
+
+        eager_p50, _ = time_forward(model, inputs, args.runs)
+        start = time.perf_counter()
+        compiled = compile_model(model, inputs, backend=args.backend, **compile_kwargs)
+        compile_s = time.perf_counter() - start
+        compiled_p50, _ = time_forward(compiled, inputs, args.runs)
+
+        print(f"{name:<14}{eager_p50:>10.1f}ms{compiled_p50:>13.1f}ms{compile_s:>12.1f}{eager_p50 / compiled_p50:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# benchmarks/fixtures.py
+# Synthetic media and tiny randomly initialized models so the benchmark suite
+# runs fully offline. Tiny configs keep the real code paths (processors, HF
+# forward passes, softmax/normalization) while making weights irrelevant.
+
+import json
+import os
+import wave
+
+import cv2
+import numpy as np
+import torch
+
+FIXTURE_SEED = 1234
+
+
+def make_image(path, size=(720, 1280), plate=True):
+    """Noisy gradient 'scene' with a face-like ellipse and a light plate rectangle."""
+    rng = np.random.default_rng(FIXTURE_SEED)
+    h, w = size
+    grad = np.linspace(40, 200, w, dtype=np.float32)[None, :, None]
+    img = np.clip(grad + rng.normal(0, 12, (h, w, 3)), 0, 255).astype(np.uint8)
+    cv2.ellipse(img, (w // 3, h // 3), (w // 12, h // 7), 0, 0, 360, (150, 170, 200), -1)
+    if plate:
+        x0, y0 = w // 2, int(h * 0.7)
+        cv2.rectangle(img, (x0, y0), (x0 + w // 5, y0 + h // 12), (235, 235, 235), -1)
+        cv2.rectangle(img, (x0, y0), (x0 + w // 5, y0 + h // 12), (0, 0, 0), 3)
+        cv2.putText(img, "AB12CD", (x0 + 10, y0 + h // 16), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 3)
+    cv2.imwrite(path, img)
+    return path
+
+
+def make_video(path, frames=96, size=(360, 640), fps=24):
+    """Moving-square clip with a hard cut halfway, written with OpenCV's mp4v codec."""
+    h, w = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    for i in range(frames):
+        frame = np.full((h, w, 3), 60 if i < frames // 2 else 180, dtype=np.uint8)
+        x = (i * 7) % (w - 80)
+        cv2.rectangle(frame, (x, h // 3), (x + 80, h // 3 + 80), (30, 200, 90), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def make_audio(path, seconds=3.0, sr=16000):
+    """Mono 16-bit sine sweep with noise."""
+    rng = np.random.default_rng(FIXTURE_SEED)
+    t = np.arange(int(seconds * sr)) / sr
+    signal = 0.4 * np.sin(2 * np.pi * (220 + 200 * t) * t) + 0.05 * rng.normal(size=t.shape)
+    pcm = (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes(pcm.tobytes())
+    return path
+
+
+def _tiny(**overrides):
+    base = dict(hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64)
+    base.update(overrides)
+    return base
+
+
+def tiny_image_classifier(num_labels=2):
+    from transformers import ViTConfig, ViTForImageClassification, ViTImageProcessor
+
+    torch.manual_seed(FIXTURE_SEED)
+    config = ViTConfig(**_tiny(image_size=224, patch_size=32, num_labels=num_labels))
+    return ViTForImageClassification(config).eval(), ViTImageProcessor(size={"height": 224, "width": 224})
+
+
+def tiny_video_classifier():
+    from transformers import VideoMAEConfig, VideoMAEForVideoClassification, VideoMAEImageProcessor
+
+    torch.manual_seed(FIXTURE_SEED)
+    config = VideoMAEConfig(**_tiny(image_size=224, patch_size=32, num_frames=16, tubelet_size=2, num_labels=2))
+    processor = VideoMAEImageProcessor(size={"shortest_edge": 224}, crop_size={"height": 224, "width": 224})
+    return VideoMAEForVideoClassification(config).eval(), processor
+
+
+def tiny_audio_classifier():
+    from transformers import Wav2Vec2Config, Wav2Vec2FeatureExtractor, Wav2Vec2ForSequenceClassification
+
+    torch.manual_seed(FIXTURE_SEED)
+    config = Wav2Vec2Config(**_tiny(
+        conv_dim=(32, 32, 32), conv_stride=(5, 4, 4), conv_kernel=(10, 8, 8),
+        num_conv_pos_embeddings=16, num_conv_pos_embedding_groups=2,
+        classifier_proj_size=16, num_labels=2,
+    ))
+    extractor = Wav2Vec2FeatureExtractor(feature_size=1, sampling_rate=16000, padding_value=0.0,
+                                         do_normalize=True, return_attention_mask=False)
+    return Wav2Vec2ForSequenceClassification(config).eval(), extractor
+
+
+def tiny_clip(workdir):
+    """Tiny CLIP with a throwaway BPE vocabulary written to `workdir`."""
+    from transformers import CLIPConfig, CLIPImageProcessor, CLIPModel, CLIPProcessor, CLIPTokenizer
+
+    words = ["a</w>", "real</w>", "fake</w>", "face</w>"]
+    vocab = {"<|startoftext|>": 0, "<|endoftext|>": 1}
+    vocab.update({w: i + 2 for i, w in enumerate(words)})
+    vocab_file = os.path.join(workdir, "vocab.json")
+    merges_file = os.path.join(workdir, "merges.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        json.dump(vocab, f)
+    with open(merges_file, "w", encoding="utf-8") as f:
+        f.write("#version: 0.2\n")
+    tokenizer = CLIPTokenizer(vocab_file, merges_file)
+
+    torch.manual_seed(FIXTURE_SEED)
+    config = CLIPConfig(
+        text_config=_tiny(vocab_size=len(vocab), max_position_embeddings=77),
+        vision_config=_tiny(image_size=224, patch_size=32),
+        projection_dim=16,
+    )
+    processor = CLIPProcessor(image_processor=CLIPImageProcessor(), tokenizer=tokenizer)
+    return CLIPModel(config).eval(), processor
+
+
+def tiny_loader_ensemble(workdir, device="cpu"):
+    """Dict in the shape returned by app.ensemble_loader.init_ensemble."""
+    return {
+        "device": device,
+        "efficientvit": tuple(reversed(tiny_image_classifier())),
+        "clip": tuple(reversed(tiny_clip(workdir))),
+        "xception": tuple(reversed(tiny_image_classifier())),
+        "face_detector": None,
+    }
@@ -0,0 +1,94 @@
+# benchmarks/harness.py
+# Timing, memory and baseline helpers shared by the benchmark suite.
+
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(fn, runs=20, warmup=3, items_per_call=1):
+    """Latency percentiles (ms), throughput (items/s) and peak RSS for repeated fn() calls."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return {
+        "runs": runs,
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p90_ms": float(np.percentile(timings, 90)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "mean_ms": float(timings.mean()),
+        "throughput_per_s": float(items_per_call * 1000 / timings.mean()),
+        "peak_rss_mb": peak_rss_bytes() / 1024 ** 2,
+    }
+
+
+def cpu_model():
+    """CPU model name (platform.processor() is often empty or just the architecture on Linux)."""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def environment():
+    """Hardware and software a baseline was measured on; latencies only compare on the same."""
+    import torch
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu": cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "gpu": torch.cuda.get_device_name(0) if torch.cuda.is_available() else None,
+        "torch": torch.__version__,
+        "threads": torch.get_num_threads(),
+    }
+
+
+def save_baseline(results, name="baseline"):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_baseline(name_or_path="baseline", with_environment=False):
+    """Saved results ({name: result}); with_environment=True returns (results, environment)."""
+    path = name_or_path if name_or_path.endswith(".json") else os.path.join(BASELINE_DIR, f"{name_or_path}.json")
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return (data["results"], data.get("environment", {})) if with_environment else data["results"]
+
+
+def compare(results, baseline, tolerance=0.15):
+    """Rows of (name, baseline p50, current p50, ratio, regressed) for entries present in both."""
+    rows = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base or "p50_ms" not in base or "p50_ms" not in current:
+            continue
+        ratio = current["p50_ms"] / base["p50_ms"]
+        rows.append((name, base["p50_ms"], current["p50_ms"], ratio, ratio > 1 + tolerance))
+    return rows
@@ -0,0 +1,219 @@
+# benchmarks/run.py
+# Offline speed benchmarks for every inference entry point.
+#
+#   python -m benchmarks.run                      # run everything, print a table
+#   python -m benchmarks.run --only image_model   # one benchmark
+#   python -m benchmarks.run --save baseline      # write benchmarks/baselines/baseline.json
+#   python -m benchmarks.run --compare baseline   # flag p50 regressions (exit code 1)
+#
+# Each benchmark runs in a fresh subprocess so peak RSS is per entry point.
+
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import multiprocessing as mp
+import queue
+import tempfile
+import time
+
+from benchmarks import fixtures
+from benchmarks.harness import measure, save_baseline, load_baseline, compare, environment
+
+
+def bench_image_model(workdir, runs):
+    from src.ensemble.image_model import ImageDeepfakeModel
+    model, processor = fixtures.tiny_image_classifier()
+    detector = ImageDeepfakeModel(device="cpu", model=model, processor=processor)
+    image = fixtures.make_image(os.path.join(workdir, "image.jpg"))
+    return measure(lambda: detector.predict(image), runs)
+
+
+def bench_image_model_tiled(workdir, runs):
+    from PIL import Image
+    from src.ensemble.image_model import ImageDeepfakeModel, plan_tiles
+    model, processor = fixtures.tiny_image_classifier()
+    detector = ImageDeepfakeModel(device="cpu", model=model, processor=processor)
+    image = fixtures.make_image(os.path.join(workdir, "image_4k.jpg"), size=(2160, 3840))
+    # items/s is tiles per second, counted from the plan predict_tiled uses (default budget)
+    with Image.open(image) as img:
+        tiles = sum(len(origins) for _, origins in plan_tiles(img.size))
+    return measure(lambda: detector.predict_tiled(image), max(3, runs // 4), warmup=1, items_per_call=tiles)
+
+
+def bench_video_model(workdir, runs):
+    from src.ensemble.video_model import VideoDeepfakeModel
+    model, processor = fixtures.tiny_video_classifier()
+    detector = VideoDeepfakeModel(device="cpu", model=model, processor=processor)
+    video = fixtures.make_video(os.path.join(workdir, "video.mp4"))
+    return measure(lambda: detector.predict(video), max(3, runs // 4), warmup=1)
+
+
+def bench_audio_model(workdir, runs):
+    from src.ensemble.audio_model import AudioDeepfakeModel
+    model, processor = fixtures.tiny_audio_classifier()
+    detector = AudioDeepfakeModel(device="cpu", model=model, processor=processor)
+    audio = fixtures.make_audio(os.path.join(workdir, "audio.wav"))
+    return measure(lambda: detector.predict(audio), runs)
+
+
+def _bench_video_decode(workdir, runs, backend):
+    from src.utils.video_decode import ThreadedFrameReader, available_backends, every_nth, open_decoder
+    if backend not in available_backends():
+        return {"skipped": f"{backend} backend not installed"}
+    video = fixtures.make_video(os.path.join(workdir, "video.mp4"), frames=240, size=(720, 1280))
+
+    def decode():
+        with ThreadedFrameReader(open_decoder(video, backend), every_nth(1)) as reader:
+            for _ in reader:
+                pass
+
+    # items/s is decoded RGB frames per second
+    return measure(decode, max(3, runs // 4), warmup=1, items_per_call=240)
+
+
+def bench_video_decode_pyav(workdir, runs):
+    return _bench_video_decode(workdir, runs, "pyav")
+
+
+def bench_video_decode_opencv(workdir, runs):
+    return _bench_video_decode(workdir, runs, "opencv")
+
+
+def bench_predict_deepfake(workdir, runs):
+    from app.ensemble_loader import predict_deepfake
+    ensemble = fixtures.tiny_loader_ensemble(workdir)
+    image = fixtures.make_image(os.path.join(workdir, "image.jpg"))
+    return measure(lambda: predict_deepfake(image, ensemble), runs)
+
+
+def bench_image_recognition(workdir, runs):
+    from src.image_utils.recognition import ImageRecognition
+    model, processor = fixtures.tiny_image_classifier(num_labels=10)
+    recognizer = ImageRecognition(device="cpu", model=model, processor=processor)
+    image = fixtures.make_image(os.path.join(workdir, "image.jpg"))
+    return measure(lambda: recognizer.predict(image), runs)
+
+
+def bench_enhance_image(workdir, runs):
+    from src.image_utils.enhancement import enhance_image_cv2
+    image = fixtures.make_image(os.path.join(workdir, "image.jpg"))
+    return measure(lambda: enhance_image_cv2(image), runs)
+
+
+def bench_plate_detection(workdir, runs):
+    from src.image_utils.number_plate_recognition import NumberPlateRecognizer
+    recognizer = NumberPlateRecognizer.__new__(NumberPlateRecognizer)  # detection stage needs no OCR reader
+    image = fixtures.make_image(os.path.join(workdir, "car.jpg"))
+    return measure(lambda: recognizer.detect_plate_region(image), runs)
+
+
+def bench_plate_ocr(workdir, runs):
+    import easyocr
+    from src.image_utils.number_plate_recognition import NumberPlateRecognizer
+    try:
+        # Only uses EasyOCR weights that are already on disk — never downloads
+        reader = easyocr.Reader(["en"], gpu=False, download_enabled=False, verbose=False)
+    except Exception as e:
+        return {"skipped": f"EasyOCR weights not cached ({e.__class__.__name__})"}
+    recognizer = NumberPlateRecognizer(reader=reader)
+    image = fixtures.make_image(os.path.join(workdir, "car.jpg"))
+    return measure(lambda: recognizer.read_plate_text(image), max(3, runs // 4), warmup=1)
+
+
+BENCHMARKS = {
+    "image_model": bench_image_model,
+    "image_model_tiled": bench_image_model_tiled,
+    "video_model": bench_video_model,
+    "audio_model": bench_audio_model,
+    "video_decode_pyav": bench_video_decode_pyav,
+    "video_decode_opencv": bench_video_decode_opencv,
+    "predict_deepfake": bench_predict_deepfake,
+    "image_recognition": bench_image_recognition,
+    "enhance_image_cv2": bench_enhance_image,
+    "plate_detection": bench_plate_detection,
+    "plate_read_text": bench_plate_ocr,
+}
+
+
+def _child(name, runs, results):
+    import torch
+    torch.set_grad_enabled(False)
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            results.put(BENCHMARKS[name](workdir, runs))
+        except Exception as e:
+            results.put({"error": f"{e.__class__.__name__}: {e}"})
+
+
+def run_isolated(name, runs, timeout=600):
+    """Result of one benchmark in a fresh process; a crash, OOM kill or hang is recorded as an error."""
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(name, runs, results))
+    proc.start()
+    deadline = time.monotonic() + timeout
+    result = None
+    while result is None:
+        try:
+            result = results.get(timeout=1.0)
+        except queue.Empty:
+            if not proc.is_alive():
+                try:
+                    result = results.get(timeout=1.0)  # the result may land just as the child exits
+                except queue.Empty:
+                    result = {"error": f"benchmark process died (exit code {proc.exitcode})"}
+            elif time.monotonic() > deadline:
+                proc.terminate()
+                result = {"error": f"timed out after {timeout:.0f}s"}
+    proc.join(timeout=10)
+    if proc.is_alive():
+        proc.kill()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline inference benchmarks")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="subset of benchmarks to run")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--save", metavar="NAME", help="save results as benchmarks/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME_OR_PATH", help="compare p50 latency against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p50 slowdown before flagging")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds before a benchmark counts as hung")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'benchmark':<20}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'items/s':>10}{'peak MB':>10}")
+    for name in args.only or BENCHMARKS:
+        r = run_isolated(name, args.runs, args.timeout)
+        results[name] = r
+        if "p50_ms" in r:
+            print(f"{name:<20}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                  f"{r['throughput_per_s']:>10.1f}{r['peak_rss_mb']:>10.0f}")
+        else:
+            print(f"{name:<20}  {r.get('skipped') or r.get('error')}")
+
+    if args.save:
+        print(f"\n💾 Baseline saved to {save_baseline(results, args.save)}")
+
+    if args.compare:
+        baseline, baseline_env = load_baseline(args.compare, with_environment=True)
+        current_env = environment()
+        differs = sorted(k for k in ("cpu", "cpu_count", "gpu", "torch", "threads")
+                         if baseline_env.get(k) != current_env.get(k))
+        if differs:
+            print(f"\n⚠️ Baseline was measured on different {', '.join(differs)}: "
+                  + ", ".join(f"{k}={baseline_env.get(k)!r}" for k in differs))
+        rows = compare(results, baseline, args.tolerance)
+        print(f"\n{'benchmark':<20}{'base p50':>10}{'now p50':>10}{'ratio':>8}")
+        for name, base, now, ratio, regressed in rows:
+            print(f"{name:<20}{base:>10.2f}{now:>10.2f}{ratio:>8.2f}{'  ⚠️ regression' if regressed else ''}")
+        failed = [name for name, r in results.items() if "error" in r]
+        if failed:
+            print(f"\n❌ Failed: {', '.join(failed)}")
+        if failed or any(row[4] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,23 @@ from transformers import AutoProcessor, AutoModelForAudioClassification
 import torch
 import numpy as np
 import librosa
+from src.ensemble.detectors import softmax_two_class
+from src.utils.compiled_models import compile_model
+from src.utils.model_registry import load_pretrained
 
 class AudioDeepfakeModel:
-    def __init__(self, model_name="facebook/wav2vec2-base", device=None):
+    def __init__(self, model_name="facebook/wav2vec2-base", device=None, model=None, processor=None):
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self.processor = AutoProcessor.from_pretrained(model_name)
-        self.model = AutoModelForAudioClassification.from_pretrained(model_name).to(self.device)
+        self.processor = processor if processor is not None else load_pretrained(AutoProcessor, model_name)
+        self.model = (model if model is not None else load_pretrained(AutoModelForAudioClassification, model_name)).to(self.device)
+
+    def compile(self, backend="inductor", cache_dir=None):
+        """Compile the audio classifier once at load; waveform length varies, so this always uses inductor."""
+        if backend != "inductor":
+            print("⚠️ Audio inputs have variable length — compiling with inductor instead.")
+        inputs = self.processor(np.zeros(16000, dtype=np.float32), sampling_rate=16000, return_tensors="pt").to(self.device)
+        self.model = compile_model(self.model, dict(inputs), backend="inductor", cache_dir=cache_dir,
+                                   batch_inputs=("input_values",))
 
     def load_audio(self, audio_path, sr=16000):
         """Load audio file as waveform"""
@@ -18,16 +29,16 @@ class AudioDeepfakeModel:
 
     def predict(self, audio_path: str):
         """Predict real/fake probabilities"""
-        waveform = self.load_audio(audio_path)
+        return self.predict_waveform(self.load_audio(audio_path))
+
+    def predict_waveform(self, waveform, sr=16000):
+        """Predict real/fake probabilities for an in-memory mono waveform (e.g. demuxed from a video)"""
+        if sr != 16000:
+            waveform = librosa.resample(waveform, orig_sr=sr, target_sr=16000)
         inputs = self.processor(waveform, sampling_rate=16000, return_tensors="pt").to(self.device)
 
         with torch.no_grad():
             outputs = self.model(**inputs)
-            logits = outputs.logits
-            probs = torch.softmax(logits, dim=-1).cpu().numpy()[0]
 
         # If the model has >2 classes, compress to [Real, Fake]-like format for ensemble
-        if len(probs) >= 2:
-            return np.array([probs[0], probs[1]])
-        else:
-            return np.array([1 - probs[0], probs[0]])
+        return softmax_two_class(outputs.logits)[0]
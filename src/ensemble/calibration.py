@@ -0,0 +1,205 @@
+# src/ensemble/calibration.py
+# Per-model probability calibration. Every detector is reduced to one real-vs-fake
+# margin z = log p(fake) - log p(real) (for softmax heads this is the logit
+# difference, so it also holds for the 0/1 slice of a many-class head), and a
+# fitted mapping turns z into a calibrated fake probability:
+#   temperature  sigmoid(z / T)
+#   platt        sigmoid(a * z + b)
+#   isotonic     monotone step fit (pool adjacent violators), interpolated
+# Parameters live in the "calibration" entry of data/ensemble_config.json.
+# Stored sub-scores are fake probabilities normalized over {real, fake}, i.e.
+# p1 / (p0 + p1), whose logit is exactly z.
+#
+#   python -m src.ensemble.calibration --manifest samples_test/manifest.csv --method temperature
+#   python -m src.ensemble.calibration --scores subscores.csv --section deepfake_ensemble --method platt
+
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+
+import numpy as np
+
+from src.ensemble.ensemble_config import DEFAULTS, load_ensemble_config, save_ensemble_config
+
+EPS = 1e-6
+
+
+def sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -50, 50)))
+
+
+def margin_from_probs(probs):
+    """(..., 2) [p_real, p_fake] pairs → z = log p_fake - log p_real."""
+    probs = np.clip(np.asarray(probs, dtype=np.float64), EPS, 1.0)
+    return np.log(probs[..., 1]) - np.log(probs[..., 0])
+
+
+def margin_from_score(p_fake):
+    """Fake probability of a two-way softmax → the same margin (its logit)."""
+    p = np.clip(np.asarray(p_fake, dtype=np.float64), EPS, 1 - EPS)
+    return np.log(p) - np.log1p(-p)
+
+
+def _nll(p, y):
+    p = np.clip(p, EPS, 1 - EPS)
+    return -np.mean(y * np.log(p) + (1 - y) * np.log(1 - p), axis=0)
+
+
+class TemperatureScaling:
+    method = "temperature"
+
+    def __init__(self, temperature=1.0):
+        self.temperature = temperature
+
+    def fit(self, z, y):
+        """Log-spaced grid over T evaluated in one (N, G) pass, then a finer grid around the best."""
+        grid = np.logspace(-2, 2, 200)
+        for _ in range(2):
+            losses = _nll(sigmoid(z[:, None] / grid[None, :]), y[:, None])
+            best = int(np.argmin(losses))
+            lo, hi = grid[max(best - 1, 0)], grid[min(best + 1, len(grid) - 1)]
+            grid, self.temperature = np.linspace(lo, hi, 200), float(grid[best])
+        return self
+
+    def transform(self, z):
+        return sigmoid(np.asarray(z) / self.temperature)
+
+    def to_dict(self):
+        return {"method": self.method, "temperature": self.temperature}
+
+
+class PlattScaling:
+    method = "platt"
+
+    def __init__(self, a=1.0, b=0.0):
+        self.a, self.b = a, b
+
+    def fit(self, z, y, max_iter=100, reg=1e-6):
+        """Newton's method on the logistic loss with Platt's smoothed targets."""
+        pos, neg = y.sum(), len(y) - y.sum()
+        targets = np.where(y == 1, (pos + 1) / (pos + 2), 1 / (neg + 2))
+        X = np.stack([z, np.ones_like(z)], axis=1)
+        w = np.array([1.0, 0.0])
+        for _ in range(max_iter):
+            p = sigmoid(X @ w)
+            grad = X.T @ (p - targets) + reg * w
+            hess = (X * (p * (1 - p))[:, None]).T @ X + reg * np.eye(2)
+            step = np.linalg.solve(hess, grad)
+            w -= step
+            if np.abs(step).max() < 1e-9:
+                break
+        self.a, self.b = float(w[0]), float(w[1])
+        return self
+
+    def transform(self, z):
+        return sigmoid(self.a * np.asarray(z) + self.b)
+
+    def to_dict(self):
+        return {"method": self.method, "a": self.a, "b": self.b}
+
+
+class IsotonicCalibration:
+    method = "isotonic"
+
+    def __init__(self, x=(0.0,), y=(0.5,)):
+        self.x, self.y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+
+    def fit(self, z, y):
+        """Pool adjacent violators on the margin-sorted labels (tied margins start pooled)."""
+        uz, inverse = np.unique(z, return_inverse=True)
+        sums = np.bincount(inverse, y.astype(np.float64), len(uz))
+        counts = np.bincount(inverse, minlength=len(uz)).astype(np.float64)
+        # Blocks as [sum, count, z_min, z_max]; merge while the previous mean exceeds the new one
+        blocks = []
+        for zi, si, ci in zip(uz, sums, counts):
+            blocks.append([si, ci, zi, zi])
+            while len(blocks) > 1 and blocks[-2][0] / blocks[-2][1] >= blocks[-1][0] / blocks[-1][1]:
+                s, c, _, hi = blocks.pop()
+                blocks[-1][0] += s
+                blocks[-1][1] += c
+                blocks[-1][3] = hi
+        xs, ys = [], []
+        for s, c, lo, hi in blocks:
+            xs.extend((lo, hi) if hi > lo else (lo,))
+            ys.extend((s / c,) * (2 if hi > lo else 1))
+        self.x, self.y = np.array(xs), np.clip(np.array(ys), EPS, 1 - EPS)
+        return self
+
+    def transform(self, z):
+        return np.interp(np.asarray(z, dtype=np.float64), self.x, self.y)
+
+    def to_dict(self):
+        return {"method": self.method, "x": self.x.tolist(), "y": self.y.tolist()}
+
+
+CALIBRATORS = {cls.method: cls for cls in (TemperatureScaling, PlattScaling, IsotonicCalibration)}
+
+
+def calibrator_from_dict(params):
+    params = dict(params)
+    return CALIBRATORS[params.pop("method")](**params)
+
+
+def load_calibrators(section, path=None):
+    """{member: calibrator} from the tuned config; members without one stay uncalibrated."""
+    stored = load_ensemble_config(section, path).get("calibration", {})
+    return {member: calibrator_from_dict(params) for member, params in stored.items()}
+
+
+def expected_calibration_error(p_fake, y, bins=15):
+    """Equal-width-bin ECE of the fake probability: Σ |bin| / N · |mean(y) − mean(p)|."""
+    p_fake, y = np.asarray(p_fake, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    idx = np.minimum((p_fake * bins).astype(np.int64), bins - 1)
+    count = np.bincount(idx, minlength=bins)
+    gap = np.abs(np.bincount(idx, y, bins) - np.bincount(idx, p_fake, bins))
+    return float(gap.sum() / max(1, count.sum()))
+
+
+def apply_calibration(scores, members, calibrators):
+    """Calibrate an (N, M) matrix of fake probabilities column by column."""
+    scores = np.array(scores, dtype=np.float64)
+    for j, member in enumerate(members):
+        if member in calibrators:
+            scores[:, j] = calibrators[member].transform(margin_from_score(scores[:, j]))
+    return scores
+
+
+def main():
+    from src.ensemble.weight_search import load_subscores
+
+    parser = argparse.ArgumentParser(description="Fit per-model probability calibration from stored sub-scores")
+    parser.add_argument("--section", default="image_ensemble", choices=sorted(DEFAULTS))
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="evaluation manifest whose scores are in the eval cache")
+    source.add_argument("--scores", help="CSV with label + one column per ensemble member")
+    parser.add_argument("--cache", default=os.path.join(os.path.dirname(__file__), "..", "..", "data", "eval", "scores.json"))
+    parser.add_argument("--face-crop", action="store_true", help="use the face-crop scores from the eval cache")
+    parser.add_argument("--compile", choices=["inductor", "torchscript"], default=None,
+                        help="use the scores cached with this compile backend")
+    parser.add_argument("--method", default="temperature", choices=sorted(CALIBRATORS))
+    parser.add_argument("--bins", type=int, default=15)
+    parser.add_argument("--dry-run", action="store_true", help="print the result without writing the config")
+    args = parser.parse_args()
+
+    members = DEFAULTS[args.section]["members"]
+    scores, labels = load_subscores(args, members)
+
+    fitted = {}
+    print(f"{'model':<14}{'ECE before':>12}{'ECE after':>12}{'NLL before':>12}{'NLL after':>12}")
+    for j, member in enumerate(members):
+        z = margin_from_score(scores[:, j])
+        calibrator = CALIBRATORS[args.method]().fit(z, labels)
+        before, after = sigmoid(z), calibrator.transform(z)
+        print(f"{member:<14}{expected_calibration_error(before, labels, args.bins):>12.4f}"
+              f"{expected_calibration_error(after, labels, args.bins):>12.4f}"
+              f"{_nll(before, labels):>12.4f}{_nll(after, labels):>12.4f}")
+        fitted[member] = calibrator.to_dict()
+
+    if not args.dry_run:
+        path = save_ensemble_config(args.section, {"calibration": fitted})
+        print(f"💾 Saved to {path} — re-run weight_search so weights match the calibrated scores")
+
+
+if __name__ == "__main__":
+    main()
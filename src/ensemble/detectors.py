@@ -0,0 +1,256 @@
+# src/ensemble/detectors.py
+# Detector plugins shared by both ensembles (DeepfakeEnsemble and the image
+# ensemble of app/ensemble_loader.py). A detector declares its modality, the
+# preprocessing it consumes, its model input size and a relative cost, and scores
+# a batch of prepared inputs as (N, 2) [p_real, p_fake] rows.
+#
+# Preprocessing is keyed ("image.faces", "audio.waveform", ...): src/ensemble/fusion.py
+# computes each key once per request and hands the same batch to every detector
+# that declares it, so a new image model does not decode or face-crop again.
+#
+# Adding a model: register a factory under the member name and list that name
+# (with a weight) in the ensemble's section of ensemble_config.DEFAULTS.
+#
+#   @register_detector("MyViT")
+#   def _my_vit(ensemble):
+#       return ImageClassifierDetector("MyViT", ensemble["my_vit"], ensemble["device"])
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+
+from src.image_utils.clip_embeddings import ClipEmbeddingService
+from src.image_utils.enhancement import enhance_image_cv2
+from src.utils.hashing import file_digest
+
+CLIP_PROMPTS = ["a real face", "a fake face"]
+
+DETECTORS = {}      # member name → factory(ensemble) returning a Detector
+PREPROCESSORS = {}  # preprocessing key → fn(MediaRequest) returning a batch (list)
+
+
+def register_detector(name):
+    def register(factory):
+        DETECTORS[name] = factory
+        return factory
+    return register
+
+
+def register_preprocessor(key):
+    def register(fn):
+        PREPROCESSORS[key] = fn
+        return fn
+    return register
+
+
+def build_detectors(members, ensemble):
+    """Instantiate the registered detector of every member name, in order."""
+    missing = [name for name in members if name not in DETECTORS]
+    if missing:
+        raise ValueError(f"No detector registered for {missing} (registered: {sorted(DETECTORS)})")
+    return [DETECTORS[name](ensemble) for name in members]
+
+
+def two_class(probs):
+    """Class probabilities (..., C) → [p_real, p_fake]; a single-output head is read as p_fake."""
+    probs = np.asarray(probs)
+    if probs.shape[-1] >= 2:
+        return probs[..., :2]
+    return np.concatenate([1 - probs, probs], axis=-1)
+
+
+def softmax_two_class(logits):
+    """Model logits (N, C) → (N, 2) [p_real, p_fake] as NumPy."""
+    return two_class(torch.softmax(logits, dim=-1).cpu().numpy())
+
+
+def face_crops(image, face_detector=None):
+    """PIL face crops of a PIL image (the full frame without a detector or when none are found)."""
+    if face_detector is None:
+        return [image]
+    return [Image.fromarray(c) for c in face_detector.crop_faces(np.array(image))]
+
+
+class MediaRequest:
+    def __init__(self, image_path=None, video_path=None, audio_path=None, face_detector=None,
+                 progress=None, demux_audio=False, collect_features=False):
+        """
+        One request's media and its preprocessing cache.
+        demux_audio: video detectors also extract the soundtrack, which then serves
+        as the audio input when no separate audio file was given.
+        collect_features: detectors that can also provide "features:<name>" (their
+        penultimate feature vector for the verdict's input).
+        """
+        self.paths = {"image": image_path, "video": video_path, "audio": audio_path}
+        self.face_detector = face_detector
+        self.progress = progress
+        self.demux_audio = demux_audio
+        self.collect_features = collect_features
+        self._prepared = {}
+
+    def available(self, modality):
+        if modality == "audio" and not self.paths["audio"]:
+            return self._prepared.get("audio.waveform") is not None
+        return bool(self.paths[modality])
+
+    def prepared(self, key):
+        """The batch for a preprocessing key, computed on first use."""
+        if key not in self._prepared:
+            self._prepared[key] = PREPROCESSORS[key](self)
+        return self._prepared[key]
+
+    def digest(self, modality):
+        """SHA-256 of the modality's input file, computed once."""
+        key = f"digest:{modality}"
+        if key not in self._prepared:
+            self._prepared[key] = file_digest(self.paths[modality])
+        return self._prepared[key]
+
+    def provide(self, key, batch):
+        """Store a batch produced as a by-product (e.g. audio demuxed by the video detector)."""
+        self._prepared[key] = batch
+
+    def provided(self, key):
+        """A by-product stored with provide(), or None."""
+        return self._prepared.get(key)
+
+
+@register_preprocessor("image.rgb")
+def _image_rgb(request):
+    return [Image.open(request.paths["image"]).convert("RGB")]
+
+
+@register_preprocessor("image.faces")
+def _image_faces(request):
+    return face_crops(request.prepared("image.rgb")[0], request.face_detector)
+
+
+@register_preprocessor("image.enhanced")
+def _image_enhanced(request):
+    # Enhanced in memory (a shared temp file races between sessions), BGR → RGB
+    enhanced = enhance_image_cv2(request.paths["image"])
+    return [Image.fromarray(cv2.cvtColor(enhanced, cv2.COLOR_BGR2RGB))]
+
+
+@register_preprocessor("image.enhanced_faces")
+def _image_enhanced_faces(request):
+    return face_crops(request.prepared("image.enhanced")[0], request.face_detector)
+
+
+@register_preprocessor("video.path")
+def _video_path(request):
+    # Video detectors decode (and sample) the file themselves
+    return [request.paths["video"]]
+
+
+@register_preprocessor("audio.waveform")
+def _audio_waveform(request):
+    import librosa
+    waveform, _ = librosa.load(request.paths["audio"], sr=16000)
+    return [waveform]
+
+
+class Detector:
+    name = None
+    modality = "image"          # "image" | "video" | "audio"
+    preprocess = "image.rgb"    # key into PREPROCESSORS
+    input_size = 224            # model input side (pixels); None where it does not apply
+    cost = 1.0                  # relative compute per request (cascade order)
+
+    def score(self, batch, request=None):
+        """(N, 2) [p_real, p_fake] rows, one per prepared input in `batch`."""
+        raise NotImplementedError
+
+
+class ImageClassifierDetector(Detector):
+    preprocess = "image.faces"
+
+    def __init__(self, name, pair, device, cost=1.0):
+        """pair: (processor, model) of a two-class HF image classifier (may be a LazyModel)."""
+        self.name, self.pair, self.device, self.cost = name, pair, device, cost
+
+    def score(self, batch, request=None):
+        proc, model = self.pair
+        inputs = proc(images=batch, return_tensors="pt").to(self.device)
+        with torch.no_grad():
+            outputs = model(**inputs)
+        return softmax_two_class(outputs.logits)
+
+
+class ClipZeroShotDetector(Detector):
+    preprocess = "image.faces"
+
+    def __init__(self, name, pair, device, prompts=CLIP_PROMPTS, cost=1.4, embeddings=None):
+        """
+        Zero-shot real/fake from CLIP image-text similarity; prompts are [real, fake].
+        embeddings: ClipEmbeddingService to share image embeddings with other zero-shot heads.
+        """
+        self.name, self.pair, self.device, self.prompts, self.cost = name, pair, device, prompts, cost
+        self.embeddings = embeddings if embeddings is not None else ClipEmbeddingService(pair, device)
+
+    def score(self, batch, request=None):
+        proc, model = self.pair
+        if not hasattr(model, "get_image_features"):
+            # TorchScript-compiled CLIP only exposes logits_per_image
+            inputs = proc(text=self.prompts, images=batch, return_tensors="pt", padding=True).to(self.device)
+            with torch.no_grad():
+                outputs = model(**inputs)
+            return outputs.logits_per_image.softmax(dim=-1).cpu().numpy()
+
+        # A whole-frame batch is keyed by the upload's file hash, shared with heads that embed the file
+        keys = None
+        if request is not None and request.face_detector is None and request.paths["image"]:
+            keys = [request.digest("image")]
+        return self.embeddings.zero_shot(self.embeddings.embed_images(batch, keys=keys), self.prompts)
+
+
+class ImageModelDetector(Detector):
+    preprocess = "image.enhanced_faces"
+
+    def __init__(self, name, model, cost=1.0):
+        """Wraps an ImageDeepfakeModel."""
+        self.name, self.model, self.cost = name, model, cost
+
+    def score(self, batch, request=None):
+        if request is None or not request.collect_features:
+            return self.model.predict_images(batch)
+        probs, features = self.model.predict_images(batch, return_features=True)
+        if features is not None:
+            request.provide(f"features:{self.name}", features[int(np.argmax(probs[:, 1]))])
+        return probs
+
+
+class VideoModelDetector(Detector):
+    modality = "video"
+    preprocess = "video.path"
+
+    def __init__(self, name, model, cost=8.0):
+        """Wraps a VideoDeepfakeModel; demuxes the soundtrack too when the request asks for it."""
+        self.name, self.model, self.cost = name, model, cost
+
+    def score(self, batch, request=None):
+        progress = request.progress if request is not None else None
+        rows = []
+        for path in batch:
+            if request is not None and request.demux_audio:
+                probs, waveform = self.model.predict_av(path, progress=progress)
+                if waveform is not None:
+                    request.provide("audio.waveform", [waveform])
+            else:
+                probs = self.model.predict(path, progress=progress)
+            rows.append(probs)
+        return np.array(rows)
+
+
+class AudioModelDetector(Detector):
+    modality = "audio"
+    preprocess = "audio.waveform"
+    input_size = None
+
+    def __init__(self, name, model, cost=2.0):
+        """Wraps an AudioDeepfakeModel (16 kHz mono waveforms)."""
+        self.name, self.model, self.cost = name, model, cost
+
+    def score(self, batch, request=None):
+        return np.array([self.model.predict_waveform(waveform) for waveform in batch])
@@ -0,0 +1,62 @@
+# src/ensemble/ensemble_config.py
+# Tuned ensemble settings (weights, decision threshold, per-model calibration) shared
+# by DeepfakeEnsemble and app/ensemble_loader.predict_deepfake. Written by
+# src/ensemble/weight_search.py and src/ensemble/calibration.py; missing entries fall
+# back to the hand-picked defaults below.
+
+import json
+import os
+
+CONFIG_PATH = os.environ.get(
+    "ENSEMBLE_CONFIG",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "ensemble_config.json")),
+)
+
+DEFAULTS = {
+    # app/ensemble_loader.py image ensemble
+    "image_ensemble": {
+        "members": ["EfficientViT", "CLIP", "Xception++"],
+        "weights": [0.3, 0.3, 0.4],
+        "threshold": 0.5,
+        "calibration": {},
+    },
+    # src/ensemble/ensemble_core.DeepfakeEnsemble
+    "deepfake_ensemble": {
+        "members": ["image", "video", "audio"],
+        "weights": [0.4, 0.6, 0.0],
+        "threshold": 0.5,
+        "calibration": {},
+    },
+}
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_ensemble_config(section, path=None):
+    """Defaults for `section` overridden by whatever the tuned config file stores."""
+    config = dict(DEFAULTS[section])
+    stored = _read(path or CONFIG_PATH).get(section, {})
+    if stored.get("members", config["members"]) != config["members"]:
+        raise ValueError(
+            f"{section}: tuned config is for members {stored['members']}, expected {config['members']}"
+        )
+    config.update(stored)
+    return config
+
+
+def save_ensemble_config(section, values, path=None):
+    """Merge `values` into `section` of the config file (other sections are kept)."""
+    path = path or CONFIG_PATH
+    data = _read(path)
+    data.setdefault(section, {"members": DEFAULTS[section]["members"]}).update(values)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
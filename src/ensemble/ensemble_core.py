@@ -4,44 +4,156 @@ from .image_model import ImageDeepfakeModel
 from .video_model import VideoDeepfakeModel
 from .audio_model import AudioDeepfakeModel
 from src.image_utils.enhancement import enhance_image_cv2
+from src.image_utils.face_detection import FaceDetector
+from .ensemble_config import load_ensemble_config
+from .calibration import load_calibrators
+from .detectors import (
+    AudioModelDetector, ImageModelDetector, MediaRequest, VideoModelDetector, register_detector,
+)
+from .fusion import FusionEngine
 
 
 # optionally save: cv2.imwrite("enhanced.jpg", enhanced_img)
 # then pass enhanced image to detector
 
+import os
+import time
+
 import numpy as np
 
+
+# Members of the "deepfake_ensemble" config section
+@register_detector("image")
+def _image_detector(ensemble):
+    return ImageModelDetector("image", ensemble.image_model)
+
+
+@register_detector("video")
+def _video_detector(ensemble):
+    return VideoModelDetector("video", ensemble.video_model)
+
+
+@register_detector("audio")
+def _audio_detector(ensemble):
+    return AudioModelDetector("audio", ensemble.audio_model)
+
+
 class DeepfakeEnsemble:
-    def __init__(self, weights=(0.4, 0.6, 0.0)):
-        self.image_model = ImageDeepfakeModel()
-        self.video_model = VideoDeepfakeModel()
-        self.audio_model = AudioDeepfakeModel()
+    def __init__(self, weights=None, threshold=None, face_crop=False, compile_backend=None, near_duplicates=None,
+                 model_manager=None, vector_index=None, reuse_verdicts=False):
+        # Unset weights/threshold come from the tuned config (data/ensemble_config.json)
+        config = load_ensemble_config("deepfake_ensemble")
+        weights = tuple(weights or config["weights"])
+        # One detector shared by the image and video branches (face-crop mode)
+        self.face_detector = FaceDetector() if face_crop else None
         self.weights = weights  # (image, video, audio)
+        self.threshold = config["threshold"] if threshold is None else threshold
+        self.calibrators = load_calibrators("deepfake_ensemble")  # {"image"/"video"/"audio": calibrator}
+        self.near_duplicates = near_duplicates  # optional NearDuplicateIndex
+        # Opt-in: answer near-duplicates with the stored verdict. A local edit of a known
+        # "Real" image can hash within the radius, so by default matches only add provenance.
+        self.reuse_verdicts = reuse_verdicts
+        self.vector_index = vector_index        # optional VectorIndex of analyzed images' features
+
+        members = (
+            ("image", lambda: ImageDeepfakeModel(face_detector=self.face_detector), weights[0]),
+            ("video", lambda: VideoDeepfakeModel(face_detector=self.face_detector), weights[1]),
+            ("audio", AudioDeepfakeModel, weights[2]),
+        )
+        for member, build, weight in members:
+            load = self._member_loader(build, compile_backend if weight > 0 else None)
+            if model_manager is None:
+                model = load()
+            else:
+                # Loaded on first use and evictable under the manager's memory budget
+                model = model_manager.lazy(f"deepfake.{member}", load)
+            setattr(self, f"{member}_model", model)
+
+        self.engine = FusionEngine.from_config(
+            "deepfake_ensemble", self, weights=self.weights, threshold=self.threshold, calibrators=self.calibrators
+        )
+
+    @staticmethod
+    def _member_loader(build, compile_backend):
+        # Opt-in compiled mode: 'inductor' or 'torchscript' (models with zero weight are left eager)
+        def load():
+            model = build()
+            if compile_backend:
+                model.compile(backend=compile_backend)
+            return model
+        return load
+
+    def analyze(self, image_path=None, video_path=None, audio_path=None, progress=None, source=None, owner=None):
+        """
+        Full verdict: {"label", "probs", "sub_scores", "provenance", "similar", "timing"}.
+        With a near-duplicate index, a single image or video that closely matches
+        earlier media is still analyzed; provenance names the match and its verdict
+        (with reuse_verdicts=True the stored verdict is returned without inference).
+        With a vector index, "similar" lists the previously analyzed images closest to
+        this one (by the image model's features) and the image is added to the index.
+        source: display name recorded in the indexes (defaults to the file name).
+        owner: session / client id; provenance and "similar" only name media the same owner analyzed.
+        """
+        start = time.perf_counter()
+        timing = {}
+
+        # Only single-media requests are indexed; combined verdicts depend on every input
+        index = self.near_duplicates if (bool(image_path) != bool(video_path) and not audio_path) else None
+        hashes, match = None, None
+        if index is not None:
+            t = time.perf_counter()
+            hashes = index.hash_media(image_path=image_path, video_path=video_path)
+            match = index.lookup(hashes=hashes, owner=owner)
+            timing["near_duplicate_lookup"] = time.perf_counter() - t
+            if match is not None and self.reuse_verdicts:
+                timing["total"] = time.perf_counter() - start
+                return dict(match, probs=np.array(match["probs"]), similar=None, timing=timing)
+
+        # A video without a separate audio file feeds the audio branch from its own
+        # soundtrack, demuxed during the same read (only when audio carries weight)
+        joint_audio = bool(video_path) and not audio_path and self.weights[2] > 0
+        request = MediaRequest(image_path, video_path, audio_path, face_detector=self.face_detector,
+                               progress=progress, demux_audio=joint_audio,
+                               collect_features=self.vector_index is not None)
+        fused = self.engine.run(request, weights=self.weights, threshold=self.threshold)
+        timing.update(fused["timing"])
+        final_probs, sub_scores = fused["probs"], fused["sub_scores"]
+        label = "Fake" if fused["is_fake"] else "Real"
+
+        provenance = match["provenance"] if match is not None else None
+        if index is not None and (match is None or match["label"] != label):
+            # A near-duplicate that now scores differently is recorded as its own entry
+            index.add(label, final_probs, sub_scores, image_path=image_path, video_path=video_path,
+                      hashes=hashes, source=source, owner=owner)
+
+        similar = None
+        feature = request.provided("features:image")
+        if feature is not None:
+            t = time.perf_counter()
+            similar = self.vector_index.query(feature, k=5, owner=owner)
+            self.vector_index.add([feature], [{
+                "owner": owner,
+                "label": label,
+                "fake": float(final_probs[1]),
+                "sub_scores": sub_scores,
+                "source": source or os.path.basename(image_path),
+                "analyzed_at": time.time(),
+            }])
+            timing["vector_index"] = time.perf_counter() - t
+        timing["total"] = time.perf_counter() - start
+
+        return {"label": label, "probs": final_probs, "sub_scores": sub_scores, "provenance": provenance,
+                "similar": similar, "timing": timing}
+
+    def similar(self, image_path, k=10, label=None, owner=None):
+        """Previously analyzed images (of `owner`) closest to this one, without adding it (needs a vector index)."""
+        if self.vector_index is None:
+            raise ValueError("No vector index configured.")
+        feature = self.image_model.embed(image_path)
+        if feature is None:
+            raise ValueError("The image model does not expose penultimate features (TorchScript?).")
+        return self.vector_index.query(feature, k=k, label=label, owner=owner)
 
-    def predict(self, image_path=None, video_path=None, audio_path=None):
-        results = []
-        total_weight = 0
-
-        if image_path:
-            img_probs = self.image_model.predict(image_path)
-            results.append(self.weights[0] * img_probs)
-            total_weight += self.weights[0]
-
-        if video_path:
-            vid_probs = self.video_model.predict(video_path)
-            results.append(self.weights[1] * vid_probs)
-            total_weight += self.weights[1]
-
-        if audio_path:
-            aud_probs = self.audio_model.predict(audio_path)
-            results.append(self.weights[2] * aud_probs)
-            total_weight += self.weights[2]
-
-        
-        if not results:
-            raise ValueError("No inputs provided (need at least an image).")
-        
-        final_probs = np.sum(results, axis=0) / total_weight
-        label = "Fake" if final_probs[1] > final_probs[0] else "Real"
-
-        return label, final_probs
+    def predict(self, image_path=None, video_path=None, audio_path=None, progress=None):
+        result = self.analyze(image_path=image_path, video_path=video_path, audio_path=audio_path, progress=progress)
+        return result["label"], result["probs"]
@@ -0,0 +1,153 @@
+# src/ensemble/evaluation.py
+# Offline evaluation engine: labeled manifest → batched per-model scores (cached on
+# disk by file content, model revision and preprocessing mode) → metrics. Metrics are computed from the cached sub-scores,
+# so re-weighting the ensemble or moving the threshold needs no new inference.
+
+import csv
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from src.utils.hashing import file_digest
+from src.utils.model_registry import MEMBER_MODELS, pinned_revision
+
+LABELS = {"0": 0, "1": 1, "real": 0, "fake": 1}
+
+
+def read_manifest(path):
+    """
+    CSV with `path,label` columns (label: 0/1 or real/fake). Relative paths are
+    resolved against the manifest's directory. Returns [(abs_path, label), ...].
+    """
+    root = os.path.dirname(os.path.abspath(path))
+    items = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            label = LABELS[str(row["label"]).strip().lower()]
+            items.append((os.path.join(root, row["path"].strip()), label))
+    return items
+
+
+def score_key(member, face_crop=False, compile_backend=None):
+    """
+    ScoreCache model key for an ensemble member: its name, the registry revision its
+    checkpoint is pinned at ("unpinned" otherwise) and the preprocessing mode, so
+    re-pinning a model or switching face crops / compilation never reuses old scores.
+    """
+    model_id = MEMBER_MODELS.get(member)
+    parts = [member, f"rev={(model_id and pinned_revision(model_id)) or 'unpinned'}"]
+    if face_crop:
+        parts.append("faces")
+    if compile_backend:
+        parts.append(compile_backend)
+    return "|".join(parts)
+
+
+class ScoreCache:
+    def __init__(self, path):
+        """{model_key: {file_sha256: score}} persisted as JSON (model keys from score_key)."""
+        self.path = path
+        self.scores = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.scores = json.load(f)
+
+    def get(self, model_key, digest):
+        return self.scores.get(model_key, {}).get(digest)
+
+    def put_many(self, model_key, digests, values):
+        with self._lock:
+            table = self.scores.setdefault(model_key, {})
+            for digest, value in zip(digests, values):
+                table[digest] = float(value)
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with self._lock, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.scores, f)
+        os.replace(tmp_path, self.path)
+
+
+def _load_rgb(path):
+    return Image.open(path).convert("RGB")
+
+
+def collect_scores(items, scorers, cache, batch_size=16, workers=4, progress=None):
+    """
+    Score every manifest item with every model, reusing cached scores.
+    scorers: {model_key: fn(list_of_PIL_images) -> array of fake scores}.
+    Image decoding runs on a thread pool one batch ahead of inference.
+    Returns (scores (N, M) float array, labels (N,) int array, model_keys).
+    """
+    paths = [p for p, _ in items]
+    labels = np.array([label for _, label in items], dtype=np.int64)
+    model_keys = list(scorers)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(file_digest, paths))
+
+        for key in model_keys:
+            todo = [i for i, d in enumerate(digests) if cache.get(key, d) is None]
+            batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+            # Decode batch k+1 while the model runs on batch k
+            decode = lambda batch: [pool.submit(_load_rgb, paths[i]) for i in batch]
+            pending = decode(batches[0]) if batches else None
+            for n, batch in enumerate(batches):
+                images = [f.result() for f in pending]
+                if n + 1 < len(batches):
+                    pending = decode(batches[n + 1])
+                cache.put_many(key, [digests[i] for i in batch], scorers[key](images))
+                if progress is not None:
+                    progress(model=key, done=min(len(todo), (n + 1) * batch_size), total=len(todo))
+            if batches:
+                cache.save()
+
+    scores = np.array([[cache.get(key, d) for key in model_keys] for d in digests], dtype=np.float64)
+    return scores, labels, model_keys
+
+
+def fuse(scores, weights):
+    """Weighted average of per-model scores: (N, M) x (M,) → (N,)."""
+    weights = np.asarray(weights, dtype=np.float64)
+    return scores @ weights / weights.sum()
+
+
+def roc_auc(labels, fused):
+    """Rank-based ROC AUC (ties get average ranks)."""
+    pos, neg = labels == 1, labels == 0
+    if not pos.any() or not neg.any():
+        return float("nan")
+    order = np.argsort(fused, kind="mergesort")
+    ranks = np.empty(len(fused))
+    ranks[order] = np.arange(1, len(fused) + 1)
+    for value in np.unique(fused):
+        tie = fused == value
+        ranks[tie] = ranks[tie].mean()
+    return float((ranks[pos].sum() - pos.sum() * (pos.sum() + 1) / 2) / (pos.sum() * neg.sum()))
+
+
+def compute_metrics(scores, labels, weights, threshold=0.5):
+    """Accuracy / precision / recall / F1 / AUC / confusion matrix from cached sub-scores."""
+    fused = fuse(scores, weights)
+    pred = (fused > threshold).astype(np.int64)
+    tp = int(((pred == 1) & (labels == 1)).sum())
+    tn = int(((pred == 0) & (labels == 0)).sum())
+    fp = int(((pred == 1) & (labels == 0)).sum())
+    fn = int(((pred == 0) & (labels == 1)).sum())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "accuracy": (tp + tn) / max(1, len(labels)),
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "auc": roc_auc(labels, fused),
+        "confusion_matrix": [[tn, fp], [fn, tp]],
+        "mean_score": float(fused.mean()) if len(fused) else float("nan"),
+    }
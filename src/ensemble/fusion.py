@@ -0,0 +1,138 @@
+# src/ensemble/fusion.py
+# One fusion engine for both ensembles: runs the registered detectors that apply
+# to a request (by modality), shares each preprocessing step between the detectors
+# that declare it, calibrates every detector's output and fuses the weighted
+# fake probabilities. Multi-input detectors (several faces) count their most
+# suspicious input.
+
+import threading
+import time
+
+import numpy as np
+
+from .calibration import load_calibrators, margin_from_probs
+from .detectors import build_detectors
+from .ensemble_config import load_ensemble_config
+
+MODALITY_ORDER = ("image", "video", "audio")  # video first so demuxed audio is ready for audio detectors
+
+
+class FusionEngine:
+    def __init__(self, detectors, weights, threshold=0.5, calibrators=None):
+        if len(detectors) != len(weights):
+            raise ValueError(f"{len(detectors)} detectors but {len(weights)} weights")
+        self.detectors = list(detectors)
+        self.weights = tuple(weights)
+        self.threshold = threshold
+        self.calibrators = calibrators if calibrators is not None else {}  # {detector name: calibrator}
+        self.stats = {"requests": 0, "run": {}, "skipped": {}}
+        self._lock = threading.Lock()  # one engine serves concurrent jobs and API workers
+
+    @classmethod
+    def from_config(cls, section, ensemble, weights=None, threshold=None, calibrators=None):
+        """Detectors for the section's members, with its tuned weights/threshold/calibration unless given."""
+        config = load_ensemble_config(section)
+        return cls(
+            build_detectors(config["members"], ensemble),
+            weights or config["weights"],
+            config["threshold"] if threshold is None else threshold,
+            load_calibrators(section) if calibrators is None else calibrators,
+        )
+
+    def schedule(self, weights, cascade=False):
+        """
+        (detector, weight) pairs in run order: by modality, detectors sharing a
+        preprocessing step back to back; cascade=True orders cheapest first.
+        """
+        pairs = list(zip(self.detectors, weights))
+        if cascade:
+            return sorted(pairs, key=lambda p: p[0].cost)
+        first_use = {}
+        for detector, _ in pairs:
+            first_use.setdefault(detector.preprocess, len(first_use))
+        return sorted(pairs, key=lambda p: (MODALITY_ORDER.index(p[0].modality), first_use[p[0].preprocess]))
+
+    def fake_scores(self, detector, probs):
+        """(N, 2) raw detector rows → calibrated fake probability per row."""
+        calibrator = self.calibrators.get(detector.name)
+        if calibrator is None:
+            probs = np.asarray(probs, dtype=np.float64)
+            return probs[:, 1] / np.maximum(probs.sum(axis=1), 1e-12)
+        return calibrator.transform(margin_from_probs(probs))
+
+    def run(self, request, weights=None, threshold=None, cascade=False):
+        """
+        Fuse every applicable detector on a MediaRequest. Returns
+        {"score", "probs", "is_fake", "sub_scores", "timing"}.
+        cascade=True stops running detectors once the remaining weight can no
+        longer move the score across the threshold (zero-weight ones are skipped).
+        """
+        weights = tuple(weights or self.weights)
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            self.stats["requests"] += 1
+
+        # Audio may only become available from the video pass, so it is re-checked when its turn comes
+        runnable = [(d, w) for d, w in self.schedule(weights, cascade)
+                    if request.available(d.modality) or (d.modality == "audio" and request.demux_audio)]
+        total_weight = float(sum(w for _, w in runnable))
+
+        sub_scores, timing = {}, {}
+        weighted_sum, done_weight = 0.0, 0.0
+        for detector, weight in runnable:
+            if cascade:
+                # Bounds on the final score if every remaining detector said 0 or 1
+                low = weighted_sum / total_weight
+                high = (weighted_sum + total_weight - done_weight) / total_weight
+                if weight == 0 or low > threshold or high <= threshold:
+                    self._count("skipped", detector.name)
+                    continue
+            if not request.available(detector.modality):
+                continue
+
+            t = time.perf_counter()
+            probs = detector.score(request.prepared(detector.preprocess), request)
+            score = float(np.max(self.fake_scores(detector, probs)))
+            timing[detector.name] = time.perf_counter() - t
+            self._count("run", detector.name)
+
+            sub_scores[detector.name] = score
+            weighted_sum += weight * score
+            done_weight += weight
+
+        if not sub_scores:
+            raise ValueError("No inputs provided (need at least an image).")
+        if done_weight == 0:
+            raise ValueError(f"Only zero-weight detectors apply to this input ({', '.join(sub_scores)}).")
+
+        # Weighted average over the detectors that actually ran
+        score = weighted_sum / done_weight
+        return {
+            "score": score,
+            "probs": np.array([1 - score, score]),
+            "is_fake": score > threshold,
+            "sub_scores": sub_scores,
+            "timing": timing,
+        }
+
+    def _count(self, kind, name):
+        with self._lock:
+            self.stats[kind][name] = self.stats[kind].get(name, 0) + 1
+
+    def report(self):
+        """Per-detector run/skip counts and the compute (by declared cost) the cascade saved."""
+        with self._lock:
+            requests = self.stats["requests"]
+            runs, skips = dict(self.stats["run"]), dict(self.stats["skipped"])
+        stages, total_cost, spent = {}, 0.0, 0.0
+        for detector in sorted(self.detectors, key=lambda d: d.cost):
+            run = runs.get(detector.name, 0)
+            skipped = skips.get(detector.name, 0)
+            stages[detector.name] = {"run": run, "skipped": skipped, "skip_rate": skipped / max(1, run + skipped)}
+            total_cost += (run + skipped) * detector.cost
+            spent += run * detector.cost
+        return {
+            "requests": requests,
+            "stages": stages,
+            "compute_saved": 1 - spent / total_cost if total_cost else 0.0,
+        }
@@ -2,43 +2,179 @@
 from transformers import AutoModelForImageClassification, AutoImageProcessor
 from PIL import Image
 from src.image_utils.enhancement import enhance_image_cv2
+from src.ensemble.detectors import face_crops, softmax_two_class
+from src.utils.compiled_models import compile_model
+from src.utils.model_registry import load_pretrained
 import cv2
-import os
+import threading
 
+import math
+
+import numpy as np
 import torch
 
+TILE = 224  # classifier input side; tiles are cut at this size so nothing is resampled away
+
+
+def tile_offsets(length, tile=TILE, overlap=0.25):
+    """Evenly spaced tile origins covering [0, length), adjacent tiles overlapping by at least `overlap`."""
+    if length <= tile:
+        return [0]
+    count = math.ceil((length - tile) / (tile * (1 - overlap))) + 1
+    return [int(round(x)) for x in np.linspace(0, length - tile, count)]
+
+
+def _scaled_size(size, scale, tile=TILE):
+    return max(tile, round(size[0] * scale)), max(tile, round(size[1] * scale))
+
+
+def plan_tiles(size, scales=(1.0, 0.5), tile=TILE, overlap=0.25, max_tiles=48):
+    """
+    [(scale, [(x, y), ...])]: tile origins (in scaled pixels) for an image of `size`
+    (width, height), at most max_tiles in total. When the grids exceed the budget all
+    scales shrink by a common factor (keeping their ratios) until they fit; no scale
+    goes below one tile across the short side. If even that grid is too large (long
+    panoramas), an evenly strided subset of its tiles is scored.
+    """
+    def grid(scale):
+        width, height = _scaled_size(size, scale, tile)
+        return [(x, y) for y in tile_offsets(height, tile, overlap) for x in tile_offsets(width, tile, overlap)]
+
+    floor = tile / min(size)
+    factor = 1.0
+    while True:
+        plan, seen = [], set()
+        for scale in sorted(set(scales)):
+            scale = max(scale * factor, floor)
+            if _scaled_size(size, scale, tile) not in seen:
+                seen.add(_scaled_size(size, scale, tile))
+                plan.append((scale, grid(scale)))
+        needed = sum(len(origins) for _, origins in plan)
+        if needed <= max_tiles:
+            return plan
+        if all(scale == floor for scale, _ in plan):
+            scale, origins = plan[0]
+            return [(scale, [origins[i * len(origins) // max_tiles] for i in range(max(1, max_tiles))])]
+        factor *= 0.9
+
+
 class ImageDeepfakeModel:
-    def __init__(self, model_name="prithivMLmods/deepfake-detector-model-v1", device=None):
+    def __init__(self, model_name="prithivMLmods/deepfake-detector-model-v1", device=None, face_detector=None,
+                 model=None, processor=None):
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        
+        self.face_detector = face_detector  # optional FaceDetector for face-crop mode
+
+        # Prebuilt model/processor (benchmarks, custom checkpoints) skip loading by name
+        if model is not None and processor is not None:
+            self.model, self.processor = model.to(self.device), processor
+            return
+
         # Load image model and processor (no tokenizer)
-        self.model = AutoModelForImageClassification.from_pretrained(model_name).to(self.device)
+        self.model = load_pretrained(AutoModelForImageClassification, model_name).to(self.device)
         try:
             # Try standard image processor first
-            self.processor = AutoImageProcessor.from_pretrained(model_name)
+            self.processor = load_pretrained(AutoImageProcessor, model_name)
         except Exception:
             # Fallback for incomplete configs
             print("⚠️ Using fallback processor (ViT-based defaults)...")
-            self.processor = AutoImageProcessor.from_pretrained("google/vit-base-patch16-224-in21k")
+            self.processor = load_pretrained(AutoImageProcessor, "google/vit-base-patch16-224-in21k")
+
+    def compile(self, backend="inductor", cache_dir=None):
+        """Swap the eager classifier for a compiled one (torch.compile or a cached TorchScript trace)."""
+        dummy = Image.new("RGB", (224, 224))
+        inputs = self.processor(images=[dummy], return_tensors="pt").to(self.device)
+        self.model = compile_model(self.model, dict(inputs), backend=backend, cache_dir=cache_dir)
+
+    def prepare(self, image_path):
+        """Enhanced RGB image, cropped to faces in face-crop mode (PIL images)."""
+        # 1️⃣ Enhance the image first (kept in memory — a shared temp file races between sessions)
+        enhanced_img = enhance_image_cv2(image_path)
+
+        # 2️⃣ Convert the enhanced BGR array to RGB
+        image = Image.fromarray(cv2.cvtColor(enhanced_img, cv2.COLOR_BGR2RGB))
+
+        # 3️⃣ Optionally crop to faces so they are batched through the classifier
+        return face_crops(image, self.face_detector)
 
     def predict(self, image_path: str):
-        # 1️⃣ Enhance the image first
-        enhanced_path = "data/samples/enhanced_temp.jpg"
-        enhanced_img = enhance_image_cv2(image_path, enhanced_path)
+        probs = self.predict_images(self.prepare(image_path))
+
+        # The most suspicious face decides the verdict
+        return probs[int(np.argmax(probs[:, 1]))]
 
-        # 2️⃣ Reload the enhanced image
-        image = Image.open(enhanced_path).convert("RGB")
+    def predict_tiled(self, image_path, scales=(1.0, 0.5), overlap=0.25, max_tiles=48, heatmap_size=256):
+        """
+        Score overlapping 224px tiles of the enhanced full image (no face cropping) at
+        each scale (1.0 = native pixels) in one batch, so local edits in high-resolution
+        images are not averaged away by downsampling. max_tiles bounds the batch, and with
+        it latency (see plan_tiles). Returns {"probs": [Real, Fake] of the most suspicious
+        tile, "max"/"mean": fake probability over tiles, "heatmap": (h, w) float32 mean fake
+        probability of the tiles covering each pixel (longest side heatmap_size),
+        "tiles": [{"scale", "box" (original pixels), "fake"}]}.
+        """
+        enhanced_img = enhance_image_cv2(image_path)
+        image = Image.fromarray(cv2.cvtColor(enhanced_img, cv2.COLOR_BGR2RGB))
+        width, height = image.size
 
-        # 3️⃣ Continue with normal processing
-        inputs = self.processor(images=image, return_tensors="pt").to(self.device)
+        crops, boxes = [], []
+        for scale, origins in plan_tiles(image.size, scales, TILE, overlap, max_tiles):
+            scaled_size = _scaled_size(image.size, scale)
+            scaled = image if scaled_size == image.size else image.resize(scaled_size, Image.BILINEAR)
+            sx, sy = width / scaled_size[0], height / scaled_size[1]
+            for x, y in origins:
+                crops.append(scaled.crop((x, y, x + TILE, y + TILE)))
+                boxes.append((scale, (x * sx, y * sy, (x + TILE) * sx, (y + TILE) * sy)))
+        probs = self.predict_images(crops)
+        fake = probs[:, 1]
 
-        with torch.no_grad():
-          outputs = self.model(**inputs)
-          probs = torch.softmax(outputs.logits, dim=-1).cpu().numpy()[0]
+        # Per-pixel mean over covering tiles, on a downsampled canvas
+        factor = heatmap_size / max(width, height)
+        shape = (max(1, round(height * factor)), max(1, round(width * factor)))
+        total, coverage = np.zeros(shape, np.float32), np.zeros(shape, np.float32)
+        for (_, (x0, y0, x1, y1)), p in zip(boxes, fake):
+            rows = slice(int(y0 * factor), max(int(y0 * factor) + 1, int(math.ceil(y1 * factor))))
+            cols = slice(int(x0 * factor), max(int(x0 * factor) + 1, int(math.ceil(x1 * factor))))
+            total[rows, cols] += p
+            coverage[rows, cols] += 1
 
-        # 4️⃣ Optional cleanup
-        if os.path.exists(enhanced_path):
-           os.remove(enhanced_path)
+        return {
+            "probs": probs[int(np.argmax(fake))],
+            "max": float(fake.max()),
+            "mean": float(fake.mean()),
+            "heatmap": total / np.maximum(coverage, 1),
+            "tiles": [{"scale": round(scale, 3), "box": [round(v) for v in box], "fake": float(p)}
+                      for (scale, box), p in zip(boxes, fake)],
+        }
 
-        return probs
+    def embed(self, image_path):
+        """Penultimate feature vector of the most suspicious face, or None (see predict_images)."""
+        probs, features = self.predict_images(self.prepare(image_path), return_features=True)
+        return None if features is None else features[int(np.argmax(probs[:, 1]))]
 
+    def predict_images(self, images, return_features=False):
+        """
+        (N, 2) [Real, Fake] probabilities for a batch of prepared RGB PIL images.
+        return_features=True also returns the (N, D) input of the classification head
+        (None when the model has no `classifier` module, e.g. a TorchScript trace).
+        """
+        inputs = self.processor(images=images, return_tensors="pt").to(self.device)
+        features, hook = [], None
+        head = getattr(self.model, "classifier", None) if return_features else None
+        if isinstance(head, torch.nn.Module):
+            # Other threads may run the same model meanwhile; only keep this call's activations
+            owner = threading.get_ident()
+
+            def capture(module, args):
+                if threading.get_ident() == owner:
+                    features.append(args[0].detach())
+            hook = head.register_forward_pre_hook(capture)
+        try:
+            with torch.no_grad():
+                outputs = self.model(**inputs)
+        finally:
+            if hook is not None:
+                hook.remove()
+        probs = softmax_two_class(outputs.logits)
+        if not return_features:
+            return probs
+        return probs, (features[-1].flatten(1).float().cpu().numpy() if features else None)
@@ -0,0 +1,137 @@
+# src/ensemble/near_duplicates.py
+# Index of previously analyzed media by perceptual hash. Re-encoded, resized or
+# recompressed copies of something already analyzed resolve to the earlier entry,
+# reported as provenance (DeepfakeEnsemble only reuses its verdict when asked to). Entries are appended to a
+# JSONL file and the BK-trees are rebuilt from it on startup (and extended when another process appends).
+# Entries carry the session / client that analyzed them, and lookups can be scoped to it.
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from src.image_utils.perceptual_hash import BKTree, hamming, image_hashes, video_keyframes
+
+INDEX_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "near_duplicates.jsonl"))
+
+
+class NearDuplicateIndex:
+    def __init__(self, path=INDEX_PATH, max_distance=2, keyframes=8, min_frame_match=0.6):
+        """
+        max_distance: Hamming radius (of 64 bits) on both pHash and dHash for a match;
+        kept tight, since a small local edit changes only a few hash bits.
+        keyframes / min_frame_match: videos are hashed on `keyframes` evenly spaced frames
+        and match an entry when at least this fraction of them do.
+        """
+        self.path = path
+        self.max_distance = max_distance
+        self.keyframes = keyframes
+        self.min_frame_match = min_frame_match
+        self.entries = []
+        self.trees = {"image": BKTree(), "video": BKTree()}  # pHash → (entry id, dHash)
+        self._lock = threading.Lock()
+        self._offset = 0  # bytes of the JSONL file already loaded
+        with self._lock:
+            self._sync_locked()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _sync_locked(self):
+        """Load entries appended to the file (by this or another process) since the last read."""
+        if not self.path or not os.path.exists(self.path) or os.path.getsize(self.path) <= self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # a concurrent append still in progress; picked up next time
+                self._offset += len(line)
+                if line.strip():
+                    self._insert(json.loads(line))
+
+    def _insert(self, entry):
+        entry["id"] = len(self.entries)
+        self.entries.append(entry)
+        for p, d in entry["hashes"]:
+            self.trees[entry["kind"]].add(int(p, 16), (entry["id"], int(d, 16)))
+
+    def hash_media(self, image_path=None, video_path=None):
+        """("image" | "video", [(phash, dhash), ...])"""
+        if image_path:
+            return "image", [image_hashes(image_path)]
+        frames = video_keyframes(video_path, self.keyframes)
+        if not frames:
+            raise ValueError("No frames extracted from video!")
+        return "video", [image_hashes(frame) for frame in frames]
+
+    def _search(self, kind, hashes, owner=None):
+        """Best-matching entry id (of `owner`, if given) and per-frame distances, or (None, None)."""
+        best = {}  # entry id → {frame index: distance}
+        for i, (p, d) in enumerate(hashes):
+            for dist, (entry_id, entry_d) in self.trees[kind].search(p, self.max_distance):
+                if owner is not None and self.entries[entry_id].get("owner") != owner:
+                    continue
+                if hamming(d, entry_d) <= self.max_distance:
+                    frames = best.setdefault(entry_id, {})
+                    frames[i] = min(dist, frames.get(i, dist))
+        if not best:
+            return None, None
+        votes = Counter({entry_id: len(frames) for entry_id, frames in best.items()})
+        entry_id, matched = votes.most_common(1)[0]
+        if matched < self.min_frame_match * len(hashes):
+            return None, None
+        return entry_id, best[entry_id]
+
+    def lookup(self, image_path=None, video_path=None, hashes=None, owner=None):
+        """
+        Prior verdict for a near-duplicate of this image/video, or None.
+        Returns {"label", "probs", "sub_scores", "provenance"}.
+        owner: only match entries added with this owner (a session or API client), so
+        provenance never names media someone else analyzed; None matches every entry.
+        """
+        kind, hashes = hashes or self.hash_media(image_path, video_path)
+        with self._lock:
+            self._sync_locked()
+            entry_id, distances = self._search(kind, hashes, owner)
+            if entry_id is None:
+                return None
+            entry = self.entries[entry_id]
+        return {
+            "label": entry["label"],
+            "probs": entry["probs"],
+            "sub_scores": entry.get("sub_scores", {}),
+            "provenance": {
+                "entry_id": entry_id,
+                "label": entry["label"],
+                "source": entry.get("source"),
+                "analyzed_at": entry["analyzed_at"],
+                "distance": min(distances.values()),
+                "matched_frames": f"{len(distances)}/{len(hashes)}",
+            },
+        }
+
+    def add(self, label, probs, sub_scores=None, image_path=None, video_path=None, hashes=None, source=None,
+            owner=None):
+        """Record a fresh verdict so later near-duplicates can reuse it."""
+        kind, hashes = hashes or self.hash_media(image_path, video_path)
+        entry = {
+            "kind": kind,
+            "hashes": [[f"{p:016x}", f"{d:016x}"] for p, d in hashes],
+            "label": label,
+            "probs": [float(p) for p in probs],
+            "sub_scores": sub_scores or {},
+            "source": source or os.path.basename(image_path or video_path or ""),
+            "owner": owner,
+            "analyzed_at": time.time(),
+        }
+        with self._lock:
+            self._sync_locked()
+            self._insert(entry)
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "ab") as f:
+                    f.write((json.dumps({k: v for k, v in entry.items() if k != "id"}) + "\n").encode("utf-8"))
+                self._offset = os.path.getsize(self.path)
+        return entry["id"]
@@ -0,0 +1,370 @@
+# src/ensemble/vector_index.py
+# Local nearest-neighbour index over the image detector's penultimate features, so
+# new uploads can be matched against everything analyzed before ("similar to this
+# known fake"). Vectors are L2-normalized (inner product = cosine similarity) and
+# everything lives in append-only, memory-mapped files under one directory:
+#   index.json      dim / kind / IVF-PQ parameters
+#   vectors.f32     raw float32 rows (source of truth, exact re-ranking)
+#   meta.jsonl      one JSON record per vector; meta.idx holds their byte offsets
+#   quantizer.npz   coarse centroids + PQ codebooks (ivfpq, after training)
+#   codes.u8        PQ codes per vector; lists.i32 its inverted list (ivfpq)
+#
+# kind="flat" scans all rows in chunks (exact). kind="ivfpq" probes the `nprobe`
+# nearest of `nlist` coarse cells, scores candidates from PQ lookup tables and
+# re-ranks the best few exactly; until trained it searches like flat.
+#
+#   python -m src.ensemble.vector_index stats
+#   python -m src.ensemble.vector_index train --nlist 1024 --subquantizers 32
+
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+import json
+import threading
+
+import numpy as np
+
+INDEX_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "vector_index"))
+
+
+def normalize(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def kmeans(x, k, iters=15, seed=0, chunk=8192):
+    """Plain Lloyd k-means (squared L2); empty clusters are re-seeded from random points."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    assign = np.zeros(len(x), dtype=np.int64)
+    for _ in range(iters):
+        c_norms = (centroids ** 2).sum(axis=1)
+        for start in range(0, len(x), chunk):
+            block = x[start:start + chunk]
+            assign[start:start + chunk] = np.argmin(c_norms[None, :] - 2 * block @ centroids.T, axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        centroids[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+    return centroids, assign
+
+
+class VectorIndex:
+    def __init__(self, directory=INDEX_DIR, kind="flat", nlist=1024, subquantizers=32, nprobe=16, rerank=8):
+        """
+        kind: "flat" (exact) or "ivfpq" (approximate, needs train() once enough vectors exist).
+        nlist / subquantizers: coarse cells and PQ sub-vectors (must divide the dimension).
+        nprobe: cells searched per query; rerank: candidates re-scored exactly per result.
+        An existing index keeps the kind and parameters it was created with.
+        """
+        self.directory = directory
+        self.config = {"dim": None, "kind": kind, "nlist": nlist, "subquantizers": subquantizers}
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self._lock = threading.Lock()
+        self._vectors = None       # memmap view, reopened as the file grows
+        self._offsets = None
+        self._quantizer = None     # (centroids, codebooks)
+        self._lists = None         # inverted lists: cell → array of ids
+        self._quantizer_stamp = None  # quantizer.npz mtime this process has loaded
+        self._listed = 0              # rows of lists.i32 held in self._lists
+        config_path = os.path.join(directory, "index.json")
+        if os.path.exists(config_path):
+            with open(config_path, "r", encoding="utf-8") as f:
+                self.config.update(json.load(f))
+        self._load_quantizer()
+        self._quantizer_stamp = self._stamp()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _rows(self, name, dtype, width):
+        path = self._path(name)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // (np.dtype(dtype).itemsize * width)
+
+    def __len__(self):
+        if self.config["dim"] is None:
+            return 0
+        return min(self._rows("vectors.f32", np.float32, self.config["dim"]), self._rows("meta.idx", np.int64, 1))
+
+    @property
+    def trained(self):
+        return self._quantizer is not None
+
+    # ---------------------------------------------------------------- storage
+
+    def _view(self, name, dtype, width, count):
+        if count == 0:
+            return np.zeros((0, width), dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=(count, width))
+
+    def _vectors_view(self, count):
+        if self._vectors is None or len(self._vectors) != count:
+            self._vectors = self._view("vectors.f32", np.float32, self.config["dim"], count)
+        return self._vectors
+
+    def _append(self, name, array):
+        with open(self._path(name), "ab") as f:
+            np.ascontiguousarray(array).tofile(f)
+
+    def add(self, vectors, metadata):
+        """Append vectors (one metadata dict each); returns their ids."""
+        vectors = normalize(vectors)
+        if len(vectors) != len(metadata):
+            raise ValueError(f"{len(vectors)} vectors but {len(metadata)} metadata records")
+        with self._lock:
+            if self.config["dim"] is None:
+                self.config["dim"] = int(vectors.shape[1])
+                os.makedirs(self.directory, exist_ok=True)
+                self._save_config()
+            elif vectors.shape[1] != self.config["dim"]:
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match the index ({self.config['dim']})")
+
+            self._sync_locked()
+            start = len(self)
+            self._truncate(start)
+            ids = np.arange(start, start + len(vectors))
+            offsets = []
+            with open(self._path("meta.jsonl"), "ab") as f:
+                for id_, record in zip(ids, metadata):
+                    offsets.append(f.tell())
+                    f.write((json.dumps(dict(record, id=int(id_))) + "\n").encode("utf-8"))
+            self._append("vectors.f32", vectors)
+            if self.trained:
+                cells, codes = self._encode(vectors)
+                self._append("codes.u8", codes)
+                self._append("lists.i32", cells.astype(np.int32))
+                for cell, id_ in zip(cells, ids):
+                    self._lists[cell] = np.append(self._lists[cell], id_)
+                self._listed += len(ids)
+            # Offsets last: a record only counts once all of its files are written
+            self._append("meta.idx", np.array(offsets, dtype=np.int64))
+            self._offsets = None
+        return [int(i) for i in ids]
+
+    def _truncate(self, count):
+        """Drop rows an interrupted add() left past the last complete record."""
+        widths = {"vectors.f32": self.config["dim"] * 4}
+        if self.trained:
+            widths.update({"codes.u8": self.config["subquantizers"], "lists.i32": 4})
+        for name, width in widths.items():
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) > count * width:
+                os.truncate(path, count * width)
+
+    def metadata(self, ids):
+        """Stored records for vector ids."""
+        if len(ids) == 0:
+            return []
+        if self._offsets is None or len(self._offsets) != len(self):
+            self._offsets = self._view("meta.idx", np.int64, 1, len(self))[:, 0] if len(self) else np.zeros(0, np.int64)
+        records = []
+        with open(self._path("meta.jsonl"), "rb") as f:
+            for id_ in ids:
+                f.seek(int(self._offsets[id_]))
+                records.append(json.loads(f.readline()))
+        return records
+
+    def _save_config(self):
+        tmp_path = self._path("index.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.config, f, indent=2)
+        os.replace(tmp_path, self._path("index.json"))
+
+    # ---------------------------------------------------------------- IVF-PQ
+
+    def _stamp(self):
+        path = self._path("quantizer.npz")
+        return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+    def _sync_locked(self):
+        """
+        Reconcile with the files, which another process (the train CLI, a second app)
+        may have changed: load a newer quantizer, and encode vectors appended without
+        codes, so codes.u8 / lists.i32 rows always line up with vector ids.
+        """
+        stamp = self._stamp()
+        if stamp != self._quantizer_stamp:
+            with open(self._path("index.json"), "r", encoding="utf-8") as f:
+                self.config.update(json.load(f))
+            self._quantizer, self._lists = None, None
+            self._load_quantizer()
+            self._quantizer_stamp = stamp
+        if not self.trained:
+            return
+        count, m = len(self), self.config["subquantizers"]
+        coded = min(self._rows("codes.u8", np.uint8, m), self._rows("lists.i32", np.int32, 1))
+        if coded >= count:
+            if min(coded, count) > self._listed:
+                self._load_quantizer()  # rows another process appended
+            return
+        for name, width in (("codes.u8", m), ("lists.i32", 4)):
+            os.truncate(self._path(name), coded * width)
+        vectors = self._vectors_view(count)
+        for start in range(coded, count, 65536):
+            cells, codes = self._encode(np.asarray(vectors[start:min(count, start + 65536)]))
+            self._append("codes.u8", codes)
+            self._append("lists.i32", cells.astype(np.int32))
+        self._load_quantizer()
+
+    def _load_quantizer(self):
+        path = self._path("quantizer.npz")
+        if self.config["kind"] != "ivfpq" or not os.path.exists(path):
+            return
+        data = np.load(path)
+        self._quantizer = (data["centroids"], data["codebooks"])
+        count = self._rows("lists.i32", np.int32, 1)
+        cells = self._view("lists.i32", np.int32, 1, count)[:, 0]
+        order = np.argsort(cells, kind="stable")
+        bounds = np.searchsorted(cells[order], np.arange(len(self._quantizer[0]) + 1))
+        self._lists = [order[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+        self._listed = count
+
+    def _encode(self, vectors):
+        """Coarse cell and PQ codes (of the residual) for normalized vectors."""
+        centroids, codebooks = self._quantizer
+        cells = np.argmax(vectors @ centroids.T, axis=1)
+        residuals = vectors - centroids[cells]
+        m, _, sub = codebooks.shape
+        codes = np.empty((len(vectors), m), dtype=np.uint8)
+        for j in range(m):
+            part = residuals[:, j * sub:(j + 1) * sub]
+            dists = (codebooks[j] ** 2).sum(axis=1)[None, :] - 2 * part @ codebooks[j].T
+            codes[:, j] = np.argmin(dists, axis=1)
+        return cells, codes
+
+    def train(self, sample_size=65536, iters=15, seed=0):
+        """Fit coarse cells + PQ codebooks on (a sample of) the stored vectors and encode everything."""
+        if self.config["kind"] != "ivfpq":
+            raise ValueError("Only kind='ivfpq' indexes are trained.")
+        with self._lock:
+            count, dim = len(self), self.config["dim"]
+            m = self.config["subquantizers"]
+            if dim is None or dim % m:
+                raise ValueError(f"subquantizers={m} must divide the vector dimension ({dim})")
+            # ~39 training points per cell, 256 codes per sub-quantizer
+            nlist = min(self.config["nlist"], max(1, count // 39))
+            if count < 256:
+                raise ValueError(f"Need at least 256 vectors to train (have {count})")
+            vectors = self._vectors_view(count)
+            rng = np.random.default_rng(seed)
+            sample = np.asarray(vectors[np.sort(rng.choice(count, min(count, sample_size), replace=False))])
+
+            centroids, assign = kmeans(sample, nlist, iters, seed)
+            residuals = sample - centroids[assign]
+            sub = dim // m
+            codebooks = np.stack([kmeans(residuals[:, j * sub:(j + 1) * sub], 256, iters, seed + j)[0] for j in range(m)])
+            self._quantizer = (centroids.astype(np.float32), codebooks.astype(np.float32))
+
+            # Re-encode everything in chunks, then swap the files in
+            for name in ("codes.u8", "lists.i32"):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            for start in range(0, count, 65536):
+                cells, codes = self._encode(np.asarray(vectors[start:start + 65536]))
+                self._append("codes.u8", codes)
+                self._append("lists.i32", cells.astype(np.int32))
+            np.savez(self._path("quantizer.npz"), centroids=self._quantizer[0], codebooks=self._quantizer[1])
+            self.config["nlist"] = nlist
+            self._save_config()
+            self._load_quantizer()
+            self._quantizer_stamp = self._stamp()
+        return {"vectors": count, "nlist": nlist, "subquantizers": m, "bytes_per_vector": m}
+
+    # ---------------------------------------------------------------- search
+
+    def search(self, query, k=10, nprobe=None):
+        """Top-k (ids, cosine similarities) for one query vector, best first."""
+        query = normalize(query)[0]
+        if self.config["dim"] is not None:
+            with self._lock:
+                self._sync_locked()
+        count = len(self)
+        if count == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        vectors = self._vectors_view(count)
+        if self.trained:
+            candidates = self._ivfpq_candidates(query, k * self.rerank, nprobe or self.nprobe)
+            ids = candidates[candidates < count]
+            scores = np.asarray(vectors[ids]) @ query  # exact re-rank (sorted ids read the memmap in order)
+        else:
+            ids, scores = self._flat_search(vectors, query, k)
+        top = np.argsort(-scores)[:k]
+        return ids[top], scores[top]
+
+    def _flat_search(self, vectors, query, k, chunk=262144):
+        best_ids, best_scores = [], []
+        for start in range(0, len(vectors), chunk):
+            scores = np.asarray(vectors[start:start + chunk]) @ query
+            keep = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            best_ids.append(keep + start)
+            best_scores.append(scores[keep])
+        return np.concatenate(best_ids), np.concatenate(best_scores)
+
+    def _ivfpq_candidates(self, query, limit, nprobe):
+        centroids, codebooks = self._quantizer
+        coarse = centroids @ query
+        probed = np.argsort(-coarse)[:nprobe]
+        m, _, sub = codebooks.shape
+        # q·x ≈ q·c + Σ_j q_j·codebook_j[code_j]: one lookup table serves every cell
+        table = np.einsum("jcs,js->jc", codebooks, query.reshape(m, sub))
+        codes = np.memmap(self._path("codes.u8"), dtype=np.uint8, mode="r").reshape(-1, m)
+        ids = np.concatenate([self._lists[c] for c in probed])
+        if len(ids) == 0:
+            return ids
+        base = np.concatenate([np.full(len(self._lists[c]), coarse[c], dtype=np.float32) for c in probed])
+        order = np.argsort(ids)  # read the codes memmap front to back
+        ids, base = ids[order], base[order]
+        approx = base + table[np.arange(m), codes[ids]].sum(axis=1)
+        keep = np.argpartition(-approx, min(limit, len(ids)) - 1)[:limit]
+        return np.sort(ids[keep])
+
+    def query(self, vector, k=10, label=None, owner=None):
+        """
+        Nearest stored records: [{"id", "similarity", **metadata}], best first.
+        label: only return records with this verdict (e.g. "Fake").
+        owner: only return records added with this "owner" (a session or API client),
+        so one user never sees what others analyzed.
+        """
+        def wanted(record):
+            return (label is None or record.get("label") == label) and \
+                   (owner is None or record.get("owner") == owner)
+
+        fetch = k if label is None and owner is None else k * 4
+        while True:
+            ids, scores = self.search(vector, fetch)
+            results = [dict(record, similarity=float(score))
+                       for record, score in zip(self.metadata(ids), scores) if wanted(record)]
+            if len(results) >= k or len(ids) < fetch:
+                return results[:k]
+            fetch *= 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or train the analyzed-media vector index")
+    parser.add_argument("command", choices=["stats", "train"])
+    parser.add_argument("--dir", default=INDEX_DIR)
+    parser.add_argument("--nlist", type=int, default=None, help="coarse cells (train)")
+    parser.add_argument("--subquantizers", type=int, default=None, help="PQ bytes per vector (train)")
+    parser.add_argument("--sample", type=int, default=65536, help="training sample size")
+    args = parser.parse_args()
+
+    index = VectorIndex(args.dir)
+    if args.command == "train":
+        index.config["kind"] = "ivfpq"
+        for key in ("nlist", "subquantizers"):
+            if getattr(args, key):
+                index.config[key] = getattr(args, key)
+        print(f"🧮 Training IVF-PQ on {len(index)} vectors...")
+        print(f"✅ {index.train(sample_size=args.sample)}")
+    else:
+        print(json.dumps({"vectors": len(index), "trained": index.trained, **index.config}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
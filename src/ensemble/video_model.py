@@ -1,49 +1,163 @@
 # src/ensemble/video_model.py
 
 from transformers import AutoModelForVideoClassification, AutoProcessor
-import cv2
+import math
+import subprocess
+
 import numpy as np
 import torch
+from src.ensemble.detectors import two_class
+from src.image_utils.face_detection import FaceTrackCache
+from src.utils.compiled_models import compile_model
+from src.utils.model_registry import load_pretrained
+from src.utils.video_decode import SceneChangeSampler, ThreadedFrameReader, every_nth, every_seconds, open_decoder
+
+
+def load_soundtrack(video_path, sr=16000):
+    """
+    Mono float32 soundtrack of a video, or None without an audio stream. Decoded by the
+    FFmpeg binary bundled with imageio-ffmpeg, else by librosa (needs FFmpeg on PATH).
+    """
+    try:
+        import imageio_ffmpeg
+        cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-v", "error", "-i", video_path,
+               "-vn", "-ac", "1", "-ar", str(sr), "-f", "f32le", "-"]
+        raw = subprocess.run(cmd, capture_output=True, check=True).stdout
+        waveform = np.frombuffer(raw, dtype=np.float32).copy()
+    except ImportError:
+        import librosa
+        try:
+            waveform, _ = librosa.load(video_path, sr=sr)
+        except Exception:
+            return None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return waveform if waveform.size else None
 
 
 class VideoDeepfakeModel:
-    def __init__(self, model_name="MCG-NJU/videomae-base-finetuned-kinetics", device=None):
+    def __init__(self, model_name="MCG-NJU/videomae-base-finetuned-kinetics", device=None,
+                 face_detector=None, detect_every=5, model=None, processor=None,
+                 decode_backend="auto", decode_threads=0, hwaccel=None, sampling="adaptive", frame_budget=32,
+                 sample_interval=0.5):
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self.model = AutoModelForVideoClassification.from_pretrained(model_name).to(self.device)
-        self.processor = AutoProcessor.from_pretrained(model_name)
+        # Decoding: 'auto' (PyAV if installed, else OpenCV), 'pyav' or 'opencv'; see src/utils/video_decode.py
+        self.decode_backend = decode_backend
+        self.decode_threads = decode_threads
+        self.hwaccel = hwaccel
+        # 'adaptive': ~frame_budget frames placed on visual change; 'fixed': every frame_skip-th frame;
+        # 'seconds': one frame per sample_interval seconds of video, whatever the frame rate
+        if sampling not in ("adaptive", "fixed", "seconds"):
+            raise ValueError(f"Unknown frame sampling: {sampling} (expected 'adaptive', 'fixed' or 'seconds')")
+        self.sampling = sampling
+        self.frame_budget = frame_budget
+        self.sample_interval = sample_interval
+        # Face boxes are reused across `detect_every` sampled frames (one track per video, see predict_av)
+        self.face_detector = face_detector
+        self.detect_every = detect_every
+        self.model = (model if model is not None else load_pretrained(AutoModelForVideoClassification, model_name)).to(self.device)
+        self.processor = processor if processor is not None else load_pretrained(AutoProcessor, model_name)
+
+    def compile(self, backend="inductor", cache_dir=None):
+        """Compile VideoMAE once at load; clip length varies, so this always uses inductor."""
+        if backend != "inductor":
+            print("⚠️ Video clips have variable length — compiling VideoMAE with inductor instead.")
+        frames = [np.zeros((224, 224, 3), dtype=np.uint8)] * self.model.config.num_frames
+        inputs = self.processor(images=frames, return_tensors="pt").to(self.device)
+        self.model = compile_model(self.model, dict(inputs), backend="inductor", cache_dir=cache_dir)
+
+    def open_frames(self, video_path, frame_skip=15, audio_rate=None):
+        """
+        Threaded reader yielding the sampled frames as (index, timestamp, RGB array).
+        audio_rate: also demux the soundtrack in the same pass (reader.decoder.audio()).
+        """
+        decoder = open_decoder(video_path, self.decode_backend, self.decode_threads, self.hwaccel, audio_rate)
+        if self.sampling == "fixed":
+            return ThreadedFrameReader(decoder, every_nth(frame_skip))
+        if self.sampling == "seconds":
+            return ThreadedFrameReader(decoder, every_seconds(self.sample_interval))
+        # Static shots still get a frame every ~4 seconds
+        max_gap = int(decoder.fps * 4) if decoder.fps else 120
+        sampler = SceneChangeSampler(self.frame_budget, decoder.frame_count, max_gap=max_gap)
+        return ThreadedFrameReader(decoder, sampler)
 
-    def extract_frames(self, video_path, frame_skip=15):
-        """Extract every Nth frame to reduce processing load."""
-        cap = cv2.VideoCapture(video_path)
+    def expected_samples(self, frame_count, frame_skip=15, fps=0.0):
+        """Frames the sampler will keep — an upper bound for 'adaptive' (0 if the length is unknown)."""
+        if frame_count <= 0:
+            return 0
+        if self.sampling == "fixed":
+            return -(-frame_count // frame_skip)
+        if self.sampling == "seconds":
+            return math.ceil(frame_count / fps / self.sample_interval) if fps else 0
+        return min(frame_count, self.frame_budget)
+
+    def extract_frames(self, video_path, frame_skip=15, progress=None):
+        """Extract the sampled frames (every Nth with sampling='fixed') to reduce processing load."""
         frames = []
-        count = 0
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            if count % frame_skip == 0:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frames.append(frame_rgb)
-            count += 1
-        cap.release()
+        with self.open_frames(video_path, frame_skip) as reader:
+            for index, _, frame in reader:
+                frames.append(frame)
+                if progress is not None:
+                    progress(frames_decoded=index + 1, frames_sampled=len(frames))
         return frames
 
-    def predict(self, video_path: str):
-        frames = self.extract_frames(video_path)
-        if not frames:
-            raise ValueError("No frames extracted from video!")
+    def predict(self, video_path: str, progress=None, frame_skip=15):
+        """
+        Real/fake probabilities averaged over fixed-length clips of the sampled frames
+        (frame_skip applies to sampling='fixed').
+        progress: optional callback receiving frames_decoded / windows_scored counters;
+        it may raise to abort (used by background jobs for cancellation).
+        """
+        probs, _ = self.predict_av(video_path, progress=progress, frame_skip=frame_skip, audio_rate=None)
+        return probs
 
-        # Processor expects a single list of frames under key 'video'
-        inputs = self.processor(images=list(frames), return_tensors="pt").to(self.device)
+    def predict_av(self, video_path: str, progress=None, frame_skip=15, audio_rate=16000):
+        """
+        Like predict(), and also returns the soundtrack demuxed during the same read as a
+        mono float32 waveform at `audio_rate` — (probs, waveform). Decoders without audio
+        support (OpenCV) fall back to loading the soundtrack with librosa afterwards; the
+        waveform is None when the file has no audio stream.
+        """
+        size = self.model.config.num_frames
+        # Per call, so videos analyzed concurrently never share track state
+        face_track = FaceTrackCache(self.face_detector, self.detect_every) if self.face_detector is not None else None
 
+        window_probs = []
 
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            probs = torch.softmax(outputs.logits, dim=-1).cpu().numpy()[0]
+        def score(clip):
+            if face_track is not None:
+                clip = face_track.crop_sequence(clip, reset=False)
+            clip = clip + [clip[-1]] * (size - len(clip))  # pad the last window to the model's length
+            # Processor expects a single list of frames under key 'video'
+            inputs = self.processor(images=clip, return_tensors="pt").to(self.device)
+            with torch.no_grad():
+                outputs = self.model(**inputs)
+                window_probs.append(torch.softmax(outputs.logits, dim=-1).cpu().numpy()[0])
 
-        # Normalize to 2-class [Real, Fake] style output
-        if len(probs) >= 2:
-            return np.array([probs[0], probs[1]])
-        else:
-            return np.array([1 - probs[0], probs[0]])
+        # Windows are scored as soon as they fill, while the decoder thread keeps reading
+        with self.open_frames(video_path, frame_skip, audio_rate) as reader:
+            decoder = reader.decoder
+            expected = -(-self.expected_samples(decoder.frame_count, frame_skip, decoder.fps) // size)
+            clip, sampled = [], 0
+            for index, _, frame in reader:
+                clip.append(frame)
+                sampled += 1
+                if progress is not None:
+                    progress(frames_decoded=index + 1, frames_sampled=sampled)
+                if len(clip) == size:
+                    score(clip)
+                    clip = []
+                    if progress is not None:
+                        progress(windows_scored=len(window_probs), windows_total=max(expected, len(window_probs)))
+            if clip:
+                score(clip)
+                if progress is not None:
+                    progress(windows_scored=len(window_probs), windows_total=len(window_probs))
+            waveform = reader.decoder.audio()
 
+        if not window_probs:
+            raise ValueError("No frames extracted from video!")
+        if waveform is None and audio_rate:
+            waveform = load_soundtrack(video_path, audio_rate)
+        # Normalize to 2-class [Real, Fake] style output
+        return two_class(np.mean(window_probs, axis=0)), waveform
@@ -0,0 +1,192 @@
+# src/ensemble/weight_search.py
+# Vectorized search for ensemble weights and decision threshold over stored
+# per-model sub-scores. No model is loaded: every candidate weighting is scored
+# from an (N, M) score matrix, and the best threshold for each weighting comes
+# out of one sort + cumulative sum.
+#
+#   python -m src.ensemble.weight_search --manifest samples_test/manifest.csv          # image_ensemble, eval cache
+#   python -m src.ensemble.weight_search --scores subscores.csv --section deepfake_ensemble
+#
+# --scores takes a CSV with a `label` column plus one column per ensemble member.
+
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+import csv
+import itertools
+import time
+
+import numpy as np
+
+from src.ensemble.calibration import apply_calibration, load_calibrators
+from src.ensemble.ensemble_config import DEFAULTS, save_ensemble_config
+from src.ensemble.evaluation import LABELS, compute_metrics
+
+METRICS = ("accuracy", "balanced_accuracy", "f1")
+
+
+def weight_grid(n_models, step=0.05):
+    """All weight vectors on the simplex with the given step, shape (K, n_models)."""
+    ticks = int(round(1 / step))
+    rows = [
+        c + (ticks - sum(c),)
+        for c in itertools.product(range(ticks + 1), repeat=n_models - 1)
+        if sum(c) <= ticks
+    ]
+    grid = np.array(rows, dtype=np.float64) / ticks
+    return grid[grid.sum(axis=1) > 0]
+
+
+def best_thresholds(fused, labels, metric="accuracy"):
+    """
+    Best decision threshold for every column of `fused` (N, K) at once.
+    Candidate cuts lie between consecutive sorted scores; a sample is called fake
+    when its score is > threshold, matching both ensembles. Returns (values, thresholds).
+    """
+    n = fused.shape[0]
+    order = np.argsort(-fused, axis=0, kind="stable")
+    ranked = np.take_along_axis(fused, order, axis=0)
+    # Cut i = "top i samples are fake", i = 0..n
+    tp = np.vstack([np.zeros((1, fused.shape[1])), np.cumsum(labels[order], axis=0)])
+    called = np.arange(n + 1)[:, None]
+    fp = called - tp
+    pos = labels.sum()
+    neg = n - pos
+    fn = pos - tp
+    tn = neg - fp
+
+    if metric == "accuracy":
+        value = (tp + tn) / n
+    elif metric == "balanced_accuracy":
+        value = 0.5 * (tp / max(pos, 1) + tn / max(neg, 1))
+    elif metric == "f1":
+        value = 2 * tp / np.maximum(2 * tp + fp + fn, 1)
+    else:
+        raise ValueError(f"Unknown metric: {metric} (expected one of {METRICS})")
+
+    # Cutting between tied scores is not realizable by a threshold
+    value[1:n][ranked[:-1] == ranked[1:]] = -np.inf
+
+    best = np.argmax(value, axis=0)
+    cols = np.arange(fused.shape[1])
+    upper = np.vstack([ranked, np.full((1, fused.shape[1]), -np.inf)])  # score just below the cut
+    lower = np.vstack([np.full((1, fused.shape[1]), np.inf), ranked])  # score just above the cut
+    above, below = lower[best, cols], upper[best, cols]
+    thresholds = np.where(
+        np.isinf(below), np.nextafter(above, -np.inf),
+        np.where(np.isinf(above), below, (above + below) / 2),
+    )
+    return value[best, cols], thresholds
+
+
+def grid_search(scores, labels, step=0.05, metric="accuracy", refine=True, chunk_elems=4_000_000):
+    """
+    Exhaustive weight search on the simplex (+ optional finer pass around the best
+    point). Returns {"weights", "threshold", metric, "evaluated", "seconds"}.
+    """
+    start = time.perf_counter()
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.int64)
+
+    def search(grid):
+        chunk = max(1, chunk_elems // max(1, len(scores)))
+        best_value, best_weights, best_threshold = -np.inf, None, None
+        for i in range(0, len(grid), chunk):
+            w = grid[i:i + chunk]
+            fused = scores @ (w / w.sum(axis=1, keepdims=True)).T
+            values, thresholds = best_thresholds(fused, labels, metric)
+            j = int(np.argmax(values))
+            if values[j] > best_value:
+                best_value, best_weights, best_threshold = values[j], w[j], thresholds[j]
+        return best_value, best_weights, best_threshold
+
+    grid = weight_grid(scores.shape[1], step)
+    evaluated = len(grid)
+    value, weights, threshold = search(grid)
+
+    if refine:
+        # Finer simplex grid restricted to a ±step box around the coarse optimum
+        fine = weight_grid(scores.shape[1], step / 5)
+        fine = fine[np.all(np.abs(fine - weights) <= step + 1e-9, axis=1)]
+        evaluated += len(fine)
+        fine_value, fine_weights, fine_threshold = search(fine)
+        if fine_value > value:
+            value, weights, threshold = fine_value, fine_weights, fine_threshold
+
+    return {
+        "weights": [round(float(w), 4) for w in weights],
+        "threshold": float(threshold),
+        metric: float(value),
+        "evaluated": evaluated,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def read_score_table(path, members):
+    """CSV with `label` plus one column per member → (scores (N, M), labels (N,))."""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    scores = np.array([[float(r[m]) for m in members] for r in rows], dtype=np.float64)
+    labels = np.array([LABELS[str(r["label"]).strip().lower()] for r in rows], dtype=np.int64)
+    return scores, labels
+
+
+def load_subscores(args, members):
+    """(scores, labels) from --scores CSV or from the eval cache for --manifest."""
+    if args.scores:
+        return read_score_table(args.scores, members)
+
+    from src.ensemble.evaluation import ScoreCache, collect_scores, read_manifest, score_key
+
+    def uncached(images):
+        # Tuning never runs models; every manifest item must already be scored
+        raise SystemExit("Uncached images in manifest — run app/test_ensemble_accuracy.py first")
+
+    scorers = {score_key(m, args.face_crop, args.compile): uncached for m in members}
+    scores, labels, _ = collect_scores(read_manifest(args.manifest), scorers, ScoreCache(args.cache))
+    return scores, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune ensemble weights and threshold from stored sub-scores")
+    parser.add_argument("--section", default="image_ensemble", choices=sorted(DEFAULTS))
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="evaluation manifest whose scores are in the eval cache")
+    source.add_argument("--scores", help="CSV with label + one column per ensemble member")
+    parser.add_argument("--cache", default=os.path.join(os.path.dirname(__file__), "..", "..", "data", "eval", "scores.json"))
+    parser.add_argument("--face-crop", action="store_true", help="use the face-crop scores from the eval cache")
+    parser.add_argument("--compile", choices=["inductor", "torchscript"], default=None,
+                        help="use the scores cached with this compile backend")
+    parser.add_argument("--metric", default="balanced_accuracy", choices=METRICS)
+    parser.add_argument("--step", type=float, default=0.05)
+    parser.add_argument("--dry-run", action="store_true", help="print the result without writing the config")
+    args = parser.parse_args()
+
+    members = DEFAULTS[args.section]["members"]
+    scores, labels = load_subscores(args, members)
+    # Search over calibrated scores, the same ones the ensembles fuse at inference
+    scores = apply_calibration(scores, members, load_calibrators(args.section))
+
+    baseline = compute_metrics(scores, labels, DEFAULTS[args.section]["weights"], DEFAULTS[args.section]["threshold"])
+    result = grid_search(scores, labels, step=args.step, metric=args.metric)
+    tuned = compute_metrics(scores, labels, result["weights"], result["threshold"])
+
+    print(f"Searched {result['evaluated']} weightings in {result['seconds']:.2f}s "
+          f"({result['evaluated'] / max(result['seconds'], 1e-9):,.0f}/s)")
+    print(f"Weights {dict(zip(members, result['weights']))}  threshold {result['threshold']:.4f}")
+    for name in ("accuracy", "precision", "recall", "f1", "auc"):
+        print(f"  {name:<10} {baseline[name]:.3f} → {tuned[name]:.3f}")
+
+    if not args.dry_run:
+        path = save_ensemble_config(args.section, {
+            "weights": result["weights"],
+            "threshold": result["threshold"],
+            "metric": args.metric,
+            "samples": int(len(labels)),
+        })
+        print(f"💾 Saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# src/ensemble/worker_pool.py
+# Preload-then-fork serving: the parent loads and freezes DeepfakeEnsemble once,
+# forked workers then share its weight pages instead of loading their own copy.
+
+import gc
+import multiprocessing as mp
+import os
+
+import torch
+
+from .ensemble_core import DeepfakeEnsemble
+
+# Set in the parent before forking; inherited (copy-on-write) by every worker
+_worker_ensemble = None
+
+
+def freeze_model(module):
+    """Inference-only module with parameters/buffers moved to shared memory."""
+    module.eval()
+    for param in module.parameters():
+        param.requires_grad_(False)
+    module.share_memory()
+    return module
+
+
+def freeze_ensemble(ensemble):
+    """Freeze every sub-model of a DeepfakeEnsemble in place."""
+    for member in (ensemble.image_model, ensemble.video_model, ensemble.audio_model):
+        # Compiled TorchScript wrappers keep the real module under `.module`
+        module = getattr(member.model, "module", member.model)
+        if isinstance(module, torch.nn.Module):
+            freeze_model(module)
+    return ensemble
+
+
+def model_nbytes(ensemble):
+    """Total parameter + buffer bytes held by the ensemble's models."""
+    total = 0
+    for member in (ensemble.image_model, ensemble.video_model, ensemble.audio_model):
+        module = getattr(member.model, "module", member.model)
+        if isinstance(module, torch.nn.Module):
+            total += sum(t.numel() * t.element_size() for t in list(module.parameters()) + list(module.buffers()))
+    return total
+
+
+def process_memory(pid):
+    """RSS / PSS / shared / private bytes for a process (Linux smaps_rollup)."""
+    stats = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[-1] == "kB":
+                    stats[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        return {"pid": pid}
+    return {
+        "pid": pid,
+        "rss": stats.get("Rss", 0),
+        "pss": stats.get("Pss", 0),
+        "shared": stats.get("Shared_Clean", 0) + stats.get("Shared_Dirty", 0),
+        "private": stats.get("Private_Clean", 0) + stats.get("Private_Dirty", 0),
+    }
+
+
+def _init_worker(threads_per_worker):
+    # N workers x default thread count would oversubscribe the CPU
+    torch.set_num_threads(threads_per_worker)
+
+
+def _run_predict(kwargs):
+    return _worker_ensemble.predict(**kwargs)
+
+
+class ForkedEnsemblePool:
+    def __init__(self, ensemble=None, workers=2, threads_per_worker=1, **ensemble_kwargs):
+        """
+        Load (or take) one DeepfakeEnsemble, freeze it into shared memory and fork
+        `workers` processes that serve predictions from the shared weights.
+        Avoid running inference in the parent before forking: OpenMP thread pools
+        are not fork-safe.
+        """
+        global _worker_ensemble
+        if "fork" not in mp.get_all_start_methods():
+            raise RuntimeError("Preload-then-fork needs the 'fork' start method (Linux/macOS).")
+
+        _worker_ensemble = freeze_ensemble(ensemble or DeepfakeEnsemble(**ensemble_kwargs))
+        self.ensemble = _worker_ensemble
+
+        # Park every live object in the permanent GC generation so collections in the
+        # workers don't write to (and therefore copy) the parent's object pages
+        gc.collect()
+        gc.freeze()
+        self.pool = mp.get_context("fork").Pool(workers, initializer=_init_worker, initargs=(threads_per_worker,))
+
+    def predict(self, **kwargs):
+        """Same arguments as DeepfakeEnsemble.predict, run in a worker."""
+        return self.pool.apply(_run_predict, (kwargs,))
+
+    def map(self, requests):
+        """Run a list of predict kwargs dicts across the workers."""
+        return self.pool.map(_run_predict, requests)
+
+    def memory_report(self):
+        """Parent + per-worker memory next to the model footprint, in bytes."""
+        return {
+            "model_bytes": model_nbytes(self.ensemble),
+            "parent": process_memory(os.getpid()),
+            "workers": [process_memory(p.pid) for p in self.pool._pool],
+        }
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        gc.unfreeze()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,153 @@
+# src/image_utils/clip_embeddings.py
+# One CLIP image embedding per upload, reused by every zero-shot head. Embeddings
+# are L2-normalized and cached by content hash (file SHA-256 for paths, pixel hash
+# for in-memory crops); prompt embeddings are cached per head. A head is then just
+# softmax(logit_scale * image_embedding @ prompt_embeddings.T) — the same numbers
+# CLIPModel's logits_per_image gives — so extra classification tasks cost a matrix
+# product instead of another vision forward pass.
+
+import collections
+import hashlib
+import threading
+
+import numpy as np
+import torch
+from PIL import Image
+
+from src.utils.hashing import file_digest
+
+
+def pixel_digest(image):
+    """Content hash of a decoded PIL image (mode, size and pixels)."""
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(f"{image.mode}{image.size}".encode())
+    hasher.update(image.tobytes())
+    return hasher.hexdigest()
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class ClipEmbeddingService:
+    def __init__(self, pair, device="cpu", cache_size=1024):
+        """
+        pair: (CLIPProcessor, CLIPModel), e.g. init_ensemble()["clip"] (may be a LazyModel).
+        cache_size: image embeddings kept (LRU); 512-D float32 is 2 KB each.
+        """
+        self.pair = pair
+        self.device = device
+        self.cache_size = cache_size
+        self.heads = {}
+        self.stats = {"hits": 0, "misses": 0}
+        self._images = collections.OrderedDict()  # content hash → embedding (D,)
+        self._texts = {}                          # prompts tuple → (P, D)
+        self._lock = threading.Lock()
+
+    def _cached(self, key):
+        with self._lock:
+            embedding = self._images.get(key)
+            if embedding is not None:
+                self._images.move_to_end(key)
+                self.stats["hits"] += 1
+            return embedding
+
+    def _store(self, key, embedding):
+        with self._lock:
+            self.stats["misses"] += 1
+            self._images[key] = embedding
+            self._images.move_to_end(key)
+            while len(self._images) > self.cache_size:
+                self._images.popitem(last=False)
+
+    def _clip(self):
+        """(processor, CLIPModel); a TorchScript trace only yields logits, so embed with its eager source."""
+        proc, model = self.pair
+        if not hasattr(model, "get_image_features"):
+            model = getattr(model, "source", None)
+            if model is None:
+                raise TypeError("CLIP embeddings need an eager or inductor-compiled CLIPModel, not a bare trace.")
+        return proc, model
+
+    def _encode_images(self, images):
+        proc, model = self._clip()
+        inputs = proc(images=images, return_tensors="pt").to(self.device)
+        with torch.no_grad():
+            features = model.get_image_features(**inputs)
+        features = features / features.norm(dim=-1, keepdim=True)
+        return features.cpu().numpy().astype(np.float32)
+
+    def embed_images(self, images, keys=None):
+        """(N, D) normalized embeddings of PIL images; only cache misses go through CLIP, in one batch."""
+        keys = keys or [pixel_digest(image) for image in images]
+        embeddings = [self._cached(key) for key in keys]
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            for i, embedding in zip(missing, self._encode_images([images[i] for i in missing])):
+                self._store(keys[i], embedding)
+                embeddings[i] = embedding
+        return np.stack(embeddings)
+
+    def embed_file(self, image_path):
+        """(D,) embedding of an image file; decoded only when its content hash is not cached."""
+        key = file_digest(image_path)
+        embedding = self._cached(key)
+        if embedding is not None:
+            return embedding
+        return self.embed_images([Image.open(image_path).convert("RGB")], keys=[key])[0]
+
+    def text_embeddings(self, prompts):
+        """(P, D) normalized prompt embeddings, computed once per prompt list."""
+        prompts = tuple(prompts)
+        with self._lock:
+            cached = self._texts.get(prompts)
+        if cached is not None:
+            return cached
+        proc, model = self._clip()
+        inputs = proc(text=list(prompts), return_tensors="pt", padding=True).to(self.device)
+        with torch.no_grad():
+            features = model.get_text_features(**inputs)
+        features = (features / features.norm(dim=-1, keepdim=True)).cpu().numpy().astype(np.float32)
+        with self._lock:
+            self._texts[prompts] = features
+        return features
+
+    def logit_scale(self):
+        _, model = self._clip()
+        return float(model.logit_scale.detach().exp())
+
+    def zero_shot(self, embeddings, prompts):
+        """(N, P) probabilities over `prompts` for (N, D) image embeddings."""
+        logits = self.logit_scale() * np.atleast_2d(embeddings) @ self.text_embeddings(prompts).T
+        return _softmax(logits)
+
+    def head(self, name, prompts, labels=None):
+        """Register (or fetch) a named zero-shot head over this service's embeddings."""
+        if name not in self.heads:
+            self.heads[name] = ZeroShotHead(self, name, prompts, labels)
+        return self.heads[name]
+
+
+class ZeroShotHead:
+    def __init__(self, service, name, prompts, labels=None):
+        """labels: display names for the prompts (defaults to the prompts themselves)."""
+        self.service = service
+        self.name = name
+        self.prompts = list(prompts)
+        self.labels = list(labels or prompts)
+
+    def probs(self, embeddings):
+        return self.service.zero_shot(embeddings, self.prompts)
+
+    def scores(self, image_path):
+        """{label: probability} for an image file."""
+        probs = self.probs(self.service.embed_file(image_path))[0]
+        return dict(zip(self.labels, map(float, probs)))
+
+    def predict(self, image_path: str):
+        """Top label and probability (same interface as ImageRecognition.predict)."""
+        probs = self.probs(self.service.embed_file(image_path))[0]
+        top = int(np.argmax(probs))
+        return self.labels[top], float(probs[top])
@@ -0,0 +1,123 @@
+# src/image_utils/face_detection.py
+
+import os
+import cv2
+import numpy as np
+
+
+class FaceDetector:
+    def __init__(self, backend="haar", dnn_proto=None, dnn_weights=None,
+                 min_confidence=0.6, margin=0.25, max_faces=4, detect_size=640):
+        """
+        Offline face localizer built on the detectors that ship with OpenCV.
+        backend: 'haar' (bundled frontal-face cascade) or 'dnn' (res10 SSD,
+        needs the prototxt / caffemodel paths).
+        """
+        self.backend = backend
+        self.min_confidence = min_confidence
+        self.margin = margin
+        self.max_faces = max_faces
+        self.detect_size = detect_size
+        self.calls = 0
+
+        if backend == "dnn":
+            if not (dnn_proto and dnn_weights and os.path.exists(dnn_proto) and os.path.exists(dnn_weights)):
+                raise FileNotFoundError("DNN face detector needs existing dnn_proto and dnn_weights files.")
+            self.net = cv2.dnn.readNetFromCaffe(dnn_proto, dnn_weights)
+        elif backend == "haar":
+            cascade_path = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+            self.cascade = cv2.CascadeClassifier(cascade_path)
+            if self.cascade.empty():
+                raise FileNotFoundError(f"Haar cascade not found at: {cascade_path}")
+        else:
+            raise ValueError(f"Unknown face detector backend: {backend}")
+
+    def detect(self, image_rgb):
+        """Return face boxes as (x, y, w, h), largest first, in original pixel coords."""
+        self.calls += 1
+        h, w = image_rgb.shape[:2]
+        scale = min(1.0, self.detect_size / max(h, w))
+        small = cv2.resize(image_rgb, (int(w * scale), int(h * scale))) if scale < 1.0 else image_rgb
+
+        if self.backend == "dnn":
+            blob = cv2.dnn.blobFromImage(cv2.cvtColor(small, cv2.COLOR_RGB2BGR), 1.0, (300, 300),
+                                         (104.0, 177.0, 123.0))
+            self.net.setInput(blob)
+            detections = self.net.forward()[0, 0]
+            sh, sw = small.shape[:2]
+            boxes = []
+            for det in detections:
+                if det[2] < self.min_confidence:
+                    continue
+                x1, y1, x2, y2 = det[3:7] * np.array([sw, sh, sw, sh])
+                boxes.append((x1, y1, x2 - x1, y2 - y1))
+        else:
+            gray = cv2.equalizeHist(cv2.cvtColor(small, cv2.COLOR_RGB2GRAY))
+            boxes = self.cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(24, 24))
+
+        boxes = [tuple(int(round(v / scale)) for v in box) for box in boxes]
+        boxes = sorted(boxes, key=lambda b: b[2] * b[3], reverse=True)[:self.max_faces]
+        return [self.expand(box, w, h) for box in boxes]
+
+    def expand(self, box, width, height):
+        """Grow a box by the margin and square it, clamped to the image."""
+        x, y, w, h = box
+        side = int(max(w, h) * (1 + 2 * self.margin))
+        cx, cy = x + w // 2, y + h // 2
+        x0 = max(0, cx - side // 2)
+        y0 = max(0, cy - side // 2)
+        x1 = min(width, x0 + side)
+        y1 = min(height, y0 + side)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def crop_faces(self, image_rgb, boxes=None):
+        """Crop detected faces; falls back to the full frame when none are found."""
+        if boxes is None:
+            boxes = self.detect(image_rgb)
+        crops = [image_rgb[y:y + h, x:x + w] for x, y, w, h in boxes if w > 0 and h > 0]
+        return crops if crops else [image_rgb]
+
+
+class FaceTrackCache:
+    def __init__(self, detector: FaceDetector, refresh_every=5):
+        """
+        Reuses face boxes across adjacent sampled video frames so the detector
+        only runs on every `refresh_every`-th frame.
+        """
+        self.detector = detector
+        self.refresh_every = max(1, refresh_every)
+        self.reset()
+
+    def reset(self):
+        self.boxes = []
+        self.age = 0
+        self.misses = 0
+
+    def boxes_for(self, frame_rgb):
+        if self.age % self.refresh_every == 0:
+            found = self.detector.detect(frame_rgb)
+            # Keep the previous track through a single detector miss
+            if found or self.misses >= 1:
+                self.boxes = found
+            self.misses = 0 if found else self.misses + 1
+        self.age += 1
+        return self.boxes
+
+    def crop_sequence(self, frames, size=224, reset=True):
+        """
+        Crop the primary face from every frame to a fixed square size.
+        reset=False continues the current track (consecutive windows of one video).
+        """
+        if reset:
+            self.reset()
+        crops, found_any = [], False
+        for frame in frames:
+            boxes = self.boxes_for(frame)
+            if boxes:
+                x, y, w, h = boxes[0]
+                frame = frame[y:y + h, x:x + w]
+                found_any = True
+            crops.append(frame)
+        if not found_any:
+            return list(frames)
+        return [cv2.resize(crop, (size, size)) for crop in crops]
@@ -7,9 +7,9 @@ import re
 from PIL import Image
 
 class NumberPlateRecognizer:
-    def __init__(self):
-        """Initialize EasyOCR reader for English plates."""
-        self.reader = easyocr.Reader(['en'])
+    def __init__(self, reader=None):
+        """Initialize EasyOCR reader for English plates (or use a prebuilt reader)."""
+        self.reader = reader if reader is not None else easyocr.Reader(['en'])
 
     def detect_plate_region(self, image_path):
         """Detect rectangular region that looks like a plate, with safe image loading."""
@@ -0,0 +1,104 @@
+# src/image_utils/perceptual_hash.py
+# 64-bit perceptual hashes (pHash, dHash) that survive re-encoding, resizing and
+# recompression, plus a BK-tree for Hamming-radius search over them.
+
+import cv2
+import numpy as np
+
+
+def _gray(image):
+    """Accepts a path, a grayscale array or an RGB array."""
+    if isinstance(image, str):
+        gray = cv2.imread(image, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError(f"Could not read image: {image}")
+        return gray
+    return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if image.ndim == 3 else image
+
+
+def _bits_to_int(bits):
+    return int("".join("1" if b else "0" for b in bits.flatten()), 2)
+
+
+def phash(image):
+    """DCT hash: low-frequency 8x8 block of a 32x32 thumbnail, thresholded at its median."""
+    small = cv2.resize(_gray(image), (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    block = cv2.dct(small)[:8, :8]
+    return _bits_to_int(block > np.median(block.flatten()[1:]))  # DC term left out of the median
+
+
+def dhash(image):
+    """Gradient hash: sign of horizontal differences on a 9x8 thumbnail."""
+    small = cv2.resize(_gray(image), (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def image_hashes(image):
+    return phash(image), dhash(image)
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def video_keyframes(video_path, count=8):
+    """`count` frames (RGB) spread evenly over the clip, skipping the first/last 5%."""
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    if total > 0:
+        for pos in np.linspace(total * 0.05, total * 0.95, count).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(pos))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    else:
+        # Containers without a frame count: decode through, keeping every 30th frame
+        i = 0
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if i % 30 == 0:
+                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            i += 1
+    cap.release()
+    return frames
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance."""
+
+    def __init__(self):
+        self.root = None  # nodes are [key, value, {distance: child}]
+        self.size = 0
+
+    def add(self, key, value):
+        node = [key, value, {}]
+        self.size += 1
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            d = hamming(key, current[0])
+            child = current[2].get(d)
+            if child is None:
+                current[2][d] = node
+                return
+            current = child
+
+    def search(self, key, max_distance):
+        """[(distance, value), ...] within max_distance, closest first."""
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_key, value, children = stack.pop()
+            d = hamming(key, node_key)
+            if d <= max_distance:
+                results.append((d, value))
+            # Triangle inequality: only subtrees at distance d ± max_distance can match
+            for dist, child in children.items():
+                if d - max_distance <= dist <= d + max_distance:
+                    stack.append(child)
+        return sorted(results, key=lambda r: r[0])
@@ -3,15 +3,16 @@
 from transformers import AutoProcessor, AutoModelForImageClassification
 from PIL import Image
 import torch
+from src.utils.model_registry import load_pretrained
 
 class ImageRecognition:
-    def __init__(self, model_name="google/vit-base-patch16-224", device=None):
+    def __init__(self, model_name="google/vit-base-patch16-224", device=None, model=None, processor=None):
         """
         A general image classification model using Vision Transformer (ViT)
         """
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self.processor = AutoProcessor.from_pretrained(model_name)
-        self.model = AutoModelForImageClassification.from_pretrained(model_name).to(self.device)
+        self.processor = processor if processor is not None else load_pretrained(AutoProcessor, model_name)
+        self.model = (model if model is not None else load_pretrained(AutoModelForImageClassification, model_name)).to(self.device)
         self.labels = self.model.config.id2label  # maps class index → label
 
     def predict(self, image_path: str):
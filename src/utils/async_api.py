@@ -0,0 +1,132 @@
+# src/utils/async_api.py
+# asyncio counterparts of the blocking model APIs. CPU work runs on a bounded thread
+# pool; a semaphore caps how many calls are admitted to it at once, so an event loop
+# can hold thousands of pending submissions while inference concurrency stays fixed.
+# Timeouts and task cancellation drop queued work and stop running deepfake analyses
+# at their next progress report; a call keeps its slot until its thread is done.
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.jobs import JobCancelled
+
+
+class AsyncRunner:
+    def __init__(self, max_workers=2, max_in_flight=None, default_timeout=None):
+        """
+        max_workers: inference threads (concurrency cap).
+        max_in_flight: calls admitted to the pool at once (running + queued); callers
+        beyond that wait on the semaphore — the backpressure point. Defaults to 2x workers.
+        default_timeout: seconds per call (None = no limit), overridable per call.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="async-infer")
+        self.max_in_flight = max_in_flight or 2 * max_workers
+        self.default_timeout = default_timeout
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "timed_out": 0, "cancelled": 0,
+                      "waiting": 0, "in_flight": 0}
+
+    async def run(self, fn, *args, timeout=None, cancellable=False, **kwargs):
+        """
+        Await fn(*args, **kwargs) on the pool. With cancellable=True, fn also gets a
+        `progress` callback that raises JobCancelled once the caller gave up.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        cancel_event = threading.Event()
+        if cancellable:
+            def progress(**_):
+                if cancel_event.is_set():
+                    raise JobCancelled("caller cancelled")
+            kwargs["progress"] = progress
+
+        self.stats["submitted"] += 1
+        self.stats["waiting"] += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.stats["waiting"] -= 1
+        self.stats["in_flight"] += 1
+        future = self.executor.submit(fn, *args, **kwargs)
+        # The slot is held until the pool call really ends: a thread that is already
+        # running cannot be interrupted, so timing out must not admit another call
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: self._release_threadsafe(loop))
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            self.stats["completed"] += 1
+            return result
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            # Queued work is dropped; running work stops at its next progress report
+            future.cancel()
+            cancel_event.set()
+
+    def _release_threadsafe(self, loop):
+        def release():
+            self.stats["in_flight"] -= 1
+            self._slots.release()
+        try:
+            loop.call_soon_threadsafe(release)
+        except RuntimeError:
+            pass  # event loop already closed
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class AsyncModels:
+    def __init__(self, ensemble=None, recognizer=None, plate_reader=None, runner=None, categories=None):
+        """
+        Async facade over already-loaded models sharing one AsyncRunner.
+        categories: optional zero-shot category head (ZeroShotHead) reported by /recognize.
+        """
+        self.ensemble = ensemble
+        self.recognizer = recognizer
+        self.plate_reader = plate_reader
+        self.categories = categories
+        self.runner = runner or AsyncRunner()
+
+    async def analyze_deepfake(self, image_path=None, video_path=None, audio_path=None, timeout=None, source=None,
+                               owner=None):
+        """DeepfakeEnsemble.analyze(); cancellation also stops a running video analysis."""
+        return await self.runner.run(
+            self.ensemble.analyze, image_path=image_path, video_path=video_path, audio_path=audio_path,
+            source=source, owner=owner, timeout=timeout, cancellable=True,
+        )
+
+    async def predict_deepfake(self, image_path=None, video_path=None, audio_path=None, timeout=None):
+        result = await self.analyze_deepfake(image_path, video_path, audio_path, timeout=timeout)
+        return result["label"], result["probs"]
+
+    async def similar(self, image_path, k=10, label=None, owner=None, timeout=None):
+        """DeepfakeEnsemble.similar(): previously analyzed images (of `owner`) closest to this one."""
+        return await self.runner.run(self.ensemble.similar, image_path, k=k, label=label, owner=owner,
+                                     timeout=timeout)
+
+    # Methods are looked up on the pool: the models may be LazyModel proxies, whose first
+    # attribute access (or the first after an eviction) loads the model
+    async def recognize(self, image_path, timeout=None):
+        return await self.runner.run(lambda path: self.recognizer.predict(path), image_path, timeout=timeout)
+
+    async def categorize(self, image_path, timeout=None):
+        """{category: probability} from the zero-shot head, or None without one."""
+        if self.categories is None:
+            return None
+        return await self.runner.run(self.categories.scores, image_path, timeout=timeout)
+
+    async def read_plate(self, image_path, timeout=None):
+        return await self.runner.run(lambda path: self.plate_reader.read_plate_text(path), image_path,
+                                     timeout=timeout)
+
+    async def enhance(self, image_path, output_path=None, timeout=None):
+        from src.image_utils.enhancement import enhance_image_cv2
+        return await self.runner.run(enhance_image_cv2, image_path, output_path, timeout=timeout)
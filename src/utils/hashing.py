@@ -0,0 +1,16 @@
+# src/utils/hashing.py
+# Content hashes shared by every cache keyed on file bytes (score cache, output
+# store, CLIP embeddings), so the same file always maps to the same key.
+
+import hashlib
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file's bytes, read in 1 MB chunks."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
@@ -0,0 +1,121 @@
+# src/utils/jobs.py
+# Background job execution for long analyses (e.g. video deepfake detection).
+# Jobs run on a bounded worker pool, publish progress through `job.report(...)`
+# and can be cancelled cooperatively.
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested."""
+
+
+class Job:
+    def __init__(self, name=""):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.status = "queued"  # queued → running → done | failed | cancelled
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def report(self, **progress):
+        """Update progress counters; raises JobCancelled if the job was cancelled."""
+        self.progress.update(progress)
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.id)
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            self.status = "cancelled"
+            self.finished = time.time()
+
+    @property
+    def is_finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobManager:
+    def __init__(self, max_workers=2, keep_finished=100):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self.keep_finished = keep_finished
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, name="", on_finish=None, **kwargs):
+        """
+        Run fn(*args, job=job, **kwargs) in the pool and return the job id.
+        on_finish: called once the job is over however it ends (also when cancelled while queued).
+        """
+        job = Job(name)
+
+        def run():
+            if job.cancel_event.is_set():
+                job.status = "cancelled"
+                return None
+            job.status = "running"
+            job.started = time.time()
+            try:
+                job.result = fn(*args, job=job, **kwargs)
+                job.status = "done"
+            except JobCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished = time.time()
+            return job.result
+
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune_locked()
+        job.future = self.executor.submit(run)
+        if on_finish is not None:
+            job.future.add_done_callback(lambda _: on_finish())
+        return job.id
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def pending_count(self):
+        """Queued + running jobs (reported as the model queue depth)."""
+        return sum(1 for job in list(self.jobs.values()) if not job.is_finished)
+
+    def _prune_locked(self):
+        finished = sorted((j for j in self.jobs.values() if j.is_finished), key=lambda j: j.finished)
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job.id]
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager(max_workers=2):
+    """The process-wide job manager, created on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(max_workers=max_workers)
+        return _manager
@@ -0,0 +1,239 @@
+# src/utils/model_manager.py
+# Loads models on first use and keeps the resident set under a memory budget.
+# Each model's footprint (parameters + buffers) is measured when it loads; once
+# the budget is exceeded the least-recently-used unpinned models are dropped and
+# reloaded on their next use. Pinned (hot) models are never evicted.
+#
+# Budget and pins come from the environment unless passed explicitly:
+#   MODEL_MEMORY_BUDGET_MB=3000 MODEL_PINNED=deepfake.image,recognition streamlit run app/app_dashboard.py
+#
+# An evicted model that a thread is still running stays alive until that call
+# returns, so the budget can be overshot briefly by in-flight work.
+
+import collections
+import gc
+import os
+import threading
+import time
+
+
+def footprint(obj, depth=3):
+    """Bytes held by the torch modules reachable from obj (shared storage counted once)."""
+    import torch
+
+    seen, total = set(), 0
+
+    def walk(value, level):
+        nonlocal total
+        if isinstance(value, torch.nn.Module):
+            for tensor in list(value.parameters()) + list(value.buffers()):
+                ptr = tensor.untyped_storage().data_ptr()
+                if ptr not in seen:
+                    seen.add(ptr)
+                    total += tensor.untyped_storage().nbytes()
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                walk(item, level)
+        elif level > 0 and hasattr(value, "__dict__"):
+            for item in list(vars(value).values()):
+                walk(item, level - 1)
+
+    walk(obj, depth)
+    return total
+
+
+def _free_device_memory():
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+class _Entry:
+    def __init__(self, loader, pinned):
+        self.loader = loader
+        self.pinned = pinned
+        self.model = None
+        self.bytes = 0          # measured at the last load (kept after eviction to plan reloads)
+        self.loads = 0
+        self.evictions = 0
+        self.last_used = None
+        self.load_lock = threading.Lock()
+
+
+class LazyModel:
+    """Stand-in that resolves through the manager on every use, so evicted models reload transparently."""
+    __slots__ = ("_manager", "_key")
+
+    def __init__(self, manager, key):
+        self._manager = manager
+        self._key = key
+
+    def __getattr__(self, name):
+        return getattr(self._manager.get(self._key), name)
+
+    # (processor, model) tuples from init_ensemble are unpacked and indexed
+    def __iter__(self):
+        return iter(self._manager.get(self._key))
+
+    def __getitem__(self, index):
+        return self._manager.get(self._key)[index]
+
+    def __len__(self):
+        return len(self._manager.get(self._key))
+
+    def __repr__(self):
+        return f"LazyModel({self._key!r})"
+
+
+class ModelManager:
+    def __init__(self, budget_bytes=None, pinned=None):
+        """
+        budget_bytes: resident model memory cap (None = unlimited, only track usage).
+        pinned: keys that are never evicted once loaded.
+        """
+        if budget_bytes is None and os.environ.get("MODEL_MEMORY_BUDGET_MB"):
+            budget_bytes = int(float(os.environ["MODEL_MEMORY_BUDGET_MB"]) * 1024 ** 2)
+        if pinned is None:
+            pinned = [k.strip() for k in os.environ.get("MODEL_PINNED", "").split(",") if k.strip()]
+        self.budget_bytes = budget_bytes
+        self.pinned = set(pinned)
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0}
+        self._entries = collections.OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+
+    def register(self, key, loader, pinned=False):
+        """Declare a model; `loader()` builds it on first use. Re-registering keeps a loaded model."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = _Entry(loader, pinned or key in self.pinned)
+            else:
+                entry.loader = loader
+                entry.pinned = entry.pinned or pinned
+
+    def lazy(self, key, loader, pinned=False):
+        """register() and return a LazyModel usable wherever the model itself was."""
+        self.register(key, loader, pinned)
+        return LazyModel(self, key)
+
+    def get(self, key):
+        """The loaded model, loading it (and evicting others) if needed."""
+        entry = self._entries[key]
+        with self._lock:
+            if entry.model is not None:
+                return self._touch(key, entry, hit=True)
+
+        # One load per key at a time; other models stay usable meanwhile
+        with entry.load_lock:
+            with self._lock:
+                if entry.model is not None:
+                    return self._touch(key, entry, hit=True)
+                # Size known from an earlier load lets us make room up front
+                evicted = self._make_room(entry.bytes, keep=key)
+            if evicted:
+                _free_device_memory()
+
+            start = time.perf_counter()
+            model = entry.loader()
+            size = footprint(model)
+            print(f"📦 Loaded {key} ({size / 1024 ** 2:.0f} MB, {time.perf_counter() - start:.1f}s)")
+
+            with self._lock:
+                entry.model, entry.bytes = model, size
+                entry.loads += 1
+                self.stats["loads"] += 1
+                self._touch(key, entry)
+                evicted = self._make_room(0, keep=key)
+            if evicted:
+                _free_device_memory()
+            return model
+
+    def _touch(self, key, entry, hit=False):
+        entry.last_used = time.time()
+        self._entries.move_to_end(key)
+        if hit:
+            self.stats["hits"] += 1
+        return entry.model
+
+    def _make_room(self, incoming, keep):
+        """Evict LRU unpinned models until resident + incoming fits the budget (lock held)."""
+        if self.budget_bytes is None:
+            return []
+        evicted = []
+        for key, entry in list(self._entries.items()):
+            if self.resident_bytes() + incoming <= self.budget_bytes:
+                break
+            if entry.model is None or entry.pinned or key == keep:
+                continue
+            self._drop(key, entry)
+            evicted.append(key)
+        if self.resident_bytes() + incoming > self.budget_bytes:
+            print(f"⚠️ Pinned and in-use models exceed the {self.budget_bytes / 1024 ** 2:.0f} MB model budget.")
+        return evicted
+
+    def _drop(self, key, entry):
+        entry.model = None
+        entry.evictions += 1
+        self.stats["evictions"] += 1
+        print(f"♻️ Evicted {key} ({entry.bytes / 1024 ** 2:.0f} MB)")
+
+    def resident_bytes(self):
+        return sum(e.bytes for e in self._entries.values() if e.model is not None)
+
+    def pin(self, key):
+        with self._lock:
+            self._entries[key].pinned = True
+
+    def unpin(self, key):
+        with self._lock:
+            self._entries[key].pinned = False
+            evicted = self._make_room(0, keep=None)
+        if evicted:
+            _free_device_memory()
+
+    def evict(self, key):
+        """Drop a loaded model now (pinned or not); it reloads on next use."""
+        with self._lock:
+            entry = self._entries[key]
+            if entry.model is None:
+                return False
+            self._drop(key, entry)
+        _free_device_memory()
+        return True
+
+    def report(self):
+        """Budget, resident memory, hit/load/evict counts and per-model state (MRU last)."""
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "resident_bytes": self.resident_bytes(),
+                **self.stats,
+                "models": {
+                    key: {
+                        "loaded": e.model is not None,
+                        "bytes": e.bytes,
+                        "pinned": e.pinned,
+                        "loads": e.loads,
+                        "evictions": e.evictions,
+                        "last_used": e.last_used,
+                    }
+                    for key, e in self._entries.items()
+                },
+            }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_model_manager():
+    """The process-wide model manager (budget/pins from the environment), created on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ModelManager()
+        return _manager
@@ -0,0 +1,167 @@
+# src/utils/model_registry.py
+# Local model registry: pins Hub revisions, stores weights as safetensors and
+# loads them offline (memory-mapped) instead of probing the Hub on every start.
+#
+# Pin everything the app uses:   python -m src.utils.model_registry pin
+# Pin specific models:           python -m src.utils.model_registry pin openai/clip-vit-base-patch16
+# Show pinned models:            python -m src.utils.model_registry list
+
+import datetime
+import json
+import os
+import sys
+import threading
+
+MODELS_DIR = os.environ.get(
+    "MODEL_REGISTRY_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "models")),
+)
+REGISTRY_FILE = os.path.join(MODELS_DIR, "registry.json")
+
+# Every checkpoint referenced by the ensembles and utility models
+DEFAULT_MODELS = [
+    "prithivMLmods/deepfake-detector-model-v1",
+    "google/vit-base-patch16-224-in21k",
+    "MCG-NJU/videomae-base-finetuned-kinetics",
+    "facebook/wav2vec2-base",
+    "google/vit-base-patch16-224",
+    "Wvolf/ViT_Deepfake_Detection",
+    "openai/clip-vit-base-patch16",
+    "prithivMLmods/Deep-Fake-Detector-v2-Model",
+]
+
+# Checkpoint behind each image_ensemble member (app/ensemble_loader.py)
+MEMBER_MODELS = {
+    "EfficientViT": "Wvolf/ViT_Deepfake_Detection",
+    "CLIP": "openai/clip-vit-base-patch16",
+    "Xception++": "prithivMLmods/Deep-Fake-Detector-v2-Model",
+}
+
+# Other-framework weights and docs are never needed locally
+IGNORE_PATTERNS = ["*.h5", "*.msgpack", "*.ot", "*.onnx", "*.tflite", "flax_model*", "tf_model*", "*.md", ".gitattributes"]
+
+_registry = None
+_lock = threading.Lock()
+
+
+def load_registry():
+    """Return the {model_id: entry} mapping, read once per process."""
+    global _registry
+    with _lock:
+        if _registry is None:
+            if os.path.exists(REGISTRY_FILE):
+                with open(REGISTRY_FILE, "r", encoding="utf-8") as f:
+                    _registry = json.load(f)
+            else:
+                _registry = {}
+        return _registry
+
+
+def save_registry(registry):
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    tmp_path = REGISTRY_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, REGISTRY_FILE)
+
+
+def _convert_to_safetensors(local_dir):
+    """Rewrite any pytorch_model*.bin checkpoints in local_dir as safetensors."""
+    import torch
+    from safetensors.torch import save_file
+
+    renamed = {}
+    for name in sorted(os.listdir(local_dir)):
+        if not (name.startswith("pytorch_model") and name.endswith(".bin")):
+            continue
+        state = torch.load(os.path.join(local_dir, name), map_location="cpu", weights_only=True)
+
+        # safetensors refuses aliased storage; tied weights are re-tied by from_pretrained
+        seen, tensors = set(), {}
+        for key, tensor in state.items():
+            ptr = (tensor.untyped_storage().data_ptr(), tensor.storage_offset(), tuple(tensor.shape))
+            if ptr in seen:
+                continue
+            seen.add(ptr)
+            tensors[key] = tensor.contiguous()
+
+        new_name = name.replace("pytorch_model", "model").replace(".bin", ".safetensors")
+        save_file(tensors, os.path.join(local_dir, new_name), metadata={"format": "pt"})
+        os.remove(os.path.join(local_dir, name))
+        renamed[name] = new_name
+
+    index_path = os.path.join(local_dir, "pytorch_model.bin.index.json")
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        index["weight_map"] = {k: renamed.get(v, v) for k, v in index["weight_map"].items()}
+        with open(os.path.join(local_dir, "model.safetensors.index.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.remove(index_path)
+
+
+def pin_model(model_id, revision=None):
+    """Download a model at a fixed commit into the registry and store it as safetensors."""
+    from huggingface_hub import HfApi, snapshot_download
+
+    info = HfApi().model_info(model_id, revision=revision)
+    files = [s.rfilename for s in info.siblings]
+    ignore = list(IGNORE_PATTERNS)
+    if any(f.endswith(".safetensors") for f in files):
+        ignore.append("*.bin")
+
+    rel_dir = os.path.join(model_id.replace("/", "--"), info.sha)
+    local_dir = os.path.join(MODELS_DIR, rel_dir)
+    snapshot_download(model_id, revision=info.sha, local_dir=local_dir, ignore_patterns=ignore)
+    _convert_to_safetensors(local_dir)
+
+    registry = load_registry()
+    with _lock:
+        registry[model_id] = {
+            "revision": info.sha,
+            "path": rel_dir,
+            "pinned_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        }
+        save_registry(registry)
+    return local_dir
+
+
+def resolve_model(model_id):
+    """Local snapshot path for a pinned model, or None if it is not pinned."""
+    entry = load_registry().get(model_id)
+    if entry is None:
+        return None
+    path = os.path.join(MODELS_DIR, entry["path"])
+    return path if os.path.isdir(path) else None
+
+
+def pinned_revision(model_id):
+    """Commit sha a model is pinned at, or None if it is not pinned (then the Hub's latest is loaded)."""
+    entry = load_registry().get(model_id)
+    return entry["revision"] if entry is not None else None
+
+
+def load_pretrained(cls, model_id, **kwargs):
+    """
+    cls.from_pretrained for registry-pinned models: loads the local safetensors
+    snapshot with local_files_only (no Hub probes, weights mmapped and shared
+    through the page cache). Unpinned models fall back to the Hub by ID.
+    """
+    local_path = resolve_model(model_id)
+    if local_path is None:
+        return cls.from_pretrained(model_id, **kwargs)
+    return cls.from_pretrained(local_path, local_files_only=True, **kwargs)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "pin":
+        for model_id in sys.argv[2:] or DEFAULT_MODELS:
+            print(f"📦 Pinning {model_id} ...")
+            print(f"✅ {model_id} → {pin_model(model_id)}")
+    elif command == "list":
+        for model_id, entry in sorted(load_registry().items()):
+            print(f"{model_id:<45} {entry['revision'][:10]}  {entry['pinned_at']}")
+    else:
+        print("Usage: python -m src.utils.model_registry [pin [model_id ...] | list]")
+        sys.exit(1)
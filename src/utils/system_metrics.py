@@ -0,0 +1,122 @@
+# src/utils/system_metrics.py
+# Process-wide background sampler for CPU / memory / GPU / model-queue metrics.
+# Readers (e.g. the Streamlit footer) only copy the latest snapshot and never block.
+
+import collections
+import os
+import threading
+import time
+
+import psutil
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class SystemMetricsSampler:
+    def __init__(self, interval=1.0, history=60, gpu_every=10):
+        """
+        Samples metrics every `interval` seconds into a ring buffer of `history`
+        snapshots. GPUtil shells out to nvidia-smi, so GPU load is only refreshed
+        every `gpu_every` samples.
+        """
+        self.interval = interval
+        self.gpu_every = max(1, gpu_every)
+        self.samples = collections.deque(maxlen=history)
+        self.queues = {}  # name -> callable returning the current queue depth
+        self.gpu_info = "GPU: Not detected"
+        self._process = psutil.Process(os.getpid())
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def register_queue(self, name, depth_fn):
+        """Report `depth_fn()` (pending model work) alongside the system metrics."""
+        with self._lock:
+            self.queues[name] = depth_fn
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        psutil.cpu_percent(interval=None)  # prime the non-blocking CPU counter
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="system-metrics", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _read_gpu(self):
+        try:
+            import GPUtil
+            gpus = GPUtil.getGPUs()
+            if gpus:
+                gpu = gpus[0]
+                return f"{gpu.name} ({gpu.load * 100:.1f}% load)"
+        except Exception:
+            pass
+        return "GPU: Not detected"
+
+    def sample(self):
+        """Take one snapshot (called by the background thread)."""
+        with self._lock:
+            queues = dict(self.queues)
+        queue_depth = 0
+        for depth_fn in queues.values():
+            try:
+                queue_depth += int(depth_fn())
+            except Exception:
+                pass
+        snapshot = {
+            "time": time.time(),
+            "cpu": psutil.cpu_percent(interval=None),
+            "mem": psutil.virtual_memory().percent,
+            "rss": self._process.memory_info().rss,
+            "queue": queue_depth,
+            "gpu": self.gpu_info,
+        }
+        self.samples.append(snapshot)
+        return snapshot
+
+    def _run(self):
+        count = 0
+        while not self._stop.is_set():
+            if count % self.gpu_every == 0:
+                self.gpu_info = self._read_gpu()
+            try:
+                self.sample()
+            except Exception:
+                pass
+            count += 1
+            self._stop.wait(self.interval)
+
+    def latest(self):
+        """Most recent snapshot, or None before the first sample."""
+        return self.samples[-1] if self.samples else None
+
+    def series(self, key):
+        return [s[key] for s in list(self.samples)]
+
+
+def sparkline(values, lo=None, hi=None):
+    """Unicode block sparkline for a short series of numbers."""
+    if not values:
+        return ""
+    lo = min(values) if lo is None else lo
+    hi = max(values) if hi is None else hi
+    span = (hi - lo) or 1
+    last = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[min(last, max(0, int((v - lo) / span * last)))] for v in values)
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """The process-wide sampler, started on first use."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = SystemMetricsSampler().start()
+        return _sampler
@@ -0,0 +1,306 @@
+# src/utils/video_decode.py
+# Pluggable video decode backends feeding a bounded queue from a decoder thread.
+#   pyav    FFmpeg via PyAV (`pip install av`): codec frame/slice threading, optional
+#           hardware decode (hwaccel="cuda" / "vaapi" / ...), RGB straight from swscale
+#   opencv  cv2.VideoCapture fallback; unselected frames are grabbed, never converted
+# Frames are yielded as (index, timestamp seconds, RGB uint8 array).
+# With audio_rate set, the PyAV backend also decodes the audio stream from the same
+# demux pass into an in-memory mono float32 waveform (decoder.audio() afterwards).
+# Selection policies are called as select(index, timestamp) before a frame is
+# converted; policies with a `thumbnail` (w, h) attribute also get a small grayscale
+# version of every frame as a third argument.
+
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+BACKENDS = ("pyav", "opencv")
+
+
+def available_backends():
+    try:
+        import av  # noqa: F401
+    except ImportError:
+        return ("opencv",)
+    return BACKENDS
+
+
+def every_nth(n):
+    """Selection policy keeping every n-th decoded frame."""
+    return lambda index, timestamp: index % n == 0
+
+
+def every_seconds(interval):
+    """Selection policy keeping the first frame at or after each multiple of `interval` seconds."""
+    state = {"next": 0.0}
+
+    def select(index, timestamp):
+        if timestamp + 1e-6 >= state["next"]:
+            state["next"] = (int(timestamp / interval) + 1) * interval
+            return True
+        return False
+    return select
+
+
+class SceneChangeSampler:
+    def __init__(self, budget=32, frame_count=0, min_gap=2, max_gap=120, cut_threshold=0.35,
+                 noise_floor=0.004, thumbnail=(64, 36)):
+        """
+        Adaptive selection policy: spends at most `budget` frames where the picture
+        changes. Each frame gets a cheap signature (luma histogram + thumbnail); change
+        since the last kept frame accumulates, and a frame is kept once that reaches
+        the per-sample share of the video's expected total change. Hard cuts are kept
+        immediately, near-identical frames never, and `max_gap` keeps static shots covered.
+        The budget is a hard cap, paced over the video (see _allowance) so a burst of
+        cuts early on cannot use up the frames meant for the rest.
+        frame_count: container frame count (0 if unknown) used to pace the budget.
+        noise_floor: frame-to-frame changes below this (compression noise) never add up.
+        """
+        self.budget = max(1, budget)
+        self.frame_count = frame_count
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+        self.cut_threshold = cut_threshold
+        self.noise_floor = noise_floor
+        self.thumbnail = thumbnail
+        self.kept = []
+        self._last_kept = None   # (index, histogram, thumbnail) of the last kept frame
+        self._previous = None    # (histogram, thumbnail) of the previous frame
+        self._accumulated = 0.0
+        self._total_change = 0.0
+
+    @staticmethod
+    def _signature(gray):
+        hist = np.bincount(gray.ravel() >> 3, minlength=32).astype(np.float32)
+        return hist / hist.sum(), gray.astype(np.float32) / 255.0
+
+    @staticmethod
+    def _distance(a, b):
+        # Half L1 histogram distance and mean absolute thumbnail difference, both in [0, 1]
+        return 0.5 * (0.5 * np.abs(a[0] - b[0]).sum() + np.abs(a[1] - b[1]).mean())
+
+    def __call__(self, index, timestamp, gray):
+        signature = self._signature(gray)
+        if self._last_kept is None:
+            self._keep(index, signature)
+            return True
+
+        step = self._distance(signature, self._previous)
+        step = step if step >= self.noise_floor else 0.0
+        self._previous = signature
+        if step < self.cut_threshold:
+            # Cuts are kept on their own below; counting them would starve the frames after them
+            self._total_change += step
+            self._accumulated += step
+        gap = index - self._last_kept[0]
+        if gap < self.min_gap or len(self.kept) >= self._allowance(index):
+            return False
+
+        # Per-sample share of the expected total change over the whole video
+        mean_change = self._total_change / max(1, index)
+        expected_frames = self.frame_count or index * 2
+        quota = mean_change * expected_frames / self.budget
+        if (self._distance(signature, self._last_kept[1:]) >= self.cut_threshold
+                or self._accumulated >= max(quota, 1e-3) or gap >= self.max_gap):
+            self._keep(index, signature)
+            return True
+        return False
+
+    def _allowance(self, index):
+        """Frames that may be kept up to `index`: the budget spread over the video plus a burst reserve."""
+        if not self.frame_count:
+            return self.budget
+        paced = self.budget * (index + 1) / self.frame_count
+        return min(self.budget, int(paced) + max(1, self.budget // 4))
+
+    def _keep(self, index, signature):
+        self.kept.append(index)
+        self._last_kept = (index,) + signature
+        self._previous = signature
+        self._accumulated = 0.0
+
+
+class OpenCVDecoder:
+    name = "opencv"
+
+    def __init__(self, path):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video: {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def frames(self, select):
+        thumbnail = getattr(select, "thumbnail", None)
+        index = 0
+        while self.cap.grab():
+            timestamp = index / self.fps if self.fps else self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            frame = None
+            if thumbnail:
+                ok, frame = self.cap.retrieve()
+                if not ok:
+                    break
+                small = cv2.resize(frame, thumbnail, interpolation=cv2.INTER_AREA)
+                keep = select(index, timestamp, cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+            else:
+                keep = select(index, timestamp)
+            if keep:
+                if frame is None:
+                    ok, frame = self.cap.retrieve()
+                    if not ok:
+                        break
+                yield index, timestamp, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            index += 1
+
+    def audio(self):
+        """OpenCV cannot read audio streams."""
+        return None
+
+    def close(self):
+        self.cap.release()
+
+
+class PyAVDecoder:
+    name = "pyav"
+
+    def __init__(self, path, threads=0, hwaccel=None, audio_rate=None):
+        """
+        threads: codec threads (0 = FFmpeg picks); hwaccel: device type such as 'cuda'.
+        audio_rate: also resample the first audio stream (if any) to mono at this rate.
+        """
+        import av
+
+        options = {}
+        if hwaccel:
+            try:
+                from av.codec.hwaccel import HWAccel
+                options["hwaccel"] = HWAccel(device_type=hwaccel, allow_software_fallback=True)
+            except ImportError:
+                print("⚠️ This PyAV build has no hardware decode support — decoding in software.")
+        self.container = av.open(path, **options)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"  # frame + slice threading
+        if threads:
+            self.stream.codec_context.thread_count = threads
+        self.fps = float(self.stream.average_rate or 0)
+        self.frame_count = self.stream.frames
+
+        self.audio_stream, self._resampler, self._audio_chunks = None, None, []
+        if audio_rate and self.container.streams.audio:
+            self.audio_stream = self.container.streams.audio[0]
+            self._resampler = av.AudioResampler(format="flt", layout="mono", rate=audio_rate)
+
+    def frames(self, select):
+        thumbnail = getattr(select, "thumbnail", None)
+        streams = [self.stream] + ([self.audio_stream] if self.audio_stream is not None else [])
+        index = 0
+        # One demux pass; the trailing empty packets flush each decoder
+        for packet in self.container.demux(*streams):
+            if packet.stream.type == "audio":
+                for frame in packet.decode():
+                    self._add_audio(frame)
+                continue
+            for frame in packet.decode():
+                timestamp = float(frame.time) if frame.time is not None else index / (self.fps or 1)
+                if thumbnail:
+                    gray = frame.to_ndarray(width=thumbnail[0], height=thumbnail[1], format="gray")
+                    keep = select(index, timestamp, gray)
+                else:
+                    keep = select(index, timestamp)
+                if keep:
+                    yield index, timestamp, frame.to_ndarray(format="rgb24")
+                index += 1
+        if self._resampler is not None:
+            self._add_audio(None)  # drain the resampler
+
+    def _add_audio(self, frame):
+        for out in self._resampler.resample(frame):
+            self._audio_chunks.append(out.to_ndarray().reshape(-1))
+
+    def audio(self):
+        """Waveform demuxed alongside the frames (after iteration), or None without an audio stream."""
+        if self.audio_stream is None or not self._audio_chunks:
+            return None
+        return np.concatenate(self._audio_chunks).astype(np.float32)
+
+    def close(self):
+        self.container.close()
+
+
+def open_decoder(path, backend="auto", threads=0, hwaccel=None, audio_rate=None):
+    """
+    'auto' prefers PyAV and falls back to OpenCV when it is missing or cannot open the
+    file. audio_rate is honoured by PyAV only (the OpenCV decoder's audio() is None).
+    """
+    if backend not in ("auto",) + BACKENDS:
+        raise ValueError(f"Unknown decode backend: {backend} (expected 'auto' or one of {BACKENDS})")
+    if backend in ("auto", "pyav"):
+        try:
+            return PyAVDecoder(path, threads=threads, hwaccel=hwaccel, audio_rate=audio_rate)
+        except ImportError:
+            if backend == "pyav":
+                raise
+        except Exception as e:
+            if backend == "pyav":
+                raise
+            print(f"⚠️ PyAV could not open the video ({e.__class__.__name__}) — using OpenCV.")
+    return OpenCVDecoder(path)
+
+
+_DONE = object()
+
+
+class ThreadedFrameReader:
+    def __init__(self, decoder, select, maxsize=32):
+        """
+        Runs decoder.frames(select) on a background thread into a bounded queue, so
+        decoding overlaps whatever the consumer does with each frame. Iterate to get
+        frames; close() (or leaving a `with` block) stops the thread early.
+        """
+        self.decoder = decoder
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(select,), daemon=True)
+        self._thread.start()
+
+    def _run(self, select):
+        try:
+            for item in self.decoder.frames(select):
+                if not self._put(item):
+                    return
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(_DONE)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.decoder.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()